@@ -0,0 +1,712 @@
+import argparse
+import asyncio
+import functools
+import http
+import json
+import re
+import secrets
+import signal
+import sys
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs, urlsplit
+
+import database
+import job_search
+import ledger
+import passwords
+import recommender
+import schema
+import services
+import session
+import skill_index
+import storage
+
+# JSON HTTP API over the marketplace operations, for a web front end. Requests
+# are parsed and answered on one asyncio event loop; handlers run on a bounded
+# thread pool (the database work), so they never stall the loop. Sign-up and
+# login run on the loop itself and hand each step out: the hash to the
+# passwords pool, the queries to the same bounded pool as everything else.
+#
+#   python api_server.py --port 8080
+#   curl -s localhost:8080/login -d '{"username": "ana", "password": "pw"}'
+#   curl -s localhost:8080/jobs -H "Authorization: Bearer <token>"
+#
+# It serves the same freelancer_marketplace.db the CLI uses (--db to change), so
+# a load test exercises the real file and its storage profile. HTTP/1.1
+# connections are kept alive between requests. Ctrl+C or SIGTERM stops
+# accepting, lets requests in flight finish, then closes every connection.
+#
+# Money is in centavos, as in batch output. Every response carries a
+# Server-Timing header (time queued for a worker, time in the handler, total).
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8080
+DEFAULT_WORKERS = 8  # the connection pool's size; more threads would only queue for a connection
+MAX_PENDING = 64  # requests waiting for a worker before new ones get 503
+MAX_BODY = 1024 * 1024
+MAX_HEADERS = 100
+KEEPALIVE_TIMEOUT = 15.0  # seconds an idle connection is kept open
+SHUTDOWN_GRACE = 10.0  # seconds requests in flight get to finish at shutdown
+TOKEN_TTL = 8 * 3600.0  # seconds a login token lives without being used
+
+# Service errors by HTTP status, most specific first
+ERROR_STATUS = (
+    (services.AuthenticationError, 401),
+    (services.NotFoundError, 404),
+    (services.ConflictError, 409),
+    (ledger.InsufficientFundsError, 409),
+    (services.ServiceError, 400),
+    (ValueError, 400),
+)
+
+JOB_COLUMNS = ("id", "title", "description", "budget", "skills_required", "duration")
+SIGN_UP_FIELDS = ("username", "password", "role", "name", "skills", "experience", "hourly_rate",
+                  "payment_method", "company_name")
+# JSON type each request body field must have, checked by Request.json() for
+# every route; list means a non-empty list of integers
+NUMBER = (int, float)
+AMOUNT = (str, int, float)  # pesos, as a number or a string like "150.50"
+FIELD_TYPES = {name: str for name in SIGN_UP_FIELDS + JOB_COLUMNS[1:]}
+FIELD_TYPES.update(hourly_rate=NUMBER, budget=AMOUNT, amount=AMOUNT, payment=AMOUNT, accept=bool, milestone_ids=list)
+TYPE_NAMES = {str: "a string", NUMBER: "a number", AMOUNT: "an amount", bool: "true or false",
+              list: "a non-empty list of integers"}
+# Editable profile fields and the Freelancer method that writes each
+PROFILE_UPDATES = {
+    "name": "update_name",
+    "skills": "update_skills",
+    "experience": "update_experience",
+    "hourly_rate": "update_hourly_rate",
+    "payment_method": "update_payment_method",
+}
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message, headers=None):
+        super().__init__(message)
+        self.status = status
+        self.headers = headers or {}
+
+
+class Request:
+    def __init__(self, method, target, version, headers, body):
+        parts = urlsplit(target)
+        self.method = method
+        self.path = parts.path
+        self.query = {name: values[-1] for name, values in parse_qs(parts.query).items()}
+        self.version = version
+        self.headers = headers
+        self.body = body
+        self.params = ()
+        self.user = None
+        self.token = None
+        self.app = None
+        self.handler_started = None
+
+    @property
+    def keep_alive(self):
+        connection = self.headers.get("connection", "").lower()
+        if self.version == "HTTP/1.0":
+            return "keep-alive" in connection
+        return "close" not in connection
+
+    def json(self):
+        """The body as a JSON object ({} when empty), its fields checked against FIELD_TYPES."""
+        if not self.body:
+            return {}
+        try:
+            data = json.loads(self.body)
+        except ValueError:
+            raise HTTPError(400, "Request body must be valid JSON.") from None
+        if not isinstance(data, dict):
+            raise HTTPError(400, "Request body must be a JSON object.")
+        _check_types(data)
+        return data
+
+    def int_query(self, name, default, minimum=None, maximum=None):
+        try:
+            value = int(self.query.get(name, default))
+        except ValueError:
+            raise HTTPError(400, f"Query parameter {name!r} must be an integer.") from None
+        if minimum is not None and value < minimum:
+            raise HTTPError(400, f"Query parameter {name!r} must be at least {minimum}.")
+        if maximum is not None and value > maximum:
+            raise HTTPError(400, f"Query parameter {name!r} must be at most {maximum}.")
+        return value
+
+
+def _field(data, name):
+    if name not in data:
+        raise HTTPError(400, f"Missing field {name!r}.")
+    return data[name]
+
+
+def _is_int(value):
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def _check_types(data):
+    """Raises 400 unless every known field in `data` has its FIELD_TYPES type (bools aren't numbers)."""
+    for name, value in data.items():
+        expected = FIELD_TYPES.get(name)
+        if expected is None:
+            continue  # routes reject fields they don't take themselves, where it matters
+        if expected is list:
+            valid = isinstance(value, list) and value and all(_is_int(item) for item in value)
+        elif expected is bool:
+            valid = isinstance(value, bool)
+        else:
+            valid = isinstance(value, expected) and not isinstance(value, bool)
+        if not valid:
+            raise HTTPError(400, f"{name!r} must be {TYPE_NAMES[expected]}.")
+
+
+# (method, path pattern, handler, role or None for any user, auth required, pool, success status)
+ROUTES = []
+
+
+def route(method, pattern, role=None, auth=True, pool="db", status=200):
+    """Registers a handler. It gets the Request and returns the JSON payload.
+
+    pool is where it runs: "db" (the bounded worker pool), "async" (a
+    coroutine on the event loop that awaits request.app.run_db and the
+    passwords.*_async wrappers for its slow steps) or None (on the event loop;
+    for handlers that do no I/O).
+    """
+    def register(handler):
+        ROUTES.append((method, re.compile(pattern + "$"), handler, role, auth, pool, status))
+        return handler
+    return register
+
+
+def _rows(columns, rows):
+    return [dict(zip(columns, row)) for row in rows]
+
+
+def _profile(user):
+    profile = {"id": user.id, "username": user.username, "role": user.role}
+    profile.update({column: getattr(user, column) for column in session.PROFILE_COLUMNS if hasattr(user, column)})
+    return profile
+
+
+# --- users ---
+
+@route("POST", "/users", auth=False, pool="async", status=201)
+async def sign_up(request):
+    data = request.json()
+    unknown = set(data) - set(SIGN_UP_FIELDS)
+    if unknown:
+        raise HTTPError(400, f"Unknown fields: {', '.join(sorted(unknown))}.")
+    username, password, role = (_field(data, name) for name in SIGN_UP_FIELDS[:3])
+    stored = await passwords.hash_password_async(password)
+    user_id = await request.app.run_db(services.sign_up, username, password, role, password_hash=stored,
+                                       **{name: data[name] for name in SIGN_UP_FIELDS[3:] if name in data})
+    return {"id": user_id}
+
+
+@route("POST", "/login", auth=False, pool="async")
+async def login(request):
+    # services.authenticate's steps, with the hashing kept off the worker pool
+    data = request.json()
+    password = _field(data, "password")
+    row = await request.app.run_db(services.load_credentials, _field(data, "username"))
+    if row is None or not await passwords.verify_password_async(password, row["password"]):
+        raise services.AuthenticationError("Invalid username or password!")
+    stored = row.pop("password")
+    if passwords.needs_upgrade(stored):
+        rehashed = await passwords.hash_password_async(password)
+        await request.app.run_db(services.upgrade_password, row["id"], stored, password, rehashed)
+    user = session.Session().adopt(row)
+    return {"token": request.app.tokens.issue(user), "user": _profile(user)}
+
+
+@route("POST", "/logout", pool=None)
+def logout(request):
+    request.app.tokens.revoke(request.token)
+    return {"ok": True}
+
+
+@route("GET", "/me", pool=None)
+def me(request):
+    return _profile(request.user)
+
+
+@route("PATCH", "/me", role="Freelancer")
+def update_profile(request):
+    data = request.json()
+    unknown = set(data) - set(PROFILE_UPDATES)
+    if unknown:
+        raise HTTPError(400, f"Fields that can't be edited: {', '.join(sorted(unknown))}.")
+    with database.connection() as conn:
+        for name, value in data.items():
+            getattr(request.user, PROFILE_UPDATES[name])(value, conn)
+    return _profile(request.user)
+
+
+@route("GET", "/wallet")
+def wallet(request):
+    return {"balance": services.get_balance(request.user.id)}
+
+
+@route("POST", "/wallet/deposit")
+def deposit(request):
+    return {"balance": services.deposit(request.user.id, _field(request.json(), "amount"))}
+
+
+@route("POST", "/wallet/withdraw")
+def withdraw(request):
+    return {"balance": services.withdraw(request.user.id, _field(request.json(), "amount"))}
+
+
+# --- freelancers ---
+
+@route("GET", "/jobs")
+def open_jobs(request):
+    after = request.int_query("after", 0)
+    limit = request.int_query("limit", job_search.DEFAULT_PAGE_SIZE, minimum=1, maximum=job_search.MAX_PAGE_SIZE)
+    jobs, has_more = job_search.open_jobs_page(after, limit)
+    return {"jobs": _rows(JOB_COLUMNS, jobs), "next_after": jobs[-1][0] if has_more else None}
+
+
+@route("GET", "/jobs/search")
+def search_jobs(request):
+    jobs = job_search.search_jobs(request.query.get("q", ""), page=request.int_query("page", 1, minimum=1))
+    return {"jobs": _rows(JOB_COLUMNS, jobs)}
+
+
+@route("GET", "/jobs/matching", role="Freelancer")
+def matching_jobs(request):
+    jobs = skill_index.matching_jobs(", ".join(request.user.skills))
+    return {"jobs": _rows(("id", "title", "budget", "skills_required", "shared_skills"), jobs)}
+
+
+@route("GET", "/jobs/recommended", role="Freelancer")
+def recommended_jobs(request):
+    jobs = recommender.recommend_jobs(request.user.id)
+    return {"jobs": _rows(("id", "title", "budget", "duration", "score"), jobs)}
+
+
+@route("POST", r"/jobs/(\d+)/apply", role="Freelancer", status=201)
+def apply_job(request):
+    return {"application_id": services.apply_job(request.user.id, int(request.params[0]))}
+
+
+@route("GET", "/applications", role="Freelancer")
+def applications(request):
+    rows = services.list_applications(request.user.id)
+    return {"applications": _rows(("id", "job_title", "budget", "status"), rows)}
+
+
+@route("POST", "/milestones/submit", role="Freelancer")
+def submit_milestone(request):
+    return {"job_id": services.submit_milestone(request.user.id, _field(request.json(), "title"))}
+
+
+# --- employers ---
+
+@route("POST", "/jobs", role="Employer", status=201)
+def post_job(request):
+    data = request.json()
+    job_id = services.post_job(request.user.id, *(_field(data, name) for name in JOB_COLUMNS[1:]))
+    return {"job_id": job_id}
+
+
+@route("GET", "/jobs/posted", role="Employer")
+def posted_jobs(request):
+    return {"jobs": _rows(JOB_COLUMNS + ("status",), services.list_posted_jobs(request.user.id))}
+
+
+@route("GET", "/applicants", role="Employer")
+def applicants(request):
+    job_id, ranked = services.list_applicants(request.user.id, _field(request.query, "job_title"))
+    columns = ("freelancer_id", "name", "skills", "experience", "hourly_rate", "application_id")
+    return {"job_id": job_id, "applicants": [dict(zip(columns, row), fit=score) for score, row in ranked]}
+
+
+@route("POST", r"/applications/(\d+)/decision", role="Employer")
+def decide_application(request):
+    accept = _field(request.json(), "accept")
+    return {"status": services.decide_application(request.user.id, int(request.params[0]), accept)}
+
+
+@route("GET", "/freelancers/matching", role="Employer")
+def matching_freelancers(request):
+    job_id, freelancers = services.matching_freelancers(request.user.id, _field(request.query, "job_title"))
+    columns = ("id", "name", "skills", "hourly_rate", "shared_skills")
+    return {"job_id": job_id, "freelancers": _rows(columns, freelancers)}
+
+
+@route("POST", r"/jobs/(\d+)/milestones", role="Employer", status=201)
+def add_milestone(request):
+    data = request.json()
+    milestone_id = services.add_milestone(request.user.id, int(request.params[0]), _field(data, "title"),
+                                          _field(data, "payment"))
+    return {"milestone_id": milestone_id}
+
+
+@route("POST", "/milestones/approve", role="Employer")
+def approve_milestone(request):
+    freelancer_id, released = services.approve_milestone(request.user.id, _field(request.json(), "title"))
+    return {"freelancer_id": freelancer_id, "released": released}
+
+
+@route("POST", "/milestones/approve-many", role="Employer")
+def approve_milestones(request):
+    return services.approve_milestones(request.user.id, _field(request.json(), "milestone_ids"))
+
+
+# --- server ---
+
+@route("GET", "/stats", auth=False, pool=None)
+def stats(request):
+    return {"routes": request.app.stats.snapshot(), "connection_pool": database.pool_stats(),
+            "pending": request.app.pending}
+
+
+class TokenStore:
+    """Bearer tokens of logged-in users. Each user object keeps its own session.Session."""
+
+    def __init__(self, ttl=TOKEN_TTL):
+        self.ttl = ttl
+        self._tokens = {}  # token -> [user, last used]
+        self._lock = threading.Lock()
+
+    def issue(self, user):
+        token = secrets.token_urlsafe(32)
+        with self._lock:
+            self._tokens[token] = [user, time.monotonic()]
+        return token
+
+    def resolve(self, token):
+        """Returns the token's user, or None if it is unknown or expired."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._tokens.get(token)
+            if entry is None:
+                return None
+            if now - entry[1] > self.ttl:
+                del self._tokens[token]
+                return None
+            entry[1] = now
+            return entry[0]
+
+    def revoke(self, token):
+        with self._lock:
+            self._tokens.pop(token, None)
+
+
+class RequestStats:
+    """Per-route request counts and latency, for GET /stats and the summary printed at shutdown."""
+
+    def __init__(self):
+        self._routes = {}  # only touched from the event loop
+
+    def add(self, name, status, seconds):
+        entry = self._routes.get(name)
+        if entry is None:
+            entry = self._routes[name] = {"requests": 0, "errors": 0, "total_ms": 0.0, "max_ms": 0.0}
+        entry["requests"] += 1
+        entry["errors"] += status >= 400
+        entry["total_ms"] += seconds * 1000
+        entry["max_ms"] = max(entry["max_ms"], seconds * 1000)
+
+    def snapshot(self):
+        """Returns {route: stats}, slowest total first."""
+        items = [(name, dict(entry, avg_ms=entry["total_ms"] / entry["requests"])) for name, entry in self._routes.items()]
+        return dict(sorted(items, key=lambda item: -item[1]["total_ms"]))
+
+
+class ApiServer:
+    """The HTTP server. start() binds it; shutdown() stops it gracefully."""
+
+    def __init__(self, host=DEFAULT_HOST, port=DEFAULT_PORT, workers=DEFAULT_WORKERS, max_pending=MAX_PENDING,
+                 access_log=False):
+        self.host = host
+        self.port = port
+        self.workers = workers
+        self.max_pending = max_pending
+        self.access_log = access_log
+        self.tokens = TokenStore()
+        self.stats = RequestStats()
+        self.pending = 0
+        self._executor = None
+        self._server = None
+        self._closing = False
+        self._stop = None
+        self._connections = {}  # task -> writer, for every open connection
+        self._idle = set()  # writers of connections waiting for their next request
+
+    async def start(self):
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="api")
+        self._stop = asyncio.Event()
+        self._server = await asyncio.start_server(self._serve_connection, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]  # the real one when 0 was asked for
+
+    def stop(self):
+        """Asks serve_forever() to shut down; safe to call from a signal handler."""
+        self._stop.set()
+
+    async def serve_forever(self):
+        await self._stop.wait()
+        await self.shutdown()
+
+    async def shutdown(self, grace=SHUTDOWN_GRACE):
+        """Stops accepting, closes idle connections and gives requests in flight `grace` seconds to finish."""
+        if self._closing:
+            return
+        self._closing = True
+        self._server.close()
+        await self._server.wait_closed()
+        for writer in list(self._idle):
+            writer.close()
+        tasks = list(self._connections)
+        if tasks:
+            _, unfinished = await asyncio.wait(tasks, timeout=grace)
+            for task in unfinished:
+                task.cancel()
+            if unfinished:
+                await asyncio.wait(unfinished)
+        # Lets a handler that outlived the grace period finish its transaction
+        await asyncio.get_running_loop().run_in_executor(None, self._executor.shutdown)
+
+    async def _serve_connection(self, reader, writer):
+        task = asyncio.current_task()
+        self._connections[task] = writer
+        try:
+            while not self._closing:
+                self._idle.add(writer)
+                try:
+                    request = await asyncio.wait_for(self._read_request(reader), KEEPALIVE_TIMEOUT)
+                except HTTPError as e:
+                    await self._respond(writer, e.status, {"error": "BadRequest", "message": str(e)}, False, e.headers)
+                    break
+                finally:
+                    self._idle.discard(writer)
+                if request is None:
+                    break
+                keep_alive = await self._handle(request, writer)
+                if not keep_alive:
+                    break
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            del self._connections[task]
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except (ConnectionError, asyncio.CancelledError):
+                pass
+
+    async def _read_request(self, reader):
+        """Reads one request, or returns None when the client has closed the connection."""
+        try:
+            line = await reader.readline()
+            while line in (b"\r\n", b"\n"):  # stray line breaks between requests are allowed
+                line = await reader.readline()
+            if not line:
+                return None
+            parts = line.decode("latin-1").rstrip("\r\n").split(" ")
+            if len(parts) != 3:
+                raise HTTPError(400, "Malformed request line.")
+            method, target, version = parts
+            if version not in ("HTTP/1.0", "HTTP/1.1"):
+                raise HTTPError(505, "Only HTTP/1.0 and HTTP/1.1 are supported.")
+
+            headers = {}
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b"\n", b""):
+                    break
+                name, colon, value = line.decode("latin-1").partition(":")
+                if not colon:
+                    raise HTTPError(400, "Malformed header line.")
+                headers[name.strip().lower()] = value.strip()
+                if len(headers) > MAX_HEADERS:
+                    raise HTTPError(431, "Too many headers.")
+        except ValueError:  # a line longer than the stream limit
+            raise HTTPError(431, "Request line or header too long.") from None
+
+        if "chunked" in headers.get("transfer-encoding", "").lower():
+            raise HTTPError(411, "Send a Content-Length; chunked bodies are not supported.")
+        try:
+            length = int(headers.get("content-length", 0))
+        except ValueError:
+            raise HTTPError(400, "Invalid Content-Length.") from None
+        if length < 0:
+            raise HTTPError(400, "Invalid Content-Length.")
+        if length > MAX_BODY:
+            raise HTTPError(413, f"Request bodies are limited to {MAX_BODY} bytes.")
+        body = await reader.readexactly(length) if length else b""
+        return Request(method, target, version, headers, body)
+
+    def _match(self, request):
+        """Returns the route for a request; raises 404 or 405."""
+        allowed = []
+        for method, pattern, handler, role, auth, pool, status in ROUTES:
+            match = pattern.match(request.path)
+            if match is None:
+                continue
+            if method != request.method:
+                allowed.append(method)
+                continue
+            request.params = match.groups()
+            return handler, role, auth, pool, status
+        if allowed:
+            raise HTTPError(405, f"Use {', '.join(allowed)} for {request.path}.", {"Allow": ", ".join(allowed)})
+        raise HTTPError(404, f"No route for {request.path}.")
+
+    def _authorize(self, request, role, auth):
+        if not auth:
+            return
+        scheme, _, token = request.headers.get("authorization", "").partition(" ")
+        user = self.tokens.resolve(token.strip()) if scheme.lower() == "bearer" else None
+        if user is None:
+            raise HTTPError(401, "Log in and send the token as 'Authorization: Bearer <token>'.")
+        if role and user.role != role:
+            raise HTTPError(403, f"Only {role.lower()}s can do this.")
+        request.user, request.token = user, token.strip()
+
+    async def run_db(self, func, *args, **kwargs):
+        """Runs func(*args, **kwargs) on the bounded worker pool; for "async" handlers."""
+        call = functools.partial(func, *args, **kwargs)
+        return await asyncio.get_running_loop().run_in_executor(self._executor, call)
+
+    def _run(self, handler, request):
+        """Runs a handler on a pool thread."""
+        request.handler_started = time.perf_counter()
+        if request.user is not None:
+            request.user.session.get(request.user.id)  # picks up profile edits made elsewhere
+        return handler(request)
+
+    async def _handle(self, request, writer):
+        """Answers one request. Returns whether the connection stays open."""
+        started = time.perf_counter()
+        request.app = self
+        name = "(no route)"
+        extra = {}
+        try:
+            handler, role, auth, pool, status = self._match(request)
+            name = f"{request.method} {handler.__name__}"
+            self._authorize(request, role, auth)
+            if pool is None:
+                request.handler_started = time.perf_counter()
+                payload = handler(request)
+            else:
+                if self.pending >= self.max_pending:
+                    raise HTTPError(503, "Server busy; try again shortly.", {"Retry-After": "1"})
+                self.pending += 1
+                try:
+                    if pool == "async":
+                        request.handler_started = time.perf_counter()
+                        payload = await handler(request)
+                    else:
+                        payload = await self.run_db(self._run, handler, request)
+                finally:
+                    self.pending -= 1
+        except HTTPError as e:
+            status, payload, extra = e.status, {"error": http.HTTPStatus(e.status).phrase, "message": str(e)}, e.headers
+        except Exception as e:
+            for error, status in ERROR_STATUS:
+                if isinstance(e, error):
+                    payload = {"error": type(e).__name__, "message": str(e)}
+                    break
+            else:
+                traceback.print_exc()
+                status, payload = 500, {"error": "InternalError", "message": "Unexpected server error."}
+
+        finished = time.perf_counter()
+        queued = (request.handler_started or finished) - started
+        extra["Server-Timing"] = (f"queue;dur={queued * 1000:.2f}, app;dur={(finished - started - queued) * 1000:.2f}, "
+                                  f"total;dur={(finished - started) * 1000:.2f}")
+        keep_alive = request.keep_alive and not self._closing
+        await self._respond(writer, status, payload, keep_alive, extra)
+        self.stats.add(name, status, finished - started)
+        if self.access_log:
+            print(f"{request.method} {request.path} {status} {(finished - started) * 1000:.1f} ms")
+        return keep_alive
+
+    async def _respond(self, writer, status, payload, keep_alive, headers=None):
+        body = json.dumps(payload, default=str).encode()
+        head = [f"HTTP/1.1 {status} {http.HTTPStatus(status).phrase}",
+                "Content-Type: application/json",
+                f"Content-Length: {len(body)}",
+                f"Connection: {'keep-alive' if keep_alive else 'close'}"]
+        head.extend(f"{name}: {value}" for name, value in (headers or {}).items())
+        writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1") + body)
+        await writer.drain()
+
+
+def print_stats(stats):
+    print(f"{'route':<36}{'requests':>10}{'errors':>8}{'avg_ms':>10}{'max_ms':>10}")
+    for name, entry in stats.snapshot().items():
+        print(f"{name:<36}{entry['requests']:>10}{entry['errors']:>8}{entry['avg_ms']:>10.2f}{entry['max_ms']:>10.2f}")
+
+
+async def serve(host=DEFAULT_HOST, port=DEFAULT_PORT, workers=DEFAULT_WORKERS, max_pending=MAX_PENDING,
+                access_log=False):
+    """Runs the server until SIGINT or SIGTERM, then shuts it down gracefully. Returns the ApiServer."""
+    server = ApiServer(host, port, workers, max_pending, access_log)
+    await server.start()
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(signum, server.stop)
+        except (NotImplementedError, RuntimeError):  # Windows: Ctrl+C raises KeyboardInterrupt instead
+            pass
+    print(f"Serving the ProDigi API on http://{server.host}:{server.port} ({workers} workers); Ctrl+C to stop")
+    await server.serve_forever()
+    return server
+
+
+def run(host=DEFAULT_HOST, port=DEFAULT_PORT, db_path=database.DB_PATH, profile=storage.DEFAULT_PROFILE,
+        workers=DEFAULT_WORKERS, max_pending=MAX_PENDING, access_log=False):
+    database.use_database(db_path, profile)
+    with database.connection() as conn:
+        schema.migrate(conn)
+    try:
+        server = asyncio.run(serve(host, port, workers, max_pending, access_log))
+    finally:
+        passwords.shutdown()
+        database.reset_pool()
+    print("Server stopped.")
+    print_stats(server.stats)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the ProDigi marketplace as a JSON HTTP API")
+    parser.add_argument("--host", default=DEFAULT_HOST, help="address to listen on (default %(default)s)")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="port to listen on (default %(default)s)")
+    parser.add_argument("--db", default=database.DB_PATH, help="database file (default %(default)s)")
+    parser.add_argument("--storage-profile", choices=storage.PROFILES, default=storage.DEFAULT_PROFILE,
+                        help="SQLite journal, sync, cache and busy-timeout settings (default %(default)s)")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS,
+                        help="threads running database work (default %(default)s)")
+    parser.add_argument("--max-pending", type=int, default=MAX_PENDING,
+                        help="requests allowed to wait for a worker before answering 503 (default %(default)s)")
+    parser.add_argument("--password-hasher", choices=passwords.HASHERS, default=passwords.DEFAULT_ALGORITHM,
+                        help="algorithm for new password hashes (default %(default)s)")
+    parser.add_argument("--password-cost", type=int,
+                        help="work factor for new password hashes (default: the algorithm's own)")
+    parser.add_argument("--access-log", action="store_true", help="print one line per request")
+    args = parser.parse_args(argv)
+    if args.workers <= 0 or args.max_pending <= 0:
+        parser.error("--workers and --max-pending must be positive")
+    if args.password_cost is not None and args.password_cost <= 0:
+        parser.error("--password-cost must be a positive integer")
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    passwords.configure(algorithm=args.password_hasher, cost=args.password_cost)
+    try:
+        run(args.host, args.port, args.db, args.storage_profile, args.workers, args.max_pending, args.access_log)
+    except KeyboardInterrupt:
+        print("Server stopped.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
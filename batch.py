@@ -0,0 +1,73 @@
+import json
+import sys
+
+import services
+
+# Operations a batch script may call, by name. Each line of a script is one JSON
+# object: {"op": "deposit", "user_id": "$alice", "amount": "500"}. The other keys
+# are the service function's keyword arguments. "as" names the result so later
+# lines can refer to it as "$name" (e.g. the id returned by sign_up or post_job).
+OPERATIONS = {
+    name: getattr(services, name)
+    for name in (
+        "sign_up", "login", "get_balance", "deposit", "withdraw",
+        "post_job", "apply_job", "decide_application",
+        "add_milestone", "submit_milestone", "approve_milestone", "approve_milestones",
+    )
+}
+
+# Service errors plus malformed lines; anything else is a bug and propagates
+ERRORS = (services.ServiceError, services.InsufficientFundsError, ValueError, TypeError, KeyError)
+
+
+def _resolve(value, names):
+    if isinstance(value, str) and value.startswith("$"):
+        if value[1:] not in names:
+            raise services.ValidationError(f"Unknown reference {value}")
+        return names[value[1:]]
+    return value
+
+
+def _step(line, names):
+    step = json.loads(line)
+    if not isinstance(step, dict) or "op" not in step:
+        raise services.ValidationError('Each line must be a JSON object with an "op" key.')
+    op = step.pop("op")
+    if op not in OPERATIONS:
+        raise services.ValidationError(f"Unknown operation {op!r}")
+    bind = step.pop("as", None)
+    result = OPERATIONS[op](**{key: _resolve(value, names) for key, value in step.items()})
+    if bind:
+        names[bind] = result
+    return op, result
+
+
+def run(lines, out=sys.stdout):
+    """Runs a script of operations at full speed, writing one JSON result per line.
+
+    Blank lines and lines starting with '#' are skipped. Money in results is in
+    centavos. Returns the number of failed operations.
+    """
+    names = {}
+    failures = 0
+    for number, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        try:
+            op, result = _step(line, names)
+        except ERRORS as e:
+            failures += 1
+            record = {"line": number, "ok": False, "error": type(e).__name__, "message": str(e)}
+        else:
+            record = {"line": number, "op": op, "ok": True, "result": result}
+        out.write(json.dumps(record) + "\n")
+    return failures
+
+
+def run_file(path, out=sys.stdout):
+    """Runs a batch script from a file, or from stdin when `path` is '-'."""
+    if path == "-":
+        return run(sys.stdin, out)
+    with open(path, encoding="utf-8") as script:
+        return run(script, out)
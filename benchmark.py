@@ -0,0 +1,382 @@
+import argparse
+import json
+import os
+import platform
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import database
+import job_search
+import ledger
+import passwords
+import schema
+import services
+import storage
+
+# Benchmarks time the operations behind the interactive screens (the service
+# and query functions), never the prompts, prints or sleeps around them.
+#
+#   python benchmark.py run --jobs 5000 --out after.json
+#   python benchmark.py compare before.json after.json
+#   python benchmark.py profiles --jobs 5000
+#   python benchmark.py passwords --costs 100000 260000 600000
+
+SKILLS = (
+    "Python", "SQL", "Django", "Flask", "JavaScript", "React", "Vue", "Node.js",
+    "Go", "Rust", "Java", "Kotlin", "Swift", "C#", ".NET", "PHP", "Laravel",
+    "Excel", "Tableau", "Figma", "Photoshop", "Illustrator", "SEO", "Copywriting",
+    "AWS", "Docker", "Kubernetes", "Linux", "Pandas", "Machine Learning",
+)
+WORDS = ("API", "Dashboard", "Website", "Scraper", "Migration", "Logo", "Report", "Mobile App", "Pipeline", "Audit")
+DURATIONS = ("3 days", "1 week", "2 weeks", "1 month", "3 months")
+PASSWORD = "benchmark"
+PERCENTILES = (50, 90, 95, 99)
+
+# Work factors `benchmark.py passwords` tries when none are given
+PASSWORD_COSTS = {"pbkdf2_sha256": (100_000, 260_000, 600_000), "scrypt": (14, 15, 16)}
+
+DEFAULTS = {"users": 500, "jobs": 2000, "applications": 6000, "milestones": 500, "repeat": 200, "warmup": 10, "seed": 42}
+
+
+def seed_database(conn, users, jobs, applications, milestones, seed):
+    """Fills an empty marketplace database with reproducible synthetic data.
+
+    One user in five is an employer. `milestones` pending milestones are spread
+    over in-progress jobs, each of which also keeps one milestone that is never
+    approved, so approving the seeded ones never triggers a payout.
+    """
+    rng = random.Random(seed)
+    password = services.hash_password(PASSWORD)
+    employers = max(1, users // 5)
+    cursor = conn.cursor()
+
+    cursor.executemany(
+        "INSERT INTO users (id, username, password, role, name, company_name) VALUES (?, ?, ?, 'Employer', 'N/A', ?)",
+        [(n, f"employer{n}", password, f"Company {n}") for n in range(1, employers + 1)])
+    cursor.executemany("""
+        INSERT INTO users (id, username, password, role, name, skills, experience, hourly_rate, payment_method)
+        VALUES (?, ?, ?, 'Freelancer', ?, ?, '3 years', ?, 'GCash')
+    """, [(n, f"freelancer{n}", password, f"Freelancer {n}", ", ".join(rng.sample(SKILLS, rng.randint(2, 6))),
+           rng.randint(5, 100)) for n in range(employers + 1, users + 1)])
+    # Employers get enough money for every benchmark iteration
+    cursor.executemany("INSERT INTO wallet (user_id, balance) VALUES (?, ?)",
+                       [(n, 10 ** 12 if n <= employers else 0) for n in range(1, users + 1)])
+
+    freelancer_ids = range(employers + 1, users + 1)
+    in_progress = min(jobs, max(1, milestones // 4))
+    job_rows = []
+    for n in range(1, jobs + 1):
+        job_rows.append((n, rng.randint(1, employers), f"{rng.choice(WORDS)} {rng.choice(SKILLS)} {n}",
+                         f"Build a {rng.choice(WORDS).lower()} for job {n}", rng.randint(1000, 100000) * 100,
+                         ", ".join(rng.sample(SKILLS, rng.randint(1, 4))), rng.choice(DURATIONS),
+                         "in_progress" if n <= in_progress else "open"))
+    cursor.executemany("""
+        INSERT INTO jobs (id, employer_id, title, description, budget, skills_required, duration, status)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    """, job_rows)
+
+    # In-progress jobs have an accepted freelancer; other applications are still open
+    hired = {n: rng.choice(freelancer_ids) for n in range(1, in_progress + 1)}
+    cursor.executemany("INSERT INTO job_applications (job_id, freelancer_id, status) VALUES (?, ?, 'accepted')",
+                       list(hired.items()))
+    if jobs > in_progress:
+        cursor.executemany("INSERT INTO job_applications (job_id, freelancer_id, status) VALUES (?, ?, 'applied')",
+                           [(rng.randint(in_progress + 1, jobs), rng.choice(freelancer_ids)) for _ in range(applications)])
+
+    milestone_rows = [(job_id, freelancer_id, f"Final {job_id}", 100) for job_id, freelancer_id in hired.items()]
+    milestone_rows += [(job_id, hired[job_id], f"Milestone {n}", 100)
+                       for n, job_id in enumerate((n % in_progress + 1 for n in range(milestones)), 1)]
+    cursor.executemany("INSERT INTO milestones (job_id, freelancer_id, title, status, payment) VALUES (?, ?, ?, 'pending', ?)",
+                       milestone_rows)
+    conn.commit()
+
+
+def build_database(path, profile=storage.DEFAULT_PROFILE, **sizes):
+    """Creates and seeds a fresh benchmark database at `path`, then runs the app's schema setup."""
+    database.use_database(path, profile)
+    with database.connection() as conn:
+        # Seed the core tables, then let the later migrations index and backfill the data
+        schema.migrate(conn, target=schema.CORE_VERSION)
+        seed_database(conn, **sizes)
+        schema.migrate(conn)
+
+
+def percentile(ordered, q):
+    """Linear-interpolated percentile of an already sorted list."""
+    if len(ordered) == 1:
+        return ordered[0]
+    position = (len(ordered) - 1) * q / 100
+    low = int(position)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (position - low)
+
+
+def summarize(samples):
+    """Turns raw durations (seconds) into the JSON summary, in milliseconds."""
+    ordered = sorted(samples)
+    summary = {"samples": len(ordered)}
+    if not ordered:
+        return summary
+    summary.update({f"p{q}_ms": round(percentile(ordered, q) * 1000, 4) for q in PERCENTILES})
+    summary["min_ms"] = round(ordered[0] * 1000, 4)
+    summary["max_ms"] = round(ordered[-1] * 1000, 4)
+    summary["mean_ms"] = round(sum(ordered) / len(ordered) * 1000, 4)
+    return summary
+
+
+def measure(operation, repeat, warmup, setup=None):
+    """Times `operation(*setup(i))` `repeat` times after `warmup` untimed calls."""
+    samples = []
+    for i in range(warmup + repeat):
+        args = setup(i) if setup else ()
+        start = time.perf_counter()
+        operation(*args)
+        elapsed = time.perf_counter() - start
+        if i >= warmup:
+            samples.append(elapsed)
+    return samples
+
+
+def benchmark_cases(conn, rng, sizes):
+    """Returns {name: (operation, setup, iterations)} for the seeded database."""
+    cursor = conn.cursor()
+    cursor.execute("SELECT username FROM users")
+    usernames = [row[0] for row in cursor.fetchall()]
+    cursor.execute("SELECT id FROM users WHERE role = 'Employer'")
+    employer_ids = [row[0] for row in cursor.fetchall()]
+    cursor.execute("SELECT MAX(id) FROM jobs WHERE status = 'open'")
+    last_open_job = cursor.fetchone()[0] or 0
+    cursor.execute("""
+        SELECT j.employer_id, j.title FROM jobs j
+        WHERE EXISTS (SELECT 1 FROM job_applications ja WHERE ja.job_id = j.id AND ja.status = 'applied')
+    """)
+    applied_jobs = cursor.fetchall() or [(employer_ids[0], "")]
+    cursor.execute("""
+        SELECT j.employer_id, m.title FROM milestones m JOIN jobs j ON j.id = m.job_id
+        WHERE m.title LIKE 'Milestone %' ORDER BY m.id
+    """)
+    pending_milestones = cursor.fetchall()
+    cursor.execute("SELECT j.employer_id, m.job_id, m.freelancer_id FROM milestones m JOIN jobs j ON j.id = m.job_id LIMIT 1")
+    escrow_pair = cursor.fetchone()
+    total = sizes["repeat"] + sizes["warmup"]
+
+    def hold_escrow(i):
+        # Untimed: put money in escrow so each payout has something to release
+        employer_id, job_id, freelancer_id = escrow_pair
+        ledger.hold_in_escrow(conn, employer_id, job_id, freelancer_id, 100)
+        return (job_id, freelancer_id)
+
+    return {
+        "login": (services.login, lambda i: (rng.choice(usernames), PASSWORD), total),
+        "post_job": (services.post_job, lambda i: (rng.choice(employer_ids), f"Benchmark job {i}", "Timed insert",
+                                                   "500", ", ".join(rng.sample(SKILLS, 3)), "1 week"), total),
+        "browse_jobs": (job_search.open_jobs_page, lambda i: (rng.randint(0, last_open_job),), total),
+        "view_applicants": (services.list_applicants, lambda i: rng.choice(applied_jobs), total),
+        "approve_milestone": (services.approve_milestone, lambda i: pending_milestones[i],
+                              min(total, len(pending_milestones))),
+        "finalize_payment": ((lambda job_id, freelancer_id: ledger.release_escrow(conn, job_id, freelancer_id)),
+                             hold_escrow if escrow_pair else None, total if escrow_pair else 0),
+    }
+
+
+def run(sizes, only=None, profile=storage.DEFAULT_PROFILE):
+    """Seeds a scratch database and benchmarks every operation. Returns the JSON-ready report."""
+    previous_database, previous_profile = database.current_database(), database.current_profile()
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, "benchmark.db")
+        try:
+            start = time.perf_counter()
+            build_database(path, profile,
+                           **{key: sizes[key] for key in ("users", "jobs", "applications", "milestones", "seed")})
+            seed_s = time.perf_counter() - start
+            results = {}
+            rng = random.Random(sizes["seed"])
+            with database.connection() as conn:
+                cases = benchmark_cases(conn, rng, sizes)
+                for name, (operation, setup, iterations) in cases.items():
+                    if only and name not in only:
+                        continue
+                    warmup = min(sizes["warmup"], max(iterations - 1, 0))
+                    samples = measure(operation, iterations - warmup, warmup, setup)
+                    results[name] = summarize(samples)
+        finally:
+            database.use_database(previous_database, previous_profile)
+
+    return {
+        "meta": {
+            "storage_profile": profile,
+            "seed_s": round(seed_s, 4),
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(),
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        },
+        "params": sizes,
+        "results": results,
+    }
+
+
+def compare(baseline, current, threshold=0.10, metric="p50_ms"):
+    """Returns [(name, base, new, change, regressed)] for operations present in both reports.
+
+    `change` is the relative difference of `metric`; a rise above `threshold` is a regression.
+    """
+    rows = []
+    for name, base_stats in baseline["results"].items():
+        new_stats = current["results"].get(name)
+        if not new_stats or metric not in base_stats or metric not in new_stats:
+            continue
+        base, new = base_stats[metric], new_stats[metric]
+        change = (new - base) / base if base else 0.0
+        rows.append((name, base, new, change, change > threshold))
+    return rows
+
+
+def print_comparison(rows, metric):
+    print(f"{'operation':<20}{'base ' + metric:>16}{'new ' + metric:>16}{'change':>10}")
+    for name, base, new, change, regressed in rows:
+        flag = "  REGRESSION" if regressed else ""
+        print(f"{name:<20}{base:>16.4f}{new:>16.4f}{change:>+10.1%}{flag}")
+
+
+def compare_profiles(sizes, profiles=None, only=None):
+    """Runs the suite once per storage profile on identically seeded databases."""
+    return {profile: run(sizes, only, profile) for profile in profiles or storage.PROFILES}
+
+
+def print_profiles(reports, metric="p50_ms"):
+    profiles = list(reports)
+    print(f"{metric:<20}" + "".join(f"{profile:>18}" for profile in profiles))
+    print(f"{'seed database (s)':<20}" + "".join(f"{reports[p]['meta']['seed_s']:>18.3f}" for p in profiles))
+    for name in reports[profiles[0]]["results"]:
+        cells = "".join(f"{reports[p]['results'].get(name, {}).get(metric, float('nan')):>18.4f}" for p in profiles)
+        print(f"{name:<20}{cells}")
+
+
+def compare_password_costs(costs=None, algorithm=None, users=20, logins=40, concurrency=4):
+    """Times concurrent logins with every user's password hashed at each cost.
+
+    Returns {cost: {"logins_per_s", "p50_ms", "p95_ms", ...}}. The hashing
+    setting in effect before the call is restored afterwards.
+    """
+    previous_setting = passwords.current_setting()
+    previous_database, previous_profile = database.current_database(), database.current_profile()
+    algorithm = algorithm or previous_setting["algorithm"]
+    costs = costs or PASSWORD_COSTS.get(algorithm, (previous_setting["cost"],))
+    reports = {}
+    with tempfile.TemporaryDirectory() as tmpdir:
+        try:
+            build_database(os.path.join(tmpdir, "passwords.db"), users=users, jobs=0, applications=0, milestones=0,
+                           seed=DEFAULTS["seed"])
+            with database.connection() as conn:
+                usernames = [row[0] for row in conn.execute("SELECT username FROM users")]
+
+            def timed_login(username):
+                start = time.perf_counter()
+                services.login(username, PASSWORD)
+                return time.perf_counter() - start
+
+            with ThreadPoolExecutor(max_workers=concurrency) as executor:
+                for cost in costs:
+                    passwords.configure(algorithm=algorithm, cost=cost)
+                    # Hashed at this cost up front, so no login stops to upgrade its hash
+                    with database.connection() as conn:
+                        conn.execute("UPDATE users SET password = ?", (passwords.hash_password(PASSWORD),))
+                        conn.commit()
+                    start = time.perf_counter()
+                    samples = list(executor.map(timed_login, (usernames[i % len(usernames)] for i in range(logins))))
+                    elapsed = time.perf_counter() - start
+                    reports[cost] = {"algorithm": algorithm, "concurrency": concurrency,
+                                     "logins_per_s": round(logins / elapsed, 2), **summarize(samples)}
+        finally:
+            passwords.configure(**previous_setting)
+            database.use_database(previous_database, previous_profile)
+    return reports
+
+
+def print_password_costs(reports):
+    print(f"{'algorithm':<16}{'cost':>10}{'logins/s':>12}{'p50_ms':>12}{'p95_ms':>12}")
+    for cost, stats in reports.items():
+        print(f"{stats['algorithm']:<16}{cost:>10}{stats['logins_per_s']:>12.2f}"
+              f"{stats['p50_ms']:>12.2f}{stats['p95_ms']:>12.2f}")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark core ProDigi marketplace operations")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="seed a scratch database and time every operation")
+    for name, default in DEFAULTS.items():
+        run_parser.add_argument(f"--{name}", type=int, default=default)
+    run_parser.add_argument("--only", nargs="+", metavar="OPERATION", help="run just these operations")
+    run_parser.add_argument("--profile", choices=storage.PROFILES, default=storage.DEFAULT_PROFILE,
+                            help="storage profile for the scratch database (default %(default)s)")
+    run_parser.add_argument("--out", help="write the JSON report here instead of stdout")
+
+    profiles_parser = commands.add_parser("profiles", help="run the suite under each storage profile side by side")
+    for name, default in DEFAULTS.items():
+        profiles_parser.add_argument(f"--{name}", type=int, default=default)
+    profiles_parser.add_argument("--only", nargs="+", metavar="OPERATION", help="run just these operations")
+    profiles_parser.add_argument("--profiles", nargs="+", choices=storage.PROFILES, metavar="PROFILE",
+                                 help="profiles to compare (default: all)")
+    profiles_parser.add_argument("--metric", default="p50_ms", help="statistic to show (default p50_ms)")
+    profiles_parser.add_argument("--out", help="also write the per-profile JSON reports here")
+
+    passwords_parser = commands.add_parser("passwords", help="logins per second at each password hashing cost")
+    passwords_parser.add_argument("--algorithm", choices=passwords.HASHERS, default=passwords.DEFAULT_ALGORITHM,
+                                  help="password hasher (default %(default)s)")
+    passwords_parser.add_argument("--costs", type=int, nargs="+", metavar="COST",
+                                  help="work factors to try (default: a range around the hasher's default)")
+    passwords_parser.add_argument("--users", type=int, default=20)
+    passwords_parser.add_argument("--logins", type=int, default=40, help="logins timed per cost")
+    passwords_parser.add_argument("--concurrency", type=int, default=4, help="logins in flight at once")
+    passwords_parser.add_argument("--out", help="also write the JSON report here")
+
+    compare_parser = commands.add_parser("compare", help="flag regressions between two JSON reports")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("--threshold", type=float, default=0.10,
+                                help="relative slowdown that counts as a regression (default 0.10 = 10%%)")
+    compare_parser.add_argument("--metric", default="p50_ms", help="statistic to compare (default p50_ms)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.command == "run":
+        sizes = {name: getattr(args, name) for name in DEFAULTS}
+        report = json.dumps(run(sizes, args.only, args.profile), indent=2)
+        if args.out:
+            with open(args.out, "w", encoding="utf-8") as out:
+                out.write(report + "\n")
+        else:
+            print(report)
+        return 0
+    if args.command == "profiles":
+        sizes = {name: getattr(args, name) for name in DEFAULTS}
+        reports = compare_profiles(sizes, args.profiles, args.only)
+        print_profiles(reports, args.metric)
+        if args.out:
+            with open(args.out, "w", encoding="utf-8") as out:
+                json.dump(reports, out, indent=2)
+        return 0
+    if args.command == "passwords":
+        reports = compare_password_costs(args.costs, args.algorithm, args.users, args.logins, args.concurrency)
+        print_password_costs(reports)
+        if args.out:
+            with open(args.out, "w", encoding="utf-8") as out:
+                json.dump(reports, out, indent=2)
+        return 0
+
+    with open(args.baseline, encoding="utf-8") as base, open(args.current, encoding="utf-8") as new:
+        rows = compare(json.load(base), json.load(new), args.threshold, args.metric)
+    print_comparison(rows, args.metric)
+    return 1 if any(row[4] for row in rows) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,398 @@
+import argparse
+import csv
+import json
+import functools
+import math
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import database
+import indexes
+import passwords
+import schema
+import services
+import skill_index
+import storage
+from money import Money
+
+# Bulk loads of users and job postings from CSV or JSONL files, for moving
+# existing clients onto the marketplace. Rows are streamed and validated, user
+# passwords are hashed in a process pool, and each batch is written with
+# executemany in one transaction. A rejected row is reported with its line
+# number and never stops the import.
+#
+#   python bulk_import.py users freelancers.csv
+#   python bulk_import.py jobs jobs.jsonl --defer-indexes --batch-size 5000
+#
+# User columns: username, password, role, name, skills, experience, hourly_rate,
+# payment_method, company_name. Job columns: employer (username) or employer_id,
+# title, description, budget, skills_required, duration, status. Imported jobs
+# were funded before the move, so budgets are not checked against wallets.
+
+DEFAULT_BATCH_SIZE = 1000
+DEFAULT_PROFILE = "bulk-load"
+KINDS = ("users", "jobs")
+FORMATS = ("csv", "jsonl")
+JOB_STATUSES = ("open", "in_progress", "completed")
+MAX_LISTED_ERRORS = 20  # rejected rows kept in the report; all of them are counted
+HASH_CHUNK = 8  # passwords sent to a pool worker at a time; each one is deliberately slow
+
+
+def detect_format(path):
+    """Picks csv or jsonl from the file extension."""
+    extension = os.path.splitext(path)[1].lower()
+    if extension in (".jsonl", ".ndjson"):
+        return "jsonl"
+    if extension == ".csv":
+        return "csv"
+    raise services.ValidationError(f"Can't tell the format of {path}; pass --format csv or jsonl.")
+
+
+def read_rows(handle, fmt):
+    """Yields (line_number, row) from an open CSV or JSONL file, one row at a time.
+
+    A JSONL line that isn't a JSON object is yielded with a ValidationError in
+    place of the row, so the caller can reject it and carry on.
+    """
+    if fmt == "csv":
+        reader = csv.DictReader(handle)
+        for row in reader:
+            yield reader.line_num, row
+        return
+    for number, line in enumerate(handle, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            row = json.loads(line)
+        except json.JSONDecodeError as e:
+            yield number, services.ValidationError(f"Invalid JSON: {e.msg}.")
+            continue
+        yield number, row if isinstance(row, dict) else services.ValidationError("Each line must be a JSON object.")
+
+
+def _text(row, field):
+    value = row.get(field)
+    if value is None:
+        return None
+    value = str(value).strip()
+    return value or None
+
+
+def _required(row, field):
+    value = _text(row, field)
+    if value is None:
+        raise services.ValidationError(f"{field} is required.")
+    return value
+
+
+def validate_user(row):
+    """Checks one user row the way sign_up does. Returns the cleaned fields."""
+    user = {field: _text(row, field) for field in ("name", "skills", "experience", "payment_method", "company_name")}
+    user["username"] = _required(row, "username")
+    user["password"] = _required(row, "password")
+    user["role"] = (_text(row, "role") or "").capitalize()
+    if user["role"] not in services.ROLES:
+        raise services.ValidationError(f"Role must be one of {', '.join(services.ROLES)}.")
+
+    if user["role"] == "Freelancer":
+        try:
+            user["hourly_rate"] = float(_text(row, "hourly_rate"))
+        except (TypeError, ValueError):
+            raise services.ValidationError("Hourly rate must be a number.") from None
+        if not math.isfinite(user["hourly_rate"]):
+            raise services.ValidationError("Hourly rate must be a number.")
+        if user["hourly_rate"] <= 0:
+            raise services.ValidationError("Hourly rate must be greater than zero.")
+        user["company_name"] = None
+    else:
+        user["name"] = user["name"] or "N/A"
+        user["skills"] = user["experience"] = user["hourly_rate"] = user["payment_method"] = None
+    return user
+
+
+def validate_job(row):
+    """Checks one job row. Returns the cleaned fields; the employer is resolved per batch."""
+    job = {field: _required(row, field) for field in ("title", "description", "skills_required", "duration")}
+    job["employer"] = _text(row, "employer")
+    employer_id = _text(row, "employer_id")
+    if job["employer"] is None and employer_id is None:
+        raise services.ValidationError("employer or employer_id is required.")
+    try:
+        job["employer_id"] = int(employer_id) if employer_id is not None else None
+    except ValueError:
+        raise services.ValidationError("employer_id must be a whole number.") from None
+    try:
+        job["budget"] = Money.parse(_required(row, "budget"))
+    except ValueError:
+        raise services.ValidationError("Budget must be a number.") from None
+    if job["budget"] <= 0:
+        raise services.ValidationError("Budget must be greater than zero.")
+    job["status"] = _text(row, "status") or "open"
+    if job["status"] not in JOB_STATUSES:
+        raise services.ValidationError(f"Status must be one of {', '.join(JOB_STATUSES)}.")
+    return job
+
+
+def new_report(kind, path=None, fmt=None):
+    return {"kind": kind, "path": path, "format": fmt, "read": 0, "imported": 0, "rejected": 0, "batches": 0,
+            "errors": [], "hash_s": 0.0, "write_s": 0.0, "index_s": 0.0, "elapsed_s": 0.0, "rows_per_s": 0.0,
+            "started": time.perf_counter()}
+
+
+def _reject(report, line, message):
+    report["rejected"] += 1
+    if len(report["errors"]) < MAX_LISTED_ERRORS:
+        report["errors"].append({"line": line, "message": message})
+
+
+def _batches(rows, batch_size, validate, report):
+    """Validates the stream and yields lists of (line, cleaned row) of up to `batch_size`."""
+    batch = []
+    for line, row in rows:
+        report["read"] += 1
+        try:
+            if isinstance(row, Exception):
+                raise row
+            batch.append((line, validate(row)))
+        except services.ValidationError as e:
+            _reject(report, line, str(e))
+            continue
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _next_id(cursor, table):
+    """First free id of an AUTOINCREMENT table. Call it holding the write lock."""
+    cursor.execute(f"""
+        SELECT MAX(COALESCE((SELECT seq FROM sqlite_sequence WHERE name = ?), 0),
+                   COALESCE((SELECT MAX(id) FROM {table}), 0)) + 1
+    """, (table,))
+    return cursor.fetchone()[0]
+
+
+def _write(conn, report, work):
+    """Runs `work(cursor)` as one write transaction and times it. Returns what `work` returns."""
+    start = time.perf_counter()
+    cursor = conn.cursor()
+    if conn.in_transaction:
+        conn.commit()
+    cursor.execute("BEGIN IMMEDIATE")
+    try:
+        result = work(cursor)
+    except BaseException:
+        conn.rollback()
+        raise
+    conn.commit()
+    report["write_s"] += time.perf_counter() - start
+    return result
+
+
+def _finish_batch(report, progress):
+    report["batches"] += 1
+    elapsed = time.perf_counter() - report["started"]
+    report["elapsed_s"] = round(elapsed, 3)
+    report["rows_per_s"] = round(report["imported"] / elapsed, 1) if elapsed else 0.0
+    if progress:
+        progress(report)
+
+
+def import_users(conn, rows, batch_size=DEFAULT_BATCH_SIZE, executor=None, report=None, progress=None):
+    """Imports (line, row) user rows, each with an empty wallet. Returns the report.
+
+    With an `executor` (e.g. a ProcessPoolExecutor) the password hashes of each
+    batch are computed in parallel.
+    """
+    report = report or new_report("users")
+    cursor = conn.cursor()
+    for batch in _batches(rows, batch_size, validate_user, report):
+        # Usernames already taken, in the database or earlier in this batch. Checked
+        # again under the write lock below; this pass only saves hashing their passwords.
+        usernames = [user["username"] for _, user in batch]
+        taken = {row[0] for row in database.execute_in(cursor, "SELECT username FROM users WHERE username IN ({})",
+                                                       usernames)}
+        users = []
+        for line, user in batch:
+            if user["username"] in taken:
+                _reject(report, line, "Username already taken!")
+            else:
+                taken.add(user["username"])
+                users.append((line, user))
+
+        start = time.perf_counter()
+        # The current setting is passed along: pool workers don't share this process's configuration
+        hash_password = functools.partial(passwords.hash_password, **passwords.current_setting())
+        plain = [user["password"] for _, user in users]
+        if executor is not None:
+            hashes = list(executor.map(hash_password, plain, chunksize=HASH_CHUNK))
+        else:
+            hashes = [hash_password(password) for password in plain]
+        report["hash_s"] += time.perf_counter() - start
+
+        def insert(cursor):
+            # Names another session claimed since the first check; nobody can claim one now
+            claimed = {row[0] for row in database.execute_in(
+                cursor, "SELECT username FROM users WHERE username IN ({})", [user["username"] for _, user in users])}
+            rows = [(line, user, hashed) for (line, user), hashed in zip(users, hashes)
+                    if user["username"] not in claimed]
+            first = _next_id(cursor, "users")
+            ids = range(first, first + len(rows))
+            cursor.executemany("""
+                INSERT INTO users (id, username, password, role, name, skills, experience, hourly_rate,
+                                   payment_method, company_name)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, [(user_id, user["username"], hashed, user["role"], user["name"], user["skills"], user["experience"],
+                   user["hourly_rate"], user["payment_method"], user["company_name"])
+                  for user_id, (_, user, hashed) in zip(ids, rows)])
+            cursor.executemany("INSERT INTO wallet (user_id, balance) VALUES (?, 0)", [(user_id,) for user_id in ids])
+            skill_index.add_skills_many(conn, users={user_id: user["skills"] for user_id, (_, user, _) in zip(ids, rows)
+                                                     if user["role"] == "Freelancer"})
+            return [line for line, user in users if user["username"] in claimed]
+
+        if users:
+            claimed_lines = _write(conn, report, insert)
+            for line in claimed_lines:
+                _reject(report, line, "Username already taken!")
+            report["imported"] += len(users) - len(claimed_lines)
+        _finish_batch(report, progress)
+    return report
+
+
+def import_jobs(conn, rows, batch_size=DEFAULT_BATCH_SIZE, report=None, progress=None):
+    """Imports (line, row) job rows for existing employers. Returns the report."""
+    report = report or new_report("jobs")
+    cursor = conn.cursor()
+    for batch in _batches(rows, batch_size, validate_job, report):
+        usernames = sorted({job["employer"] for _, job in batch if job["employer"] is not None})
+        ids = sorted({job["employer_id"] for _, job in batch if job["employer_id"] is not None})
+        by_username = dict(database.execute_in(
+            cursor, "SELECT username, id FROM users WHERE role = 'Employer' AND username IN ({})", usernames))
+        known_ids = {row[0] for row in database.execute_in(
+            cursor, "SELECT id FROM users WHERE role = 'Employer' AND id IN ({})", ids)}
+
+        jobs = []
+        for line, job in batch:
+            employer_id = by_username.get(job["employer"]) if job["employer"] is not None else job["employer_id"]
+            if employer_id is None or (job["employer"] is None and employer_id not in known_ids):
+                _reject(report, line, f"No employer {job['employer'] or job['employer_id']}.")
+            else:
+                jobs.append((employer_id, job))
+
+        def insert(cursor):
+            first = _next_id(cursor, "jobs")
+            cursor.executemany("""
+                INSERT INTO jobs (id, employer_id, title, description, budget, skills_required, duration, status)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """, [(job_id, employer_id, job["title"], job["description"], job["budget"], job["skills_required"],
+                   job["duration"], job["status"]) for job_id, (employer_id, job) in enumerate(jobs, first)])
+            skill_index.add_skills_many(conn, jobs={job_id: job["skills_required"]
+                                                    for job_id, (_, job) in enumerate(jobs, first)})
+
+        if jobs:
+            _write(conn, report, insert)
+            report["imported"] += len(jobs)
+        _finish_batch(report, progress)
+    return report
+
+
+def print_progress(report):
+    print(f"  {report['kind']}: {report['imported']} imported, {report['rejected']} rejected "
+          f"({report['read']} rows read, {report['rows_per_s']} rows/s)")
+
+
+def run(kind, path, db_path=database.DB_PATH, fmt=None, batch_size=DEFAULT_BATCH_SIZE, defer_indexes=False,
+        workers=None, profile=DEFAULT_PROFILE, progress=None):
+    """Imports a file of users or jobs into `db_path` and returns the JSON-ready report.
+
+    `workers` is the size of the password-hashing pool (None: one per CPU, 0: no
+    pool). With `defer_indexes` the secondary indexes are dropped for the load
+    and built once at the end.
+    """
+    if kind not in KINDS:
+        raise services.ValidationError(f"Kind must be one of {', '.join(KINDS)}.")
+    fmt = fmt or detect_format(path)
+    report = new_report(kind, path, fmt)
+    previous_database, previous_profile = database.current_database(), database.current_profile()
+    database.use_database(db_path, profile)
+    try:
+        with database.connection() as conn:
+            schema.migrate(conn)
+            if defer_indexes:
+                indexes.drop_indexes(conn)
+            try:
+                with open(path, newline="", encoding="utf-8") as handle:
+                    rows = read_rows(handle, fmt)
+                    if kind == "users":
+                        executor = ProcessPoolExecutor(max_workers=workers) if workers != 0 else None
+                        try:
+                            import_users(conn, rows, batch_size, executor, report, progress)
+                        finally:
+                            if executor is not None:
+                                executor.shutdown()
+                    else:
+                        import_jobs(conn, rows, batch_size, report, progress)
+            finally:
+                if defer_indexes:
+                    start = time.perf_counter()
+                    indexes.ensure_indexes(conn)
+                    report["index_s"] = time.perf_counter() - start
+    finally:
+        database.use_database(previous_database, previous_profile)
+
+    elapsed = time.perf_counter() - report.pop("started")
+    report.update(elapsed_s=round(elapsed, 3), rows_per_s=round(report["imported"] / elapsed, 1) if elapsed else 0.0,
+                  hash_s=round(report["hash_s"], 3), write_s=round(report["write_s"], 3),
+                  index_s=round(report["index_s"], 3))
+    return report
+
+
+def print_report(report):
+    print(f"Imported {report['imported']} of {report['read']} {report['kind']} from {report['path']} "
+          f"in {report['elapsed_s']} s ({report['rows_per_s']} rows/s, {report['batches']} batches)")
+    print(f"Hashing: {report['hash_s']} s   writing: {report['write_s']} s   index build: {report['index_s']} s")
+    if report["rejected"]:
+        print(f"\n{report['rejected']} rows rejected:")
+        for error in report["errors"]:
+            print(f"  line {error['line']}: {error['message']}")
+        if report["rejected"] > len(report["errors"]):
+            print(f"  ... and {report['rejected'] - len(report['errors'])} more")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Bulk import ProDigi users or job postings from CSV or JSONL")
+    parser.add_argument("kind", choices=KINDS)
+    parser.add_argument("path", help="the .csv or .jsonl file to import")
+    parser.add_argument("--format", choices=FORMATS, help="file format (default: from the extension)")
+    parser.add_argument("--db", default=database.DB_PATH, help="database file (default %(default)s)")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="rows per transaction")
+    parser.add_argument("--defer-indexes", action="store_true",
+                        help="drop the secondary indexes during the load and rebuild them at the end")
+    parser.add_argument("--workers", type=int, help="password hashing processes (default: one per CPU, 0: none)")
+    parser.add_argument("--profile", choices=storage.PROFILES, default=DEFAULT_PROFILE,
+                        help="storage profile (default %(default)s)")
+    parser.add_argument("--json", metavar="PATH", help="also write the report as JSON")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    try:
+        report = run(args.kind, args.path, args.db, args.format, args.batch_size, args.defer_indexes,
+                     args.workers, args.profile, progress=print_progress)
+    except (services.ValidationError, OSError) as e:
+        print(e)
+        return 1
+    print_report(report)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as out:
+            json.dump(report, out, indent=2)
+    return 1 if report["rejected"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
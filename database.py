@@ -0,0 +1,208 @@
+import sqlite3
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import querylog
+import storage
+
+DB_PATH = "freelancer_marketplace.db"
+
+# Applied once when a connection is opened, not on every borrow (the storage
+# profile's PRAGMAs follow)
+PRAGMAS = (
+    "PRAGMA temp_store = MEMORY",
+)
+
+IN_CHUNK = 500  # values bound in one IN (...) list, well under SQLite's limit on variables
+
+
+class ConnectionPool:
+    """Hands out reusable SQLite connections so each action doesn't pay for a fresh connect."""
+
+    def __init__(self, path=DB_PATH, max_size=8, timeout=30.0, profile=storage.DEFAULT_PROFILE):
+        storage.get_profile(profile)  # fail here, not on the first borrow
+        self.path = path
+        self.profile = profile
+        self.max_size = max_size
+        self.timeout = timeout
+        self._idle = deque()
+        self._opened = 0
+        self._closed = False
+        self._lock = threading.Condition(threading.Lock())
+        self._local = threading.local()
+        self._stats = {"hits": 0, "misses": 0, "waits": 0, "reentrant": 0}
+
+    def _open(self):
+        """Opens a new connection and applies the per-connection PRAGMAs and storage profile."""
+        conn = sqlite3.connect(self.path, check_same_thread=False, factory=querylog.connection_factory())
+        for pragma in PRAGMAS:
+            conn.execute(pragma)
+        storage.apply_profile(conn, self.profile)
+        return conn
+
+    def acquire(self):
+        """Borrows a connection. Nested borrows on the same thread share one connection."""
+        held = getattr(self._local, "conn", None)
+        if held is not None:
+            self._local.depth += 1
+            with self._lock:
+                self._stats["reentrant"] += 1
+            return held
+
+        deadline = time.monotonic() + self.timeout
+        with self._lock:
+            while True:
+                if self._idle:
+                    conn = self._idle.pop()
+                    self._stats["hits"] += 1
+                    break
+                if self._opened < self.max_size:
+                    self._opened += 1
+                    self._stats["misses"] += 1
+                    conn = None
+                    break
+                self._stats["waits"] += 1
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not self._lock.wait(remaining):
+                    raise TimeoutError("Timed out waiting for a database connection.")
+
+        if conn is None:
+            try:
+                conn = self._open()
+            except Exception:
+                with self._lock:
+                    self._opened -= 1
+                    self._lock.notify()
+                raise
+
+        self._local.conn = conn
+        self._local.depth = 1
+        return conn
+
+    def release(self, conn):
+        """Returns a borrowed connection to the pool once the outermost borrow ends."""
+        if getattr(self._local, "conn", None) is not conn:
+            raise ValueError("Connection was not borrowed by this thread.")
+        self._local.depth -= 1
+        if self._local.depth > 0:
+            return
+
+        self._local.conn = None
+        # Never hand an open transaction to the next borrower
+        if conn.in_transaction:
+            conn.rollback()
+        with self._lock:
+            if self._closed:
+                # Borrowed before close_all: nobody will take it from this pool again
+                conn.close()
+                self._opened -= 1
+            else:
+                self._idle.append(conn)
+            self._lock.notify()
+
+    @contextmanager
+    def connection(self):
+        """Context manager that borrows a connection and rolls back on error."""
+        conn = self.acquire()
+        try:
+            yield conn
+        except BaseException:
+            if self._local.depth == 1:
+                conn.rollback()
+            raise
+        finally:
+            self.release(conn)
+
+    def close_all(self):
+        """Closes every idle connection and marks the pool closed, so borrowed ones are closed when returned."""
+        with self._lock:
+            self._closed = True
+            while self._idle:
+                self._idle.pop().close()
+                self._opened -= 1
+
+    def stats(self):
+        """Returns pool hit/miss/wait counters and current sizes."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["idle"] = len(self._idle)
+            stats["open"] = self._opened
+        return stats
+
+
+_pool = None
+_pool_path = DB_PATH
+_pool_profile = storage.DEFAULT_PROFILE
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """Returns the process-wide pool, creating it on first use."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool(_pool_path, profile=_pool_profile)
+    return _pool
+
+
+def connection():
+    """Borrows a connection from the shared pool (use with `with`)."""
+    return get_pool().connection()
+
+
+def pool_stats():
+    """Returns the shared pool's counters."""
+    return get_pool().stats()
+
+
+def reset_pool():
+    """Closes the shared pool so the next borrow opens fresh connections."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close_all()
+        _pool = None
+
+
+def use_database(path, profile=None):
+    """Points the shared pool at another database file (tests, benchmarks, tools)."""
+    global _pool_path
+    reset_pool()
+    _pool_path = path
+    if profile is not None:
+        use_profile(profile)
+
+
+def execute_in(cursor, query, values, params=()):
+    """Runs `query`, whose {} is an IN list, over `values` in IN_CHUNK pieces. Returns all the rows.
+
+    `params` are bound before each chunk, for placeholders ahead of the list.
+    """
+    values = list(values)
+    rows = []
+    for start in range(0, len(values), IN_CHUNK):
+        chunk = values[start:start + IN_CHUNK]
+        cursor.execute(query.format(", ".join("?" * len(chunk))), list(params) + chunk)
+        rows.extend(cursor.fetchall())
+    return rows
+
+
+def current_database():
+    """Path of the database file the shared pool points at."""
+    return _pool_path
+
+
+def current_profile():
+    """Name of the storage profile the shared pool opens connections with."""
+    return _pool_profile
+
+
+def use_profile(name):
+    """Switches the storage profile; connections opened from now on use it."""
+    global _pool_profile
+    storage.get_profile(name)
+    reset_pool()
+    _pool_profile = name
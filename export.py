@@ -0,0 +1,277 @@
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+
+import database
+import schema
+import services
+
+# Streams tables and predefined reports out of the marketplace database for
+# finance and analytics. Rows are read from the cursor `chunk_size` at a time and
+# written straight out, so memory stays flat however large the table is. Money
+# columns are exported as stored, in integer centavos.
+#
+#   python export.py jobs --format jsonl --out jobs.jsonl
+#   python export.py ledger --since-last          # only entries added since the last run
+#   python export.py --list
+#
+# Incremental exports are keyed on a source's row id: the highest id written is
+# saved in a watermark file and the next --since-last export starts after it.
+# Only sources that grow by appending (ledger, applications, milestones) have a
+# key: a watermark would silently miss rows updated in place, so tables like
+# wallet or jobs are full exports only.
+
+DEFAULT_CHUNK_SIZE = 5000
+DEFAULT_PROFILE = "read-heavy"
+DEFAULT_STATE = "export_watermarks.json"
+FORMATS = ("csv", "jsonl", "parquet")
+
+# Tables that can be exported as they are, with the id incremental exports key on
+# (None: full exports only). Columns listed in EXCLUDED_COLUMNS never leave the database.
+TABLES = {
+    "users": None,
+    "wallet": None,
+    "jobs": None,
+    "job_applications": "id",
+    "milestones": "id",
+    "payments": "id",
+    "escrow_accounts": None,
+    "job_budget_summary": None,
+    "ledger_transfers": "id",
+    "ledger_entries": "id",
+}
+EXCLUDED_COLUMNS = {"users": ("password",)}
+
+# Predefined reports: (query, key column of its result, description)
+REPORTS = {
+    "wallet_balances": ("""
+        SELECT u.id AS user_id, u.username, u.role, w.balance
+        FROM users u JOIN wallet w ON w.user_id = u.id
+    """, None, "every user's wallet balance"),
+    "job_budgets": ("""
+        SELECT j.id AS job_id, j.employer_id, j.title, j.status,
+               s.budget, s.allocated, s.approved, s.remaining
+        FROM jobs j JOIN job_budget_summary s ON s.job_id = j.id
+    """, None, "budget, allocated, approved and remaining per job"),
+    "milestone_payments": ("""
+        SELECT m.id AS milestone_id, m.job_id, j.employer_id, m.freelancer_id, m.title, m.status, m.payment
+        FROM milestones m JOIN jobs j ON j.id = m.job_id
+    """, "milestone_id", "milestones with their job's employer"),
+    "ledger": ("""
+        SELECT e.id AS entry_id, t.id AS transfer_id, t.created_at, t.kind, t.memo,
+               e.account_type, e.account_id, e.freelancer_id, e.amount, e.balance_after
+        FROM ledger_entries e JOIN ledger_transfers t ON t.id = e.transfer_id
+    """, "entry_id", "ledger entries with their transfer"),
+}
+
+
+def sources():
+    """Returns {name: description} for every table and report that can be exported."""
+    listed = {name: f"table ({'incremental' if key else 'full only'})" for name, key in TABLES.items()}
+    listed.update({name: f"report: {description}" for name, (_, _, description) in REPORTS.items()})
+    return listed
+
+
+def _source_key(source):
+    """Returns the column incremental exports of `source` key on, None for full-only and unknown sources."""
+    return REPORTS[source][1] if source in REPORTS else TABLES.get(source)
+
+
+def _source_query(cursor, source):
+    """Returns (query, key column or None) for a table or report."""
+    if source in REPORTS:
+        query, key, _ = REPORTS[source]
+        return query, key
+    if source not in TABLES:
+        raise services.ValidationError(f"Unknown export source {source!r}; see --list.")
+    cursor.execute(f"PRAGMA table_info({source})")
+    excluded = EXCLUDED_COLUMNS.get(source, ())
+    columns = [row[1] for row in cursor.fetchall() if row[1] not in excluded]
+    if not columns:
+        raise services.ValidationError(f"Table {source} does not exist in this database.")
+    return f"SELECT {', '.join(columns)} FROM {source}", TABLES[source]
+
+
+def stream_rows(conn, source, since=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Yields the source's column names, then its rows in lists of up to `chunk_size`.
+
+    With `since` only rows whose key is greater are read, in key order.
+    """
+    cursor = conn.cursor()
+    query, key = _source_query(cursor, source)
+    if since is not None and key is None:
+        raise services.ValidationError(f"{source} has no row id to export incrementally.")
+    if key is None:
+        cursor.execute(query)
+    else:
+        cursor.execute(f"SELECT * FROM ({query}) WHERE {key} > ? ORDER BY {key}", (since or 0,))
+    yield [column[0] for column in cursor.description]
+    while True:
+        chunk = cursor.fetchmany(chunk_size)
+        if not chunk:
+            break
+        yield chunk
+
+
+def _write_csv(path, columns, chunks):
+    with open(path, "w", newline="", encoding="utf-8") as out:
+        writer = csv.writer(out)
+        writer.writerow(columns)
+        for chunk in chunks:
+            writer.writerows(chunk)
+
+
+def _write_jsonl(path, columns, chunks):
+    with open(path, "w", encoding="utf-8") as out:
+        for chunk in chunks:
+            out.writelines(json.dumps(dict(zip(columns, row))) + "\n" for row in chunk)
+
+
+def _write_parquet(path, columns, chunks):
+    """One Parquet row group per chunk. Needs pyarrow, which only this format uses."""
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise services.ValidationError("Parquet export needs pyarrow (pip install pyarrow).") from None
+
+    writer = None
+    try:
+        for chunk in chunks:
+            data = {column: [row[index] for row in chunk] for index, column in enumerate(columns)}
+            if writer is None:
+                # Column types come from the first chunk; a column that is all NULL there is text
+                inferred = pa.Table.from_pydict(data).schema
+                arrow_schema = pa.schema([pa.field(field.name, pa.string() if pa.types.is_null(field.type) else field.type)
+                                          for field in inferred])
+                writer = pq.ParquetWriter(path, arrow_schema)
+            writer.write_table(pa.Table.from_pydict(data, schema=writer.schema))
+        if writer is None:
+            writer = pq.ParquetWriter(path, pa.schema([pa.field(column, pa.string()) for column in columns]))
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+WRITERS = {"csv": _write_csv, "jsonl": _write_jsonl, "parquet": _write_parquet}
+
+
+def export(conn, source, path, fmt="csv", since=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Writes one source to `path`. Returns {"source", "rows", "last_id", ...}.
+
+    The file is written under a temporary name and moved into place when
+    complete, so a failed export never leaves a partial file behind.
+    """
+    if fmt not in WRITERS:
+        raise services.ValidationError(f"Format must be one of {', '.join(FORMATS)}.")
+    started = time.perf_counter()
+    stream = stream_rows(conn, source, since, chunk_size)
+    columns = next(stream)
+    key = _source_key(source)
+    key_index = columns.index(key) if key in columns else None
+    summary = {"source": source, "path": path, "format": fmt, "since": since, "rows": 0, "last_id": since}
+
+    def counted(chunks):
+        for chunk in chunks:
+            summary["rows"] += len(chunk)
+            if key_index is not None:
+                summary["last_id"] = chunk[-1][key_index]
+            yield chunk
+
+    partial = f"{path}.partial"
+    try:
+        WRITERS[fmt](partial, columns, counted(stream))
+    except BaseException:
+        if os.path.exists(partial):
+            os.remove(partial)
+        raise
+    os.replace(partial, path)
+    summary["elapsed_s"] = round(time.perf_counter() - started, 3)
+    summary["rows_per_s"] = round(summary["rows"] / summary["elapsed_s"], 1) if summary["elapsed_s"] else 0.0
+    return summary
+
+
+def load_watermarks(state_path):
+    """Returns {source: last exported id} from the watermark file, empty if there is none yet."""
+    try:
+        with open(state_path, encoding="utf-8") as state:
+            return json.load(state)
+    except FileNotFoundError:
+        return {}
+
+
+def save_watermark(state_path, source, last_id):
+    watermarks = load_watermarks(state_path)
+    watermarks[source] = last_id
+    partial = f"{state_path}.partial"
+    with open(partial, "w", encoding="utf-8") as state:
+        json.dump(watermarks, state, indent=2)
+    os.replace(partial, state_path)
+
+
+def run(source, path=None, db_path=database.DB_PATH, fmt="csv", since=None, since_last=False,
+        state_path=DEFAULT_STATE, chunk_size=DEFAULT_CHUNK_SIZE, profile=DEFAULT_PROFILE):
+    """Exports a source from `db_path`, resuming after the saved watermark with `since_last`.
+
+    The watermark is advanced only after the file is complete. Returns the summary.
+    """
+    if since_last:
+        if source in sources() and _source_key(source) is None:
+            raise services.ValidationError(f"{source} has no row id to export incrementally.")
+        since = load_watermarks(state_path).get(source, since)
+    path = path or f"{source}.{fmt}"
+    previous_database, previous_profile = database.current_database(), database.current_profile()
+    database.use_database(db_path, profile)
+    try:
+        with database.connection() as conn:
+            schema.migrate(conn)
+            summary = export(conn, source, path, fmt, since, chunk_size)
+    finally:
+        database.use_database(previous_database, previous_profile)
+    if since_last and summary["last_id"] is not None:
+        save_watermark(state_path, source, summary["last_id"])
+    return summary
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Export ProDigi tables and reports to CSV, JSONL or Parquet")
+    parser.add_argument("source", nargs="?", help="table or report to export (see --list)")
+    parser.add_argument("--list", action="store_true", help="list the tables and reports that can be exported")
+    parser.add_argument("--format", choices=FORMATS, default="csv", help="output format (default %(default)s)")
+    parser.add_argument("--out", help="output file (default SOURCE.FORMAT)")
+    parser.add_argument("--db", default=database.DB_PATH, help="database file (default %(default)s)")
+    parser.add_argument("--since", type=int, metavar="ID", help="only rows with an id greater than this")
+    parser.add_argument("--since-last", action="store_true",
+                        help="only rows added since the last --since-last export of this source")
+    parser.add_argument("--state", default=DEFAULT_STATE, help="watermark file (default %(default)s)")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="rows fetched at a time")
+    args = parser.parse_args(argv)
+    if not args.list and not args.source:
+        parser.error("a source is required unless --list is given")
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.list:
+        for name, description in sources().items():
+            print(f"{name:<22}{description}")
+        return 0
+    try:
+        summary = run(args.source, args.out, args.db, args.format, args.since, args.since_last,
+                      args.state, args.chunk_size)
+    except services.ValidationError as e:
+        print(e)
+        return 1
+    print(f"Exported {summary['rows']} rows of {summary['source']} to {summary['path']} "
+          f"in {summary['elapsed_s']} s ({summary['rows_per_s']} rows/s)")
+    if args.since_last:
+        print(f"Watermark for {summary['source']}: {summary['last_id']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
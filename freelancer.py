@@ -1,34 +1,35 @@
-import os
 import time
-from payment_system import Wallet
 from user import User
-import sqlite3
+import database
+import job_search
+import skill_index
+import recommender
+import services
+import session
+from money import Money
 from utils import Utility
 
 class Freelancer(User):
     def __init__(self, id, username, password, role, name=None, skills=None, experience=None, hourly_rate=None, payment_method=None, company_name=None):
         super().__init__(id, username, password, role)  # Pass common attributes to the parent class
         self.name = name
-        self.skills = skills.split(", ") if skills else []
+        self.skills = skill_index.split_skills(skills)
         self.experience = experience
         self.hourly_rate = hourly_rate
         self.payment_method = payment_method
-        self.wallet = Wallet(id)
 
-    def browse_jobs(self):
-        """Fetch and display all available jobs, excluding those in progress."""
+    def browse_jobs(self, page_size=job_search.DEFAULT_PAGE_SIZE):
+        """Display open jobs one page at a time, excluding those in progress."""
+        # Keyset pagination: remember the last id before each visited page, never an OFFSET
+        page_starts = [0]
+
         while True:
-            conn = sqlite3.connect("freelancer_marketplace.db")
-            cursor = conn.cursor()
-
-            # Fetch only jobs that are still open
-            cursor.execute("""
-                SELECT id, title, description, budget, skills_required, duration
-                FROM jobs
-                WHERE status = 'open'  -- Only fetch jobs that are not in progress
-            """)
-            jobs = cursor.fetchall()
-            conn.close()
+            jobs, has_next = job_search.open_jobs_page(page_starts[-1], page_size)
+
+            if not jobs and len(page_starts) > 1:
+                # The page emptied out (its jobs were taken), step back
+                page_starts.pop()
+                continue
 
             if not jobs:
                 Utility.clear_screen()
@@ -40,75 +41,159 @@ class Freelancer(User):
 
             # Display available jobs
             Utility.clear_screen()
-            Utility.display_header("Available Jobs")
-            for index, job in enumerate(jobs):
-                job_id, title, description, budget, skills_required, duration = job
-                print(f"[{job_id}] Title: {title}")
-                print(f"    Description: {description}")
-                print(f"    Budget: ${budget}")
-                print(f"    Skills Required: {skills_required}")
-                print(f"    Duration: {duration}")
+            Utility.display_header(f"Available Jobs - Page {len(page_starts)}")
+            self._display_jobs(jobs)
 
-                # Only print divider if it's not the last job
-                if index < len(jobs) - 1:
-                    Utility.divider()
-
-            choice = Utility.display_menu("Options", ["Apply Job", "Back"], use_header=False)
+            choice = Utility.display_menu("Options", ["Apply Job", "Search Jobs", "Jobs Matching My Skills", "Recommended Jobs", "Next Page", "Previous Page", "Back"], use_header=False)
 
             if choice == "1":
                 self.apply_job()
             elif choice == "2":
+                self.search_jobs()
+            elif choice == "3":
+                self.view_matching_jobs()
+            elif choice == "4":
+                self.view_recommended_jobs()
+            elif choice == "5":
+                if has_next:
+                    page_starts.append(jobs[-1][0])
+                else:
+                    print("\nYou are on the last page.")
+                    time.sleep(1.5)
+            elif choice == "6":
+                if len(page_starts) > 1:
+                    page_starts.pop()
+                else:
+                    print("\nYou are on the first page.")
+                    time.sleep(1.5)
+            elif choice == "7":
                 print("Returning to freelancer dashboard...")
                 break
             else:
                 print("\nInvalid choice. Please try again!")
                 time.sleep(1.5)
 
+    def _display_jobs(self, jobs):
+        """Prints a list of job rows (id, title, description, budget, skills, duration)."""
+        for index, job in enumerate(jobs):
+            job_id, title, description, budget, skills_required, duration = job
+            print(f"[{job_id}] Title: {title}")
+            print(f"    Description: {description}")
+            print(f"    Budget: ${Money(budget)}")
+            print(f"    Skills Required: {skills_required}")
+            print(f"    Duration: {duration}")
+
+            # Only print divider if it's not the last job
+            if index < len(jobs) - 1:
+                Utility.divider()
+
+    def search_jobs(self):
+        """Keyword search over open jobs, ranked by relevance and shown a page at a time."""
+        keywords = input("Enter keywords (title, description or skills): ").strip()
+        page = 1
+
+        while True:
+            jobs = job_search.search_jobs(keywords, page=page)
+
+            Utility.clear_screen()
+            Utility.display_header(f"Results for '{keywords}'")
+            if not jobs:
+                print("\nNo matching jobs found." if page == 1 else "\nNo more results.")
+                Utility.divider()
+            else:
+                print(f"Page {page}")
+                Utility.divider()
+                self._display_jobs(jobs)
+                Utility.divider()
+
+            choice = input("[N]ext page, [P]revious page, [A]pply, [B]ack: ").strip().lower()
+
+            if choice == "n" and len(jobs) == job_search.DEFAULT_PAGE_SIZE:
+                page += 1
+            elif choice == "p" and page > 1:
+                page -= 1
+            elif choice == "a":
+                self.apply_job()
+            elif choice == "b":
+                break
+
+    def view_matching_jobs(self):
+        """Shows open jobs that share the most skills with this freelancer's profile."""
+        jobs = skill_index.matching_jobs(", ".join(self.skills))
+
+        Utility.clear_screen()
+        Utility.display_header("Jobs Matching My Skills")
+        if not jobs:
+            print("\nNo open jobs match your skills yet.")
+        for job_id, title, budget, skills_required, shared in jobs:
+            print(f"[{job_id}] {title}")
+            print(f"    Budget: ${Money(budget)}")
+            print(f"    Skills Required: {skills_required} ({shared} matching)")
+            Utility.divider()
+
+        choice = input("[A]pply or press Enter to Return: ").strip().lower()
+        if choice == "a":
+            self.apply_job()
+
+    def view_recommended_jobs(self):
+        """Shows open jobs ranked by skill overlap, budget against hourly rate, and duration."""
+        jobs = recommender.recommend_jobs(self.id)
+
+        Utility.clear_screen()
+        Utility.display_header("Recommended Jobs")
+        if not jobs:
+            print("\nNo jobs available at the moment.")
+        for job_id, title, budget, duration, score in jobs:
+            print(f"[{job_id}] {title}")
+            print(f"    Budget: ${Money(budget)}  Duration: {duration}  Fit: {score:.0%}")
+            Utility.divider()
+
+        choice = input("[A]pply or press Enter to Return: ").strip().lower()
+        if choice == "a":
+            self.apply_job()
+
     # Function to apply for a job
     def apply_job(self):
         """Apply for a job based on the job title."""
         job_title = input("Enter the job title you want to apply for: ").strip()
 
-        conn = sqlite3.connect("freelancer_marketplace.db")
-        cursor = conn.cursor()
-
-        # Find the job ID based on the title
-        cursor.execute("SELECT id FROM jobs WHERE title LIKE ?", ('%' + job_title + '%',))
-        job = cursor.fetchone()
+        # Rank open jobs by how well they match instead of taking an arbitrary LIKE hit
+        matches = job_search.search_jobs(job_title, page_size=5)
 
-        if not job:
+        if not matches:
             print("Job not found. Please try again.")
             Utility.divider()
-        else:
-            job_id = job[0]
+            input("Press Enter to Return...")
+            return
 
-            # Insert application into the database
-            cursor.execute("""
-                INSERT INTO job_applications (job_id, freelancer_id, status)
-                VALUES (?, ?, 'applied')
-            """, (job_id, self.id))
+        exact = [job for job in matches if job[1].lower() == job_title.lower()]
+        if len(matches) == 1 or len(exact) == 1:
+            job_id, title = (exact or matches)[0][:2]
+        else:
+            print("\nSeveral jobs match:")
+            for match in matches:
+                print(f"[{match[0]}] {match[1]}")
+            Utility.divider()
+            selected = input("Enter the Job ID to apply for: ").strip()
+            job = next((match for match in matches if str(match[0]) == selected), None)
+            if not job:
+                print("Invalid Job ID.")
+                input("Press Enter to Return...")
+                return
+            job_id, title = job[:2]
 
-            conn.commit()
-            print(f"\nApplied for '{job_title}' successfully!\n")
+        try:
+            services.apply_job(self.id, job_id)
+        except services.ServiceError as e:
+            print(f"\n{e}\n")
+        else:
+            print(f"\nApplied for '{title}' successfully!\n")
 
-        conn.close()
         input("Press Enter to Return...")  # Prevents instant return
        
     def track_applications(self):
         """Fetch and display job applications for the freelancer."""
-        conn = sqlite3.connect("freelancer_marketplace.db")
-        cursor = conn.cursor()
-
-        # Fetch applications submitted by this freelancer
-        cursor.execute("""
-            SELECT ja.id, j.title, j.budget, ja.status
-            FROM job_applications ja
-            JOIN jobs j ON ja.job_id = j.id
-            WHERE ja.freelancer_id = ?
-        """, (self.id,))
-       
-        applications = cursor.fetchall()
-        conn.close()
+        applications = services.list_applications(self.id)
 
         if not applications:
             print("\nYou have not applied to any jobs yet.")
@@ -120,7 +205,7 @@ class Freelancer(User):
         for app_id, title, budget, status in applications:
             print(f"Application ID: {app_id}")
             print(f"Job Title: {title}")
-            print(f"Budget: ${budget}")
+            print(f"Budget: ${Money(budget)}")
             print(f"Status: {status}")
             Utility.divider()
        
@@ -128,64 +213,30 @@ class Freelancer(User):
 
     def submit_milestone(self, milestone_title):
         """Submits a milestone for approval based on the provided milestone title."""
-
-        conn = sqlite3.connect("freelancer_marketplace.db")
-        cursor = conn.cursor()
-
-        # 🔍 Fetch milestone based on the provided title
-        cursor.execute('''
-            SELECT job_id, status FROM milestones
-            WHERE freelancer_id = ? AND title = ?
-        ''', (self.id, milestone_title))
-
-        milestone = cursor.fetchone()
-
-        if not milestone:
-            print(f"Error: Milestone '{milestone_title}' not found or does not belong to you.")
-            time.sleep(1.5)
-            conn.close()
-            return
-
-        job_id, status = milestone
-
-        print(f"DEBUG: Found milestone '{milestone_title}' with status '{status}'")  # Debugging
-
-        if status == "approved":
-            print("This milestone has already been approved.")
-        elif status == "for approval":
-            print("This milestone is already waiting for employer approval.")
+        try:
+            services.submit_milestone(self.id, milestone_title)
+        except services.NotFoundError as e:
+            print(f"Error: {e}")
+        except services.ConflictError as e:
+            print(e)
         else:
-            # Update status to "for approval"
-            cursor.execute('''
-                UPDATE milestones
-                SET status = 'for approval'
-                WHERE job_id = ? AND freelancer_id = ? AND title = ?
-            ''', (job_id, self.id, milestone_title))
-
-            conn.commit()
             print(f"Submitting '{milestone_title}' for approval...")
 
         time.sleep(1.5)
-        conn.close()
 
     def view_and_edit_profile(self):
         """View and edit freelancer profile."""
-       
-        conn = sqlite3.connect("freelancer_marketplace.db")
-        cursor = conn.cursor()
+        if self.session is None:
+            session.Session().track(self)
 
-        # Fetch current profile details from the database
-        cursor.execute("SELECT name, skills, experience, hourly_rate, payment_method FROM users WHERE username = ?", (self.username,))
-        profile = cursor.fetchone()
-
-        if not profile:
+        # The profile loaded at login, reloaded only if it changed elsewhere since
+        if self.session.get(self.id) is not self:
             print("Error: Profile not found.")
             time.sleep(1.5)
-            conn.close()
             return
 
-        # Unpacking profile details
-        name, skills, experience, hourly_rate, payment_method = profile
+        name, skills, experience = self.name, ", ".join(self.skills), self.experience
+        hourly_rate, payment_method = self.hourly_rate, self.payment_method
 
         # Display current profile details
         Utility.clear_screen()
@@ -199,41 +250,36 @@ class Freelancer(User):
         Utility.divider()
         choice = input("Select field to edit [1-5] or [6] to go back: ").strip()
 
-        # Editing selected field
+        # Editing selected field (a connection is only borrowed once the new value is known)
         if choice == "1":
             new_name = input("Enter new name: ").strip()
-            cursor.execute("UPDATE users SET name = ? WHERE username = ?", (new_name, self.username))
-            self.name = new_name  # Update object attribute
+            with database.connection() as conn:
+                self.update_name(new_name, conn)
         elif choice == "2":
             new_skills = input("Enter new skills (comma separated): ").strip()
-            cursor.execute("UPDATE users SET skills = ? WHERE username = ?", (new_skills, self.username))
-            self.skills = new_skills  # Update object attribute
+            with database.connection() as conn:
+                self.update_skills(new_skills, conn)
         elif choice == "3":
             new_experience = input("Enter new experience: ").strip()
-            cursor.execute("UPDATE users SET experience = ? WHERE username = ?", (new_experience, self.username))
-            self.experience = new_experience  # Update object attribute
+            with database.connection() as conn:
+                self.update_experience(new_experience, conn)
         elif choice == "4":
             try:
                 new_hourly_rate = float(input("Enter new hourly rate: ").strip())
-                cursor.execute("UPDATE users SET hourly_rate = ? WHERE username = ?", (new_hourly_rate, self.username))
-                self.hourly_rate = new_hourly_rate  # Update object attribute
+                with database.connection() as conn:
+                    self.update_hourly_rate(new_hourly_rate, conn)
             except ValueError:
                 print("Invalid input. Hourly rate must be a number.")
         elif choice == "5":
             new_payment_method = input("Enter new payment method: ").strip()
-            cursor.execute("UPDATE users SET payment_method = ? WHERE username = ?", (new_payment_method, self.username))
-            self.payment_method = new_payment_method  # Update object attribute
+            with database.connection() as conn:
+                self.update_payment_method(new_payment_method, conn)
         elif choice == "6":
             print("Returning to the main menu.")
-            conn.close()
             return
         else:
             print("\nInvalid choice. Please select a valid option.")
             time.sleep(1.5)
-
-        # Commit changes and close connection
-        conn.commit()
-        conn.close()
        
         print("\nProfile updated successfully!")
         time.sleep(1.5)
@@ -241,38 +287,44 @@ class Freelancer(User):
     def update_name(self, new_name, conn):
         """Update the freelancer's name in the database and the instance."""
         cursor = conn.cursor()
-        cursor.execute("UPDATE users SET name = ? WHERE username = ?", (new_name, self.username))
+        cursor.execute("UPDATE users SET name = ? WHERE id = ?", (new_name, self.id))
         conn.commit()
         self.name = new_name
+        session.profile_written(self)
 
     def update_hourly_rate(self, new_rate, conn):
         """Update the freelancer's hourly rate in the database and the instance."""
         if not isinstance(new_rate, (int, float)) or new_rate <= 0:
             raise ValueError("Hourly rate must be a positive number.")
         cursor = conn.cursor()
-        cursor.execute("UPDATE users SET hourly_rate = ? WHERE username = ?", (new_rate, self.username))
+        cursor.execute("UPDATE users SET hourly_rate = ? WHERE id = ?", (new_rate, self.id))
         conn.commit()
         self.hourly_rate = new_rate
+        session.profile_written(self)
 
     def update_skills(self, new_skills, conn):
         """Update the freelancer's skills in the database and the instance."""
         if not isinstance(new_skills, str):
             raise ValueError("Skills must be a comma-separated string.")
         cursor = conn.cursor()
-        cursor.execute("UPDATE users SET skills = ? WHERE username = ?", (new_skills, self.username))
+        cursor.execute("UPDATE users SET skills = ? WHERE id = ?", (new_skills, self.id))
+        skill_index.set_user_skills(conn, self.id, new_skills)
         conn.commit()
-        self.skills = new_skills.split(", ")
+        self.skills = skill_index.split_skills(new_skills)
+        session.profile_written(self)
 
     def update_experience(self, new_experience, conn):
         """Update the freelancer's experience in the database and the instance."""
         cursor = conn.cursor()
-        cursor.execute("UPDATE users SET experience = ? WHERE username = ?", (new_experience, self.username))
+        cursor.execute("UPDATE users SET experience = ? WHERE id = ?", (new_experience, self.id))
         conn.commit()
         self.experience = new_experience
+        session.profile_written(self)
 
     def update_payment_method(self, new_payment_method, conn):
         """Update the freelancer's payment method in the database and the instance."""
         cursor = conn.cursor()
-        cursor.execute("UPDATE users SET payment_method = ? WHERE username = ?", (new_payment_method, self.username))
+        cursor.execute("UPDATE users SET payment_method = ? WHERE id = ?", (new_payment_method, self.id))
         conn.commit()
-        self.payment_method = new_payment_method
\ No newline at end of file
+        self.payment_method = new_payment_method
+        session.profile_written(self)
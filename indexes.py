@@ -0,0 +1,126 @@
+import database
+import session
+from utils import Utility
+
+# Secondary indexes for the access paths used by the CLI, as (name, table, columns)
+INDEXES = (
+    ("idx_jobs_status", "jobs", "status"),
+    ("idx_jobs_employer_status", "jobs", "employer_id, status"),
+    ("idx_jobs_employer_title", "jobs", "employer_id, title"),
+    ("idx_job_applications_job_status", "job_applications", "job_id, status"),
+    ("idx_job_applications_freelancer", "job_applications", "freelancer_id"),
+    ("idx_milestones_title", "milestones", "title"),
+    ("idx_milestones_job_status", "milestones", "job_id, status"),
+    ("idx_milestones_freelancer_title", "milestones", "freelancer_id, title"),
+)
+
+# Every query the application ships with, paired with sample parameters for EXPLAIN
+SHIPPED_QUERIES = {
+    "User.sign_up": (
+        "SELECT username FROM users WHERE username = ?", ("user",)),
+    "User.login": (
+        f"SELECT id, username, password, role, {', '.join(session.PROFILE_COLUMNS)}, profile_version "
+        "FROM users WHERE username = ?", ("user",)),
+    "Wallet.get_balance_from_db": (
+        "SELECT balance FROM wallet WHERE user_id = ?", (1,)),
+    "Freelancer.browse_jobs": (
+        "SELECT id, title, description, budget, skills_required, duration FROM jobs "
+        "WHERE status = 'open' AND id > ? ORDER BY id LIMIT ?", (0, 11)),
+    "Freelancer.apply_job": (
+        "SELECT 1 FROM job_applications WHERE job_id = ? AND freelancer_id = ?", (1, 1)),
+    "Freelancer.search_jobs": (
+        "SELECT j.id, j.title, j.description, j.budget, j.skills_required, j.duration FROM jobs_fts "
+        "JOIN jobs j ON j.id = jobs_fts.rowid WHERE jobs_fts MATCH ? AND j.status = ? "
+        "ORDER BY bm25(jobs_fts, 10.0, 1.0, 5.0), j.id LIMIT ? OFFSET ?", ('"title"*', "open", 10, 0)),
+    "Freelancer.track_applications": (
+        "SELECT ja.id, j.title, j.budget, ja.status FROM job_applications ja "
+        "JOIN jobs j ON ja.job_id = j.id WHERE ja.freelancer_id = ?", (1,)),
+    "Freelancer.submit_milestone": (
+        "SELECT job_id, status FROM milestones WHERE freelancer_id = ? AND title = ?", (1, "title")),
+    "Freelancer.view_and_edit_profile": (
+        f"SELECT id, username, role, {', '.join(session.PROFILE_COLUMNS)}, profile_version FROM users WHERE id = ?",
+        (1,)),
+    "Freelancer.view_and_edit_profile (version)": (
+        "SELECT profile_version FROM users WHERE id = ?", (1,)),
+    "Employer.view_applicants (job)": (
+        "SELECT id FROM jobs WHERE title = ? AND employer_id = ?", ("title", 1)),
+    "Employer.view_applicants (applicants)": (
+        "SELECT u.id, u.name, u.skills, u.experience, u.hourly_rate, ja.id FROM users u "
+        "JOIN job_applications ja ON u.id = ja.freelancer_id WHERE ja.job_id = ? AND ja.status = 'applied'", (1,)),
+    "Employer.decide_application": (
+        "SELECT ja.job_id FROM job_applications ja JOIN jobs j ON j.id = ja.job_id "
+        "WHERE ja.id = ? AND j.employer_id = ?", (1, 1)),
+    "Employer.add_milestone": (
+        "SELECT freelancer_id FROM job_applications WHERE job_id = ? AND status = 'accepted'", (1,)),
+    "Employer.approve_milestone": (
+        "SELECT m.id, m.payment, m.freelancer_id, m.job_id, m.status FROM milestones m "
+        "JOIN jobs j ON j.id = m.job_id WHERE m.title = ? AND j.employer_id = ?", ("title", 1)),
+    "Employer.approve_milestones": (
+        "SELECT m.id, m.job_id, m.freelancer_id, m.payment, m.status FROM milestones m "
+        "JOIN jobs j ON j.id = m.job_id WHERE j.employer_id = ? AND m.id IN (?, ?)", (1, 1, 2)),
+    "Employer.approve_milestone (remaining)": (
+        "SELECT DISTINCT job_id FROM milestones WHERE status != 'approved' AND job_id IN (?)", (1,)),
+    "Employer.finalize_payment": (
+        "SELECT balance FROM escrow_accounts WHERE job_id = ? AND freelancer_id = ?", (1, 1)),
+    "ledger escrow release": (
+        "UPDATE escrow_accounts SET balance = balance - ?, released = released + ? "
+        "WHERE job_id = ? AND freelancer_id = ? AND balance >= ? RETURNING balance", (1, 1, 1, 1, 1)),
+    "progress_display (escrow)": (
+        "SELECT COALESCE(SUM(balance), 0), COALESCE(SUM(funded), 0), COALESCE(SUM(released), 0) "
+        "FROM escrow_accounts WHERE job_id = ?", (1,)),
+    "ledger debit": (
+        "UPDATE wallet SET balance = balance - ? WHERE user_id = ? AND balance >= ? RETURNING balance", (1, 1, 1)),
+    "Employer.view_posted_jobs": (
+        "SELECT id, title, description, budget, skills_required, duration, status FROM jobs WHERE employer_id = ?", (1,)),
+    "select_job (freelancer)": (
+        "SELECT j.id, j.title FROM jobs j JOIN job_applications ja ON j.id = ja.job_id "
+        "WHERE ja.freelancer_id = ? AND j.status = 'in_progress'", (1,)),
+    "select_job (employer)": (
+        "SELECT id, title FROM jobs WHERE employer_id = ? AND status IN ('in_progress', 'completed')", (1,)),
+    "progress_display (budget)": (
+        "SELECT budget, allocated, approved, remaining FROM job_budget_summary WHERE job_id = ?", (1,)),
+    "progress_display (job)": (
+        "SELECT title, description, status FROM jobs WHERE id = ?", (1,)),
+    "progress_display (milestones)": (
+        "SELECT id, title, payment, status FROM milestones WHERE job_id = ?", (1,)),
+    "progress_display (freelancer's milestones)": (
+        "SELECT id, title, payment, status FROM milestones WHERE job_id = ? AND freelancer_id = ?", (1, 1)),
+}
+
+
+def ensure_indexes(conn):
+    """Creates any missing secondary indexes. Safe to run on every startup."""
+    cursor = conn.cursor()
+    for name, table, columns in INDEXES:
+        cursor.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({columns})")
+        # One index per transaction: the write lock is released between builds
+        conn.commit()
+
+
+def drop_indexes(conn):
+    """Drops the secondary indexes, e.g. before a bulk load; ensure_indexes puts them back."""
+    cursor = conn.cursor()
+    for name, _, _ in INDEXES:
+        cursor.execute(f"DROP INDEX IF EXISTS {name}")
+    conn.commit()
+
+
+def explain_queries():
+    """Returns (name, plan lines) for every shipped query."""
+    plans = []
+    with database.connection() as conn:
+        cursor = conn.cursor()
+        for name, (query, params) in SHIPPED_QUERIES.items():
+            cursor.execute("EXPLAIN QUERY PLAN " + query, params)
+            plans.append((name, [row[3] for row in cursor.fetchall()]))
+    return plans
+
+
+def print_query_plans():
+    """Prints the EXPLAIN QUERY PLAN output of every shipped query."""
+    Utility.display_header("Query Plans")
+    for name, plan in explain_queries():
+        print(name)
+        for line in plan:
+            print(f"    {line}")
+        Utility.divider()
@@ -0,0 +1,137 @@
+from money import Money
+
+# Per-job budget totals kept up to date by triggers on `jobs` and `milestones`,
+# so showing a job's allocated, approved and remaining budget is one primary-key
+# lookup instead of a SUM over its milestones. check_budget_summary() compares
+# the table with the milestones it is derived from and can rebuild it.
+BUDGET_SCHEMA = (
+    '''
+    CREATE TABLE IF NOT EXISTS job_budget_summary (
+        job_id INTEGER PRIMARY KEY,
+        budget INTEGER NOT NULL DEFAULT 0,
+        allocated INTEGER NOT NULL DEFAULT 0,
+        approved INTEGER NOT NULL DEFAULT 0,
+        remaining INTEGER GENERATED ALWAYS AS (budget - allocated) VIRTUAL,
+        FOREIGN KEY (job_id) REFERENCES jobs(id) ON DELETE CASCADE
+    )
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS job_budget_after_job_insert AFTER INSERT ON jobs BEGIN
+        INSERT OR IGNORE INTO job_budget_summary (job_id, budget) VALUES (new.id, new.budget);
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS job_budget_after_job_update AFTER UPDATE OF budget ON jobs BEGIN
+        UPDATE job_budget_summary SET budget = new.budget WHERE job_id = new.id;
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS job_budget_after_job_delete AFTER DELETE ON jobs BEGIN
+        DELETE FROM job_budget_summary WHERE job_id = old.id;
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS job_budget_after_milestone_insert AFTER INSERT ON milestones BEGIN
+        UPDATE job_budget_summary
+        SET allocated = allocated + new.payment,
+            approved = approved + CASE WHEN new.status = 'approved' THEN new.payment ELSE 0 END
+        WHERE job_id = new.job_id;
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS job_budget_after_milestone_update
+    AFTER UPDATE OF job_id, payment, status ON milestones BEGIN
+        UPDATE job_budget_summary
+        SET allocated = allocated - old.payment,
+            approved = approved - CASE WHEN old.status = 'approved' THEN old.payment ELSE 0 END
+        WHERE job_id = old.job_id;
+        UPDATE job_budget_summary
+        SET allocated = allocated + new.payment,
+            approved = approved + CASE WHEN new.status = 'approved' THEN new.payment ELSE 0 END
+        WHERE job_id = new.job_id;
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS job_budget_after_milestone_delete AFTER DELETE ON milestones BEGIN
+        UPDATE job_budget_summary
+        SET allocated = allocated - old.payment,
+            approved = approved - CASE WHEN old.status = 'approved' THEN old.payment ELSE 0 END
+        WHERE job_id = old.job_id;
+    END
+    ''',
+)
+
+# What the summary should hold, computed from scratch
+_RECOMPUTE = '''
+    SELECT j.id AS job_id, j.budget AS budget,
+           COALESCE(SUM(m.payment), 0) AS allocated,
+           COALESCE(SUM(CASE WHEN m.status = 'approved' THEN m.payment ELSE 0 END), 0) AS approved
+    FROM jobs j LEFT JOIN milestones m ON m.job_id = j.id
+    GROUP BY j.id
+'''
+
+
+def ensure_budget_summary(conn):
+    """Creates the summary table and its triggers, filling it from the milestones on first run."""
+    cursor = conn.cursor()
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'job_budget_summary'")
+    existed = cursor.fetchone() is not None
+
+    for statement in BUDGET_SCHEMA:
+        cursor.execute(statement)
+    if not existed:
+        _fill(cursor)
+    conn.commit()
+
+
+def _fill(cursor):
+    cursor.execute("DELETE FROM job_budget_summary")
+    cursor.execute(f"INSERT INTO job_budget_summary (job_id, budget, allocated, approved) {_RECOMPUTE}")
+
+
+def get_budget(cursor, job_id):
+    """Returns (budget, allocated, approved, remaining) for a job, or None if it has no summary row."""
+    cursor.execute("SELECT budget, allocated, approved, remaining FROM job_budget_summary WHERE job_id = ?", (job_id,))
+    row = cursor.fetchone()
+    return tuple(Money(value) for value in row) if row else None
+
+
+def check_budget_summary(conn, repair=False):
+    """Compares the summary with a full recomputation. Returns the ids of jobs that differ.
+
+    With `repair` the table is rebuilt from scratch when anything differs.
+    """
+    cursor = conn.cursor()
+    cursor.execute(f"""
+        SELECT expected.job_id FROM ({_RECOMPUTE}) AS expected
+        LEFT JOIN job_budget_summary s ON s.job_id = expected.job_id
+        WHERE s.job_id IS NULL OR s.budget IS NOT expected.budget
+           OR s.allocated != expected.allocated OR s.approved != expected.approved
+        UNION
+        SELECT job_id FROM job_budget_summary WHERE job_id NOT IN (SELECT id FROM jobs)
+        ORDER BY 1
+    """)
+    drifted = [row[0] for row in cursor.fetchall()]
+    if drifted and repair:
+        if conn.in_transaction:
+            conn.commit()
+        cursor.execute("BEGIN IMMEDIATE")
+        try:
+            _fill(cursor)
+        except BaseException:
+            conn.rollback()
+            raise
+        conn.commit()
+    return drifted
+
+
+def print_budget_check(conn, repair=False):
+    """Runs check_budget_summary and reports the outcome."""
+    drifted = check_budget_summary(conn, repair)
+    if not drifted:
+        print("✅ job_budget_summary matches the milestones.")
+    elif repair:
+        print(f"Rebuilt job_budget_summary; {len(drifted)} job(s) had drifted: {', '.join(map(str, drifted))}")
+    else:
+        print(f"❌ {len(drifted)} job(s) differ from their milestones: {', '.join(map(str, drifted))}")
+    return drifted
@@ -0,0 +1,140 @@
+import re
+import database
+
+# FTS5 index over the searchable job columns. It is an external-content table,
+# so the text lives once in `jobs` and the triggers below keep the index in sync.
+SEARCH_SCHEMA = (
+    '''
+    CREATE VIRTUAL TABLE IF NOT EXISTS jobs_fts USING fts5(
+        title, description, skills_required,
+        content='jobs', content_rowid='id'
+    )
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS jobs_fts_after_insert AFTER INSERT ON jobs BEGIN
+        INSERT INTO jobs_fts (rowid, title, description, skills_required)
+        VALUES (new.id, new.title, new.description, new.skills_required);
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS jobs_fts_after_delete AFTER DELETE ON jobs BEGIN
+        INSERT INTO jobs_fts (jobs_fts, rowid, title, description, skills_required)
+        VALUES ('delete', old.id, old.title, old.description, old.skills_required);
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS jobs_fts_after_update
+    AFTER UPDATE OF title, description, skills_required ON jobs BEGIN
+        INSERT INTO jobs_fts (jobs_fts, rowid, title, description, skills_required)
+        VALUES ('delete', old.id, old.title, old.description, old.skills_required);
+        INSERT INTO jobs_fts (rowid, title, description, skills_required)
+        VALUES (new.id, new.title, new.description, new.skills_required);
+    END
+    ''',
+)
+
+# Title matches count more than description or skills matches
+RANK_WEIGHTS = (10.0, 1.0, 5.0)
+
+DEFAULT_PAGE_SIZE = 10
+MAX_PAGE_SIZE = 100  # a bigger page would defeat paging; callers asking for one get a ValueError
+
+
+def ensure_search_index(conn):
+    """Creates the FTS index and its sync triggers, backfilling existing jobs on first run."""
+    cursor = conn.cursor()
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'jobs_fts'")
+    existed = cursor.fetchone() is not None
+
+    for statement in SEARCH_SCHEMA:
+        cursor.execute(statement)
+    if not existed:
+        cursor.execute("INSERT INTO jobs_fts (jobs_fts) VALUES ('rebuild')")
+    conn.commit()
+
+
+def has_search_index(cursor):
+    """Returns True if the FTS index exists in this database."""
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'jobs_fts'")
+    return cursor.fetchone() is not None
+
+
+def to_match_query(text):
+    """Turns free text into an FTS5 query: every word must match, as a prefix."""
+    words = re.findall(r"\w+", text)
+    return " ".join(f'"{word}"*' for word in words)
+
+
+def _check_page_size(page_size):
+    if not 1 <= page_size <= MAX_PAGE_SIZE:
+        raise ValueError(f"Page size must be between 1 and {MAX_PAGE_SIZE}.")
+
+
+def search_jobs(text, page=1, page_size=DEFAULT_PAGE_SIZE, status="open"):
+    """Returns one page of jobs matching `text`, best matches first.
+
+    Each row is (id, title, description, budget, skills_required, duration).
+    """
+    _check_page_size(page_size)
+    match = to_match_query(text)
+    if not match:
+        return []
+    offset = (max(page, 1) - 1) * page_size
+
+    with database.connection() as conn:
+        cursor = conn.cursor()
+        if has_search_index(cursor):
+            cursor.execute(f"""
+                SELECT j.id, j.title, j.description, j.budget, j.skills_required, j.duration
+                FROM jobs_fts
+                JOIN jobs j ON j.id = jobs_fts.rowid
+                WHERE jobs_fts MATCH ? AND j.status = ?
+                ORDER BY bm25(jobs_fts, {', '.join(map(str, RANK_WEIGHTS))}), j.id
+                LIMIT ? OFFSET ?
+            """, (match, status, page_size, offset))
+        else:
+            # Databases that predate the search index fall back to a title scan
+            cursor.execute("""
+                SELECT id, title, description, budget, skills_required, duration
+                FROM jobs
+                WHERE title LIKE ? AND status = ?
+                ORDER BY id
+                LIMIT ? OFFSET ?
+            """, ('%' + text + '%', status, page_size, offset))
+        return cursor.fetchall()
+
+
+def open_jobs_page(after_id=0, page_size=DEFAULT_PAGE_SIZE):
+    """Returns (rows, has_more) for the page of open jobs that follows `after_id`.
+
+    Keyset pagination on id: each page is one index range scan, however many
+    jobs are open, and `has_more` tells whether another page follows.
+    """
+    _check_page_size(page_size)
+    with database.connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT id, title, description, budget, skills_required, duration
+            FROM jobs
+            WHERE status = 'open' AND id > ?
+            ORDER BY id
+            LIMIT ?
+        """, (after_id, page_size + 1))
+        rows = cursor.fetchall()
+
+    return rows[:page_size], len(rows) > page_size
+
+
+def iter_open_jobs(page_size=DEFAULT_PAGE_SIZE):
+    """Lazily yields every open job in id order, one keyset page at a time.
+
+    The pooled connection is only held while a page is read, so a slow consumer
+    never pins it.
+    """
+    after_id = 0
+    while True:
+        rows, has_more = open_jobs_page(after_id=after_id, page_size=page_size)
+        yield from rows
+        if not has_more:
+            return
+        after_id = rows[-1][0]
@@ -0,0 +1,347 @@
+import threading
+import weakref
+from contextlib import contextmanager
+
+from money import Money
+
+# Append-only double-entry ledger. Every money movement is one transfer with two
+# or more entries whose amounts sum to zero. The balance columns in `wallet` and
+# `escrow_accounts` are snapshots kept in step with the entries, so reading a
+# balance stays a single-row lookup. Amounts are integer centavos (see money.py).
+# An escrow account is one job's holding for one freelancer, so escrow entries
+# carry both: the job id in account_id and the freelancer in freelancer_id
+# (NULL on every other entry).
+LEDGER_SCHEMA = (
+    '''
+    CREATE TABLE IF NOT EXISTS ledger_transfers (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        kind TEXT NOT NULL,
+        memo TEXT,
+        created_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS ledger_entries (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        transfer_id INTEGER NOT NULL,
+        account_type TEXT CHECK(account_type IN ('wallet', 'escrow', 'external')) NOT NULL,
+        account_id INTEGER,
+        freelancer_id INTEGER,
+        amount INTEGER NOT NULL,
+        balance_after INTEGER,
+        FOREIGN KEY (transfer_id) REFERENCES ledger_transfers(id)
+    )
+    ''',
+    "CREATE INDEX IF NOT EXISTS idx_ledger_entries_account ON ledger_entries (account_type, account_id, id)",
+    "CREATE INDEX IF NOT EXISTS idx_ledger_entries_transfer ON ledger_entries (transfer_id)",
+    '''
+    CREATE TRIGGER IF NOT EXISTS ledger_entries_no_update BEFORE UPDATE ON ledger_entries BEGIN
+        SELECT RAISE(ABORT, 'ledger entries are append-only');
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS ledger_entries_no_delete BEFORE DELETE ON ledger_entries BEGIN
+        SELECT RAISE(ABORT, 'ledger entries are append-only');
+    END
+    ''',
+)
+
+
+# Money an employer has put aside for one freelancer's work on one job. `balance`
+# is what is held now; `funded` and `released` are running totals, so a job's
+# escrow figures are a primary-key lookup rather than a sum over its history.
+ESCROW_SCHEMA = (
+    '''
+    CREATE TABLE IF NOT EXISTS escrow_accounts (
+        job_id INTEGER NOT NULL,
+        freelancer_id INTEGER NOT NULL,
+        employer_id INTEGER NOT NULL,
+        balance INTEGER NOT NULL DEFAULT 0,
+        funded INTEGER NOT NULL DEFAULT 0,
+        released INTEGER NOT NULL DEFAULT 0,
+        status TEXT CHECK(status IN ('open', 'settled')) NOT NULL DEFAULT 'open',
+        PRIMARY KEY (job_id, freelancer_id),
+        FOREIGN KEY (job_id) REFERENCES jobs(id),
+        FOREIGN KEY (freelancer_id) REFERENCES users(id),
+        FOREIGN KEY (employer_id) REFERENCES users(id)
+    ) WITHOUT ROWID
+    ''',
+    "CREATE INDEX IF NOT EXISTS idx_escrow_accounts_freelancer ON escrow_accounts (freelancer_id, status)",
+)
+
+
+class InsufficientFundsError(Exception):
+    """Raised when a conditional debit finds less money than requested."""
+
+
+def ensure_ledger_schema(conn):
+    """Creates the ledger tables and their append-only guards."""
+    cursor = conn.cursor()
+    for statement in LEDGER_SCHEMA:
+        cursor.execute(statement)
+    cursor.execute("PRAGMA table_info(ledger_entries)")
+    if "freelancer_id" not in {row[1] for row in cursor.fetchall()}:
+        # Made before escrow entries named their freelancer; those entries keep NULL
+        cursor.execute("ALTER TABLE ledger_entries ADD COLUMN freelancer_id INTEGER")
+    conn.commit()
+
+
+def ensure_escrow_schema(conn):
+    """Creates the per-job escrow table and moves any freelancer-keyed temporary_wallet holdings into it.
+
+    A holding is assigned to the freelancer's most recent accepted job with that
+    employer (in-progress jobs first); one with no such job goes to job 0. Each
+    one is recorded as an opening-balance transfer into its escrow account, so
+    the ledger accounts for the money from the start. Needs the ledger tables.
+    """
+    cursor = conn.cursor()
+    if conn.in_transaction:
+        conn.commit()
+    cursor.execute("BEGIN IMMEDIATE")
+    try:
+        for statement in ESCROW_SCHEMA:
+            cursor.execute(statement)
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'temporary_wallet'")
+        if cursor.fetchone():
+            cursor.execute("""
+                SELECT COALESCE((
+                           SELECT j.id FROM jobs j JOIN job_applications ja ON ja.job_id = j.id
+                           WHERE ja.freelancer_id = t.freelancer_id AND j.employer_id = t.employer_id
+                             AND ja.status = 'accepted'
+                           ORDER BY j.status = 'in_progress' DESC, j.id DESC LIMIT 1
+                       ), 0),
+                       t.freelancer_id, t.employer_id, t.balance
+                FROM temporary_wallet t WHERE t.balance > 0
+            """)
+            for job_id, freelancer_id, employer_id, amount in cursor.fetchall():
+                escrow_balance = _credit_escrow(cursor, job_id, freelancer_id, employer_id, amount)
+                _record(cursor, "opening_balance", "temporary_wallet", [
+                    ("external", None, -amount, None),
+                    ("escrow", (job_id, freelancer_id), amount, escrow_balance),
+                ])
+            cursor.execute("DROP TABLE temporary_wallet")
+    except BaseException:
+        conn.rollback()
+        raise
+    conn.commit()
+
+
+# Callbacks told about wallet balances this process changed (see add_balance_listener)
+_balance_listeners = []
+_listeners_lock = threading.Lock()
+_local = threading.local()
+
+
+def add_balance_listener(callback):
+    """Calls `callback(user_id, balance)` after each committed wallet change.
+
+    `balance` is None when the new value isn't known yet (the change was made
+    inside a transaction someone else will commit). Bound methods are held
+    weakly, so a listening object can simply be dropped.
+    """
+    ref = weakref.WeakMethod(callback) if hasattr(callback, "__self__") else (lambda: callback)
+    with _listeners_lock:
+        _balance_listeners.append(ref)
+
+
+def _publish(changes):
+    with _listeners_lock:
+        _balance_listeners[:] = [ref for ref in _balance_listeners if ref() is not None]
+        callbacks = [ref() for ref in _balance_listeners]
+    for user_id, balance in changes.items():
+        for callback in callbacks:
+            if callback is not None:
+                callback(user_id, balance)
+
+
+def _balance_changed(user_id, balance):
+    pending = getattr(_local, "changes", None)
+    if pending is not None:
+        pending[user_id] = balance  # published when our transaction commits
+    else:
+        _publish({user_id: None})
+
+
+@contextmanager
+def transaction(conn):
+    """Runs a block inside BEGIN IMMEDIATE, taking the write lock up front.
+
+    If the connection is already inside a transaction the block simply joins it,
+    so ledger calls compose into one atomic unit.
+    """
+    if conn.in_transaction:
+        yield conn.cursor()
+        return
+    outer, _local.changes = getattr(_local, "changes", None), {}
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn.cursor()
+        except BaseException:
+            conn.rollback()
+            raise
+        conn.commit()
+        changes = _local.changes
+    finally:
+        _local.changes = outer
+    _publish(changes)
+
+
+def _credit_wallet(cursor, user_id, amount):
+    cursor.execute("UPDATE wallet SET balance = balance + ? WHERE user_id = ? RETURNING balance", (amount, user_id))
+    row = cursor.fetchone()
+    if row is None:
+        raise LookupError(f"No wallet for user {user_id}.")
+    _balance_changed(user_id, Money(row[0]))
+    return Money(row[0])
+
+
+def _debit_wallet(cursor, user_id, amount):
+    # The balance check and the write are one statement, so concurrent debits can't overdraw
+    cursor.execute("""
+        UPDATE wallet SET balance = balance - ?
+        WHERE user_id = ? AND balance >= ?
+        RETURNING balance
+    """, (amount, user_id, amount))
+    row = cursor.fetchone()
+    if row is None:
+        raise InsufficientFundsError(f"Insufficient funds in wallet of user {user_id}.")
+    _balance_changed(user_id, Money(row[0]))
+    return Money(row[0])
+
+
+def _credit_escrow(cursor, job_id, freelancer_id, employer_id, amount):
+    cursor.execute("""
+        INSERT INTO escrow_accounts (job_id, freelancer_id, employer_id, balance, funded) VALUES (?, ?, ?, ?, ?)
+        ON CONFLICT (job_id, freelancer_id) DO UPDATE SET
+            balance = balance + excluded.balance, funded = funded + excluded.funded, status = 'open'
+        RETURNING balance
+    """, (job_id, freelancer_id, employer_id, amount, amount))
+    return Money(cursor.fetchone()[0])
+
+
+def _debit_escrow(cursor, job_id, freelancer_id, amount, settle=False):
+    cursor.execute(f"""
+        UPDATE escrow_accounts SET balance = balance - ?, released = released + ?
+            {", status = 'settled'" if settle else ""}
+        WHERE job_id = ? AND freelancer_id = ? AND balance >= ?
+        RETURNING balance
+    """, (amount, amount, job_id, freelancer_id, amount))
+    row = cursor.fetchone()
+    if row is None:
+        raise InsufficientFundsError(f"Escrow for job {job_id} holds less than {Money(amount)}.")
+    return Money(row[0])
+
+
+def _record(cursor, kind, memo, entries):
+    """Appends one transfer and its entries: (account_type, account_id, amount, balance_after).
+
+    An escrow entry's account_id is its account's key, (job_id, freelancer_id).
+    """
+    cursor.execute("INSERT INTO ledger_transfers (kind, memo) VALUES (?, ?)", (kind, memo))
+    transfer_id = cursor.lastrowid
+    rows = []
+    for account_type, account_id, amount, balance_after in entries:
+        account_id, freelancer_id = account_id if account_type == "escrow" else (account_id, None)
+        rows.append((transfer_id, account_type, account_id, freelancer_id, amount, balance_after))
+    cursor.executemany("""
+        INSERT INTO ledger_entries (transfer_id, account_type, account_id, freelancer_id, amount, balance_after)
+        VALUES (?, ?, ?, ?, ?, ?)
+    """, rows)
+    return transfer_id
+
+
+def deposit(conn, user_id, amount, memo=None):
+    """Adds outside money to a wallet. Returns the new balance."""
+    with transaction(conn) as cursor:
+        balance = _credit_wallet(cursor, user_id, amount)
+        _record(cursor, "deposit", memo, [
+            ("external", None, -amount, None),
+            ("wallet", user_id, amount, balance),
+        ])
+    return balance
+
+
+def withdraw(conn, user_id, amount, memo=None):
+    """Takes money out of a wallet if it holds enough. Returns the new balance."""
+    with transaction(conn) as cursor:
+        balance = _debit_wallet(cursor, user_id, amount)
+        _record(cursor, "withdrawal", memo, [
+            ("wallet", user_id, -amount, balance),
+            ("external", None, amount, None),
+        ])
+    return balance
+
+
+def transfer(conn, from_user_id, to_user_id, amount, memo=None):
+    """Moves money between two wallets atomically."""
+    with transaction(conn) as cursor:
+        from_balance = _debit_wallet(cursor, from_user_id, amount)
+        to_balance = _credit_wallet(cursor, to_user_id, amount)
+        _record(cursor, "transfer", memo, [
+            ("wallet", from_user_id, -amount, from_balance),
+            ("wallet", to_user_id, amount, to_balance),
+        ])
+
+
+def hold_in_escrow(conn, employer_id, job_id, freelancer_id, amount, memo=None):
+    """Moves a milestone payment from the employer's wallet into the job's escrow for the freelancer."""
+    with transaction(conn) as cursor:
+        employer_balance = _debit_wallet(cursor, employer_id, amount)
+        escrow_balance = _credit_escrow(cursor, job_id, freelancer_id, employer_id, amount)
+        _record(cursor, "escrow_hold", memo, [
+            ("wallet", employer_id, -amount, employer_balance),
+            ("escrow", (job_id, freelancer_id), amount, escrow_balance),
+        ])
+
+
+def hold_in_escrow_many(conn, employer_id, holds, memo=None):
+    """Funds several escrows with one debit of the employer's wallet. Returns the total held.
+
+    `holds` is a list of (job_id, freelancer_id, amount); the whole list is one
+    transfer, so it is held in full or not at all.
+    """
+    total = Money(sum(amount for _, _, amount in holds))
+    with transaction(conn) as cursor:
+        employer_balance = _debit_wallet(cursor, employer_id, total)
+        entries = [("wallet", employer_id, -total, employer_balance)]
+        for job_id, freelancer_id, amount in holds:
+            escrow_balance = _credit_escrow(cursor, job_id, freelancer_id, employer_id, amount)
+            entries.append(("escrow", (job_id, freelancer_id), amount, escrow_balance))
+        _record(cursor, "escrow_hold", memo, entries)
+    return total
+
+
+def release_escrow(conn, job_id, freelancer_id, amount=None, memo=None):
+    """Pays a job's escrow out to the freelancer's wallet. Returns the amount released.
+
+    With `amount` only that much is released (partial release); without it the
+    whole balance is paid and the account is settled.
+    """
+    with transaction(conn) as cursor:
+        settle = amount is None
+        if settle:
+            cursor.execute("SELECT balance FROM escrow_accounts WHERE job_id = ? AND freelancer_id = ?",
+                           (job_id, freelancer_id))
+            row = cursor.fetchone()
+            amount = Money(row[0] if row else 0)
+            if amount <= 0:
+                cursor.execute("UPDATE escrow_accounts SET status = 'settled' WHERE job_id = ? AND freelancer_id = ?",
+                               (job_id, freelancer_id))
+                return Money(0)
+        escrow_balance = _debit_escrow(cursor, job_id, freelancer_id, amount, settle)
+        balance = _credit_wallet(cursor, freelancer_id, amount)
+        _record(cursor, "escrow_release", memo, [
+            ("escrow", (job_id, freelancer_id), -amount, escrow_balance),
+            ("wallet", freelancer_id, amount, balance),
+        ])
+    return Money(amount)
+
+
+def escrow_summary(conn, job_id):
+    """Returns (held, funded, released) for a job's escrow, summed over its freelancers."""
+    row = conn.execute("""
+        SELECT COALESCE(SUM(balance), 0), COALESCE(SUM(funded), 0), COALESCE(SUM(released), 0)
+        FROM escrow_accounts WHERE job_id = ?
+    """, (job_id,)).fetchone()
+    return tuple(Money(value) for value in row)
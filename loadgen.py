@@ -0,0 +1,306 @@
+import argparse
+import json
+import random
+import sqlite3
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import benchmark
+import database
+import job_search
+import services
+import storage
+
+# Drives simulated freelancers and employers through the same flows as
+# main.freelancer_menu and main.employer_menu, via the headless service layer,
+# against one database file. Every simulated user runs in its own thread or
+# process, so lock contention looks like real concurrent sessions.
+#
+#   python loadgen.py --db load.db --users 40 --concurrency 8 --duration 30
+
+LATENCY_BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+BUSY_CODES = (5, 6)  # SQLITE_BUSY, SQLITE_LOCKED
+
+
+def is_busy(error):
+    """True for SQLite 'database is locked' / busy errors."""
+    code = getattr(error, "sqlite_errorcode", None)
+    return code in BUSY_CODES or "locked" in str(error) or "busy" in str(error)
+
+
+def bucket_of(ms):
+    """Returns the histogram bucket label ('<=5', '>5000'...) for a latency in ms."""
+    for limit in LATENCY_BUCKETS_MS:
+        if ms <= limit:
+            return f"<={limit}"
+    return f">{LATENCY_BUCKETS_MS[-1]}"
+
+
+class Recorder:
+    """Times service calls for one simulated user and classifies their failures."""
+
+    def __init__(self):
+        self.latencies = {}
+        self.errors = Counter()
+        self.busy = 0
+        self.pool_timeouts = 0
+        self.flows = 0
+
+    def call(self, operation, function, *args):
+        """Runs and times one operation. Returns its result, or None if it failed."""
+        start = time.perf_counter()
+        try:
+            return function(*args)
+        except (services.ServiceError, services.InsufficientFundsError) as e:
+            # Business outcomes (already applied, budget used up...) are expected under load
+            self.errors[f"{operation}:{type(e).__name__}"] += 1
+        except sqlite3.OperationalError as e:
+            if not is_busy(e):
+                raise
+            self.busy += 1
+            self.errors[f"{operation}:busy"] += 1
+        except TimeoutError:
+            self.pool_timeouts += 1
+            self.errors[f"{operation}:pool_timeout"] += 1
+        finally:
+            self.latencies.setdefault(operation, []).append(time.perf_counter() - start)
+        return None
+
+    def to_dict(self):
+        # Plain data, so results can come back from worker processes
+        return {"latencies": self.latencies, "errors": dict(self.errors), "busy": self.busy,
+                "pool_timeouts": self.pool_timeouts, "flows": self.flows}
+
+
+def _query(sql, params):
+    with database.connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(sql, params)
+        return cursor.fetchall()
+
+
+class SimulatedFreelancer:
+    """Browse and Apply Jobs, then Work in Progress > Submit Milestone."""
+
+    role = "Freelancer"
+
+    def __init__(self, name, rng, recorder):
+        self.name, self.rng, self.recorder = name, rng, recorder
+        self.id = None
+        self.after_id = 0
+
+    def start(self):
+        call = self.recorder.call
+        self.id = call("sign_up", services.sign_up, self.name, "pw", "Freelancer", self.name,
+                       ", ".join(self.rng.sample(benchmark.SKILLS, 3)), "2 years", self.rng.randint(5, 60), "GCash")
+        return self.id is not None and call("login", services.login, self.name, "pw") is not None
+
+    def flow(self):
+        call = self.recorder.call
+        page = call("browse_jobs", job_search.open_jobs_page, self.after_id, job_search.DEFAULT_PAGE_SIZE)
+        if page:
+            jobs, has_more = page
+            self.after_id = jobs[-1][0] if has_more and jobs else 0
+            if jobs:
+                call("apply_job", services.apply_job, self.id, self.rng.choice(jobs)[0])
+
+        pending = call("work_in_progress", _query,
+                       "SELECT title FROM milestones WHERE freelancer_id = ? AND status = 'pending' LIMIT 3", (self.id,))
+        for (title,) in pending or ():
+            call("submit_milestone", services.submit_milestone, self.id, title)
+
+
+class SimulatedEmployer:
+    """Post a Job, View Applicants > Accept, then Work in Progress > Add / Approve Milestone."""
+
+    role = "Employer"
+    MILESTONES_PER_JOB = 3
+
+    def __init__(self, name, rng, recorder):
+        self.name, self.rng, self.recorder = name, rng, recorder
+        self.id = None
+        self.posted = 0
+        self.open_jobs = []      # (job_id, title, budget in pesos)
+        self.hired_jobs = {}     # job_id -> [budget in pesos, milestones added]
+
+    def start(self):
+        call = self.recorder.call
+        self.id = call("sign_up", services.sign_up, self.name, "pw", "Employer", None, None, None, None, None, self.name)
+        return (self.id is not None and call("login", services.login, self.name, "pw") is not None
+                and call("deposit", services.deposit, self.id, "10000000") is not None)
+
+    def flow(self):
+        call = self.recorder.call
+        self.posted += 1
+        title = f"{self.name} job {self.posted}"
+        budget = self.rng.randint(30, 300) * 100
+        job_id = call("post_job", services.post_job, self.id, title, "Load test job", str(budget),
+                      ", ".join(self.rng.sample(benchmark.SKILLS, 2)), self.rng.choice(benchmark.DURATIONS))
+        if job_id:
+            self.open_jobs.append((job_id, title, budget))
+
+        # Hire the best-fitting applicant for the oldest open job that has any
+        for job_id, title, budget in list(self.open_jobs[:3]):
+            found = call("view_applicants", services.list_applicants, self.id, title)
+            if found and found[1]:
+                application_id = found[1][0][1][5]
+                if call("accept_applicant", services.decide_application, self.id, application_id, True):
+                    self.open_jobs.remove((job_id, title, budget))
+                    self.hired_jobs[job_id] = [budget, 0]
+                break
+
+        for job_id, progress in list(self.hired_jobs.items()):
+            budget, added = progress
+            if added == self.MILESTONES_PER_JOB:
+                continue
+            progress[1] += 1
+            call("add_milestone", services.add_milestone, self.id, job_id,
+                 f"{self.name} job {job_id} milestone {progress[1]}", str(budget // self.MILESTONES_PER_JOB))
+
+        submitted = call("work_in_progress", _query, """
+            SELECT m.title FROM milestones m JOIN jobs j ON j.id = m.job_id
+            WHERE j.employer_id = ? AND m.status = 'for approval' LIMIT 3
+        """, (self.id,))
+        for (title,) in submitted or ():
+            call("approve_milestone", services.approve_milestone, self.id, title)
+
+
+def run_user(index, role, tag, flows, duration, seed):
+    """Runs one simulated user to completion and returns its recorded results."""
+    recorder = Recorder()
+    actor_class = SimulatedEmployer if role == "Employer" else SimulatedFreelancer
+    actor = actor_class(f"lg{tag}_{role[0].lower()}{index}", random.Random(seed * 100003 + index), recorder)
+    if actor.start():
+        deadline = time.monotonic() + duration if duration else None
+        while (time.monotonic() < deadline) if deadline else (recorder.flows < flows):
+            actor.flow()
+            recorder.flows += 1
+    result = recorder.to_dict()
+    result["role"] = role
+    return result
+
+
+def _init_process(path, profile):
+    # Each worker process gets its own pool on the shared database file
+    database.use_database(path, profile)
+
+
+def merge(results):
+    """Combines per-user results into one set of latencies and counters."""
+    merged = {"latencies": {}, "errors": Counter(), "busy": 0, "pool_timeouts": 0, "flows": 0}
+    for result in results:
+        for operation, samples in result["latencies"].items():
+            merged["latencies"].setdefault(operation, []).extend(samples)
+        merged["errors"].update(result["errors"])
+        for key in ("busy", "pool_timeouts", "flows"):
+            merged[key] += result[key]
+    return merged
+
+
+def run(db_path, users, employer_ratio=0.25, concurrency=8, mode="thread", flows=20, duration=None, seed=1,
+        profile=storage.DEFAULT_PROFILE):
+    """Runs the simulation and returns the JSON-ready report."""
+    import main  # init_db creates or upgrades the schema of the target file
+
+    previous_database, previous_profile = database.current_database(), database.current_profile()
+    database.use_database(db_path, profile)
+    try:
+        main.init_db()
+        tag = int(time.time() * 1000) % 10 ** 9  # usernames stay unique across runs on the same file
+        employers = max(1, round(users * employer_ratio))
+        roles = ["Employer"] * employers + ["Freelancer"] * max(0, users - employers)
+        waits_before = database.pool_stats()["waits"]
+
+        if mode == "process":
+            executor = ProcessPoolExecutor(max_workers=concurrency, initializer=_init_process,
+                                           initargs=(db_path, profile))
+        else:
+            executor = ThreadPoolExecutor(max_workers=concurrency)
+        start = time.perf_counter()
+        with executor:
+            futures = [executor.submit(run_user, index, role, tag, flows, duration, seed)
+                       for index, role in enumerate(roles, 1)]
+            results = [future.result() for future in futures]
+        elapsed = time.perf_counter() - start
+        pool_waits = database.pool_stats()["waits"] - waits_before if mode == "thread" else None
+    finally:
+        database.use_database(previous_database, previous_profile)
+
+    merged = merge(results)
+    operations = {}
+    histogram = Counter()
+    for operation, samples in sorted(merged["latencies"].items()):
+        stats = benchmark.summarize(samples)
+        stats["errors"] = sum(count for key, count in merged["errors"].items() if key.startswith(operation + ":"))
+        operations[operation] = stats
+        for sample in samples:
+            histogram[bucket_of(sample * 1000)] += 1
+    total_ops = sum(len(samples) for samples in merged["latencies"].values())
+
+    return {
+        "params": {"db": db_path, "users": users, "employers": employers, "concurrency": concurrency,
+                   "mode": mode, "flows": flows, "duration": duration, "seed": seed,
+                   "profile": profile},
+        "elapsed_s": round(elapsed, 3),
+        "throughput": {"ops_per_s": round(total_ops / elapsed, 1), "flows_per_s": round(merged["flows"] / elapsed, 1),
+                       "operations": total_ops, "flows": merged["flows"]},
+        "contention": {"sqlite_busy": merged["busy"], "pool_timeouts": merged["pool_timeouts"], "pool_waits": pool_waits},
+        "operations": operations,
+        "histogram_ms": {label: histogram[label] for label in [f"<={b}" for b in LATENCY_BUCKETS_MS] +
+                         [f">{LATENCY_BUCKETS_MS[-1]}"] if histogram[label]},
+        "errors": dict(merged["errors"]),
+    }
+
+
+def print_report(report):
+    params, throughput, contention = report["params"], report["throughput"], report["contention"]
+    workers = "processes" if params["mode"] == "process" else "threads"
+    print(f"{params['users']} users ({params['employers']} employers) on {params['concurrency']} {workers} "
+          f"for {report['elapsed_s']} s, storage profile {params.get('profile', storage.DEFAULT_PROFILE)}")
+    print(f"Throughput: {throughput['ops_per_s']} ops/s, {throughput['flows_per_s']} flows/s "
+          f"({throughput['operations']} operations)")
+    print(f"SQLITE_BUSY/locked: {contention['sqlite_busy']}   pool timeouts: {contention['pool_timeouts']}   "
+          f"pool waits: {contention['pool_waits'] if contention['pool_waits'] is not None else 'n/a'}")
+    print()
+    print(f"{'operation':<20}{'count':>8}{'errors':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for operation, stats in report["operations"].items():
+        print(f"{operation:<20}{stats['samples']:>8}{stats['errors']:>8}{stats['p50_ms']:>10.2f}"
+              f"{stats['p95_ms']:>10.2f}{stats['p99_ms']:>10.2f}{stats['max_ms']:>10.2f}")
+    print()
+    print("Latency histogram (all operations):")
+    peak = max(report["histogram_ms"].values(), default=1)
+    for label, count in report["histogram_ms"].items():
+        print(f"  {label + ' ms':<10}{'#' * max(1, round(40 * count / peak)):<41}{count}")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Simulate concurrent ProDigi freelancers and employers")
+    parser.add_argument("--db", default="loadgen.db", help="database file to load (created if missing)")
+    parser.add_argument("--users", type=int, default=40, help="simulated users, one thread or process each")
+    parser.add_argument("--employer-ratio", type=float, default=0.25)
+    parser.add_argument("--concurrency", type=int, default=8, help="users running at the same time")
+    parser.add_argument("--mode", choices=("thread", "process"), default="thread")
+    parser.add_argument("--flows", type=int, default=20, help="menu flows per user (ignored with --duration)")
+    parser.add_argument("--duration", type=float, help="run each user for this many seconds instead")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--profile", choices=storage.PROFILES, default=storage.DEFAULT_PROFILE,
+                        help="storage profile (default %(default)s)")
+    parser.add_argument("--json", metavar="PATH", help="also write the report as JSON")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    report = run(args.db, args.users, args.employer_ratio, args.concurrency, args.mode,
+                 args.flows, args.duration, args.seed, args.profile)
+    print_report(report)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as out:
+            json.dump(report, out, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
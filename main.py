@@ -1,43 +1,28 @@
-import sqlite3
-import os
 import time
-from user import User
+STARTED = time.perf_counter()  # for --profile-startup: everything below counts as import time
+import argparse
+import os
+import sys
+import database
+import job_budget
+import ledger
+import passwords
+import querylog
+import schema
+from money import Money
+import storage
 from utils import Utility
-import job_system
-import freelancer_marketplace
+
+# Loaded on demand: user (and the services behind it) at sign-up or login,
+# batch with --batch, indexes with --explain, and the modules behind a schema
+# migration step only when init_db has that step to run
+IMPORTED = time.perf_counter()
 
 # Database Setup
 def init_db():
-    db_path = os.path.abspath("freelancer_marketplace.db")
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-    cursor.execute('''CREATE TABLE IF NOT EXISTS users (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        username TEXT UNIQUE,
-                        password TEXT,
-                        role TEXT,
-                        name TEXT,
-                        skills TEXT,
-                        experience TEXT,
-                        hourly_rate REAL,
-                        payment_method TEXT,
-                        company_name TEXT
-                    )''')
-
-    # Recreate the table with the correct schema
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS temporary_wallet (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            employer_id INTEGER NOT NULL,
-            freelancer_id INTEGER NOT NULL,
-            balance REAL DEFAULT 0.0,
-            FOREIGN KEY (freelancer_id) REFERENCES users(id) ON DELETE CASCADE,
-            FOREIGN KEY (employer_id) REFERENCES users(id) ON DELETE CASCADE
-        )
-    ''')
-
-    conn.commit()
-    conn.close()
+    """Creates or upgrades the database schema; a current database is left untouched."""
+    with database.connection() as conn:
+        schema.migrate(conn)
 
 
 def freelancer_menu(user):
@@ -70,7 +55,7 @@ def employer_menu(user):
     """Handles employer actions like posting jobs and managing applications."""
     while True:
         Utility.clear_screen()  # Clear the terminal
-        choice = Utility.display_menu(f"{user.role} Menu", ["Post a Job", "View Posted Jobs", "View Applicants", "Work in Progress","Wallet & Payment Settings", "Logout"], use_header=True)
+        choice = Utility.display_menu(f"{user.role} Menu", ["Post a Job", "View Posted Jobs", "View Applicants", "Work in Progress","Wallet & Payment Settings", "Find Matching Freelancers", "Logout"], use_header=True)
 
         if choice == "1":
             # Collect all required job details
@@ -78,7 +63,7 @@ def employer_menu(user):
             Utility.display_header("Post Job")
             title = input("Enter Job Title: ")
             description = input("Enter Job Description: ")
-            budget = float(input("Enter Budget: "))
+            budget = Money.parse(input("Enter Budget: "))
             skill_required = input("Enter Skills Required (comma-separated): ")
             duration = input("Enter Job Duration (e.g., 1 month): ")
             # Call the post_job method with all required arguments
@@ -103,6 +88,10 @@ def employer_menu(user):
         elif choice == "5":
             user.wallet_menu()  # New function for wallet & payment
         elif choice == "6":
+            job_title = input("\nEnter Job Title to find freelancers for: ")
+            user.view_matching_freelancers(job_title)
+            input("\nPress Enter to Return...")
+        elif choice == "7":
             user.logout()
             break  # Exit the Employer dashboard and return to the main menu
         else:
@@ -134,25 +123,24 @@ def manage_payments(user):
 def select_job(user):
     """Prompts the user to select a job before accessing Work in Progress."""
 
-    conn = sqlite3.connect("freelancer_marketplace.db")
-    cursor = conn.cursor()
-
-    if user.role == "Freelancer":
-        cursor.execute('''
-            SELECT j.id, j.title
-            FROM jobs j
-            JOIN job_applications ja ON j.id = ja.job_id
-            WHERE ja.freelancer_id = ? AND j.status = 'in_progress'
-        ''', (user.id,))
-    else:  # Employer
-        cursor.execute('''
-            SELECT id, title
-            FROM jobs
-            WHERE employer_id = ? AND status IN ('in_progress', 'completed')
-        ''', (user.id,))
-
-    jobs = cursor.fetchall()
-    conn.close()
+    with database.connection() as conn:
+        cursor = conn.cursor()
+
+        if user.role == "Freelancer":
+            cursor.execute('''
+                SELECT j.id, j.title
+                FROM jobs j
+                JOIN job_applications ja ON j.id = ja.job_id
+                WHERE ja.freelancer_id = ? AND j.status = 'in_progress'
+            ''', (user.id,))
+        else:  # Employer
+            cursor.execute('''
+                SELECT id, title
+                FROM jobs
+                WHERE employer_id = ? AND status IN ('in_progress', 'completed')
+            ''', (user.id,))
+
+        jobs = cursor.fetchall()
 
     if not jobs:
         print("No active jobs found.")
@@ -180,77 +168,68 @@ def select_job(user):
     return selected_job_id  # Return job_id to pass into progress_display
 
 def progress_display(user, job_id):
-    """Displays work in progress for both freelancers and employers, including temporary wallet balance."""
+    """Displays work in progress for both freelancers and employers, including the job's escrow."""
+    shown_milestones = []  # (id, title, payment, status) as last listed, for picking by number
 
     def display_job_details():
         """Fetch and display job details along with milestones and remaining budget."""
         Utility.clear_screen()
         Utility.display_header("Work in Progress")
 
-        conn = sqlite3.connect("freelancer_marketplace.db")
-        cursor = conn.cursor()
-
-        # Get job details, including budget
-        cursor.execute("SELECT title, description, budget, status FROM jobs WHERE id = ?", (job_id,))
-        job = cursor.fetchone()
-
-        if not job:
-            print("Error: Job not found.")
-            conn.close()
-            return False
-
-        job_title, job_description, job_budget, job_status = job
-
-        if job_status != "in_progress":
-            print("This job is not currently in progress.")
-            conn.close()
-            return False
-
-        # Calculate total milestone payments
-        cursor.execute("SELECT COALESCE(SUM(payment), 0) FROM milestones WHERE job_id = ?", (job_id,))
-        total_allocated_budget = cursor.fetchone()[0]
-
-        remaining_budget = job_budget - total_allocated_budget
-
-        print(f"Job: {job_title}\nDescription: {job_description}")
-        print(f"Total Budget: Php {job_budget}")
-        print(f"Allocated Budget: Php {total_allocated_budget}")
-        print(f"Remaining Budget: Php {remaining_budget}\n")
-
-        # Fetch milestones based on user role
-        if user.role == "freelancer":
-            cursor.execute('''
-                SELECT id, title, payment, status
-                FROM milestones
-                WHERE job_id = ? AND freelancer_id = ?
-            ''', (job_id, user.id))
-        else:  # Employer
-            cursor.execute('''
-                SELECT id, title, payment, status
-                FROM milestones
-                WHERE job_id = ?
-            ''', (job_id,))
-
-        milestones = cursor.fetchall()
-
-        if not milestones:
-            print("No milestones found for this job.\n")
-        else:
-            print("\nMilestones:")
-            for idx, (milestone_id, title, payment, status) in enumerate(milestones, 1):
-                print(f"[{idx}] {title} (Php {payment}) [{status}]")
-
-        # 🟢 Display temporary wallet for freelancers
-        if user.role == "freelancer":
-            cursor.execute("SELECT balance FROM temporary_wallet WHERE freelancer_id = ?", (user.id,))
-            temp_wallet_balance = cursor.fetchone()
-
-            if temp_wallet_balance:
-                print(f"\n🟢 Temporary Wallet Balance: Php {temp_wallet_balance[0]}")
+        with database.connection() as conn:
+            cursor = conn.cursor()
+
+            # Get job details
+            cursor.execute("SELECT title, description, status FROM jobs WHERE id = ?", (job_id,))
+            job = cursor.fetchone()
+
+            if not job:
+                print("Error: Job not found.")
+                return False
+
+            job_title, job_description, job_status = job
+
+            if job_status != "in_progress":
+                print("This job is not currently in progress.")
+                return False
+
+            # Budget totals are kept per job, no need to add up the milestones
+            total_budget, allocated_budget, approved_budget, remaining_budget = job_budget.get_budget(cursor, job_id)
+
+            print(f"Job: {job_title}\nDescription: {job_description}")
+            print(f"Total Budget: Php {total_budget}")
+            print(f"Allocated Budget: Php {allocated_budget}")
+            print(f"Approved Budget: Php {approved_budget}")
+            print(f"Remaining Budget: Php {remaining_budget}\n")
+
+            # Fetch milestones based on user role
+            if user.role == "freelancer":
+                cursor.execute('''
+                    SELECT id, title, payment, status
+                    FROM milestones
+                    WHERE job_id = ? AND freelancer_id = ?
+                ''', (job_id, user.id))
+            else:  # Employer
+                cursor.execute('''
+                    SELECT id, title, payment, status
+                    FROM milestones
+                    WHERE job_id = ?
+                ''', (job_id,))
+
+            milestones = cursor.fetchall()
+            shown_milestones[:] = milestones
+
+            if not milestones:
+                print("No milestones found for this job.\n")
             else:
-                print("\n🟢 Temporary Wallet Balance: Php 0.00")
+                print("\nMilestones:")
+                for idx, (milestone_id, title, payment, status) in enumerate(milestones, 1):
+                    print(f"[{idx}] {title} (Php {Money(payment)}) [{status}]")
+
+            # 🟢 Escrow totals are kept on the job's escrow account
+            held, funded, released = ledger.escrow_summary(conn, job_id)
+            print(f"\n🟢 Escrow: Php {held} held (Php {funded} funded, Php {released} released)")
 
-        conn.close()
         return True
 
     while True:
@@ -269,20 +248,13 @@ def progress_display(user, job_id):
                 print("Invalid choice. Please select a valid option.")
 
         elif user.role == "Employer":
-            choice = Utility.display_menu("Options", ["Add Milestone", "Approve Milestone", "Back"], use_header=False)
+            choice = Utility.display_menu("Options", ["Add Milestone", "Approve Milestone", "Approve Several Milestones", "Back"],
+                                          use_header=False)
 
             if choice == "1":
                 # Before adding, check if budget is enough
-                conn = sqlite3.connect("freelancer_marketplace.db")
-                cursor = conn.cursor()
-                cursor.execute("SELECT budget FROM jobs WHERE id = ?", (job_id,))
-                job_budget = cursor.fetchone()[0]
-
-                cursor.execute("SELECT COALESCE(SUM(payment), 0) FROM milestones WHERE job_id = ?", (job_id,))
-                total_allocated_budget = cursor.fetchone()[0]
-
-                remaining_budget = job_budget - total_allocated_budget
-                conn.close()
+                with database.connection() as conn:
+                    remaining_budget = job_budget.get_budget(conn.cursor(), job_id)[3]
 
                 # **NEW CONDITION: Prevent adding a milestone if remaining budget is 0**
                 if remaining_budget <= 0:
@@ -293,7 +265,7 @@ def progress_display(user, job_id):
                 milestone_title = input("Enter milestone title: ").strip()
                 while True:
                     try:
-                        milestone_payment = float(input("Enter milestone payment: ").strip())
+                        milestone_payment = Money.parse(input("Enter milestone payment: "))
                         if milestone_payment <= 0:
                             print("Payment must be greater than 0.")
                             continue
@@ -311,6 +283,24 @@ def progress_display(user, job_id):
                 milestone_title = input("Enter milestone title to approve: ").strip()
                 user.approve_milestone(milestone_title)
             elif choice == "3":
+                picked = input("Enter milestone numbers separated by commas, or 'all' for those waiting for approval: ")
+                if picked.strip().lower() == "all":
+                    milestone_ids = [row[0] for row in shown_milestones if row[3] == "for approval"]
+                else:
+                    try:
+                        numbers = [int(number) for number in picked.split(",") if number.strip()]
+                        if any(not 1 <= number <= len(shown_milestones) for number in numbers):
+                            raise ValueError
+                        milestone_ids = [shown_milestones[number - 1][0] for number in numbers]
+                    except ValueError:
+                        print("Invalid input. Please enter numbers from the list.")
+                        milestone_ids = []
+                if milestone_ids:
+                    user.approve_milestones(milestone_ids)
+                else:
+                    print("No milestones selected.")
+                input("\nPress Enter to Return...")
+            elif choice == "4":
                 break  # Exit loop
             else:
                 print("Invalid choice. Please select a valid option.")
@@ -333,6 +323,7 @@ def display_sign_up():
     print("[1] Freelancer - Find and apply for jobs\n[2] Employer - Post jobs and hire talent ")
     Utility.divider()
     role = input("Enter role: ")
+    from user import User
     User.sign_up(username, password, role)
 
 def display_login():
@@ -340,16 +331,41 @@ def display_login():
     Utility.display_header("Login")
     username = input("Enter username: ")
     password = input("Enter password: ")
+    from user import User
     return User.login(username, password)
 
+def display_welcome():
+    Utility.clear_screen()
+    Utility.display_header("Welcome to ProDigi")
+    print("[1] Sign Up\n[2] Login\n[3] Exit")
+    Utility.divider()
+
+def profile_startup():
+    """Times imports, the schema check and painting the first screen, then reports them."""
+    start = time.perf_counter()
+    init_db()
+    ready = time.perf_counter()
+    display_welcome()
+    sys.stdout.flush()
+    painted = time.perf_counter()
+
+    here = os.path.dirname(os.path.abspath(__file__))
+    loaded = sorted(name for name, module in list(sys.modules.items())
+                    if os.path.dirname(os.path.abspath(getattr(module, "__file__", None) or "/")) == here)
+    Utility.display_header("Startup Profile")
+    print(f"{'imports (main.py)':<22}{(IMPORTED - STARTED) * 1000:>9.2f} ms")
+    print(f"{'schema check':<22}{(ready - start) * 1000:>9.2f} ms")
+    print(f"{'first screen':<22}{(painted - ready) * 1000:>9.2f} ms")
+    print(f"{'total':<22}{(painted - STARTED) * 1000:>9.2f} ms")
+    print(f"\n{len(sys.modules)} modules loaded, {len(loaded)} from this project:")
+    print(", ".join(loaded))
+    print("Interpreter start-up is not included; `python -X importtime main.py --profile-startup` breaks imports down.")
+    Utility.divider()
+
 def main():
     init_db()  # Initialize the database
-    conn = sqlite3.connect("freelancer_marketplace.db")
     while True:
-        Utility.clear_screen()
-        Utility.display_header("Welcome to ProDigi")
-        print("[1] Sign Up\n[2] Login\n[3] Exit")
-        Utility.divider()
+        display_welcome()
         choice = input("Select an option: ")
 
         if choice == "1":
@@ -377,5 +393,54 @@ def main():
             time.sleep(1.5)
             Utility.clear_screen()
 
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="ProDigi freelance marketplace")
+    parser.add_argument("--explain", action="store_true",
+                        help="print EXPLAIN QUERY PLAN for every shipped query and exit")
+    parser.add_argument("--storage-profile", choices=storage.PROFILES, default=storage.DEFAULT_PROFILE,
+                        help="SQLite journal, sync, cache and busy-timeout settings (default %(default)s)")
+    parser.add_argument("--slow-query-ms", type=float, default=querylog.SLOW_QUERY_MS,
+                        help="log statements slower than this many milliseconds (default %(default)s)")
+    parser.add_argument("--slow-query-log", default=querylog.SLOW_QUERY_LOG,
+                        help="file for the slow-query log (default %(default)s)")
+    parser.add_argument("--query-summary", action="store_true",
+                        help="show the session's query statistics when a user logs out")
+    parser.add_argument("--profile-startup", action="store_true",
+                        help="report import, schema-check and first-screen times and exit")
+    parser.add_argument("--check-budgets", choices=("report", "repair"), nargs="?", const="report",
+                        help="compare job_budget_summary with the milestones (and rebuild it with 'repair') and exit")
+    parser.add_argument("--batch", metavar="SCRIPT",
+                        help="run a script of JSON operations (one per line, '-' for stdin) without prompts and exit")
+    parser.add_argument("--password-hasher", choices=passwords.HASHERS, default=passwords.DEFAULT_ALGORITHM,
+                        help="algorithm for new password hashes (default %(default)s)")
+    parser.add_argument("--password-cost", type=int,
+                        help="work factor for new password hashes: PBKDF2 iterations or scrypt log2(N) "
+                             "(default: the algorithm's own); older hashes are upgraded at login")
+    args = parser.parse_args(argv)
+    if args.password_cost is not None and args.password_cost <= 0:
+        parser.error("--password-cost must be a positive integer")
+    return args
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    args = parse_args()
+    database.use_profile(args.storage_profile)
+    querylog.configure(slow_query_ms=args.slow_query_ms, log_path=args.slow_query_log,
+                       session_summary=args.query_summary)
+    passwords.configure(algorithm=args.password_hasher, cost=args.password_cost)
+    if args.profile_startup:
+        profile_startup()
+    elif args.explain:
+        import indexes
+        init_db()
+        indexes.print_query_plans()
+    elif args.check_budgets:
+        init_db()
+        with database.connection() as conn:
+            drifted = job_budget.print_budget_check(conn, repair=args.check_budgets == "repair")
+        sys.exit(1 if drifted and args.check_budgets == "report" else 0)
+    elif args.batch:
+        import batch
+        init_db()
+        sys.exit(1 if batch.run_file(args.batch) else 0)
+    else:
+        main()
\ No newline at end of file
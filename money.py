@@ -0,0 +1,100 @@
+import re
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+
+# Money columns and the tables that hold them. They store integer centavos, so
+# sums and comparisons are exact and need no float rounding.
+MONEY_COLUMNS = {
+    "wallet": ("balance",),
+    "temporary_wallet": ("balance",),  # before per-job escrow accounts
+    "jobs": ("budget",),
+    "milestones": ("payment",),
+    "payments": ("amount",),
+    "ledger_entries": ("amount", "balance_after"),
+}
+
+CENTS = Decimal(100)
+
+
+class Money(int):
+    """An amount of money held as an integer number of centavos.
+
+    `Money(1250)` is Php 12.50. Use `Money.parse` for user input in pesos. Being
+    an int, it binds to SQLite as INTEGER and compares with plain cents.
+    """
+
+    @classmethod
+    def parse(cls, value):
+        """Converts pesos (str, int, float, Decimal) to Money, rounding half up to the centavo."""
+        if isinstance(value, Money):
+            return value
+        try:
+            pesos = Decimal(str(value).strip().replace(",", ""))
+        except InvalidOperation:
+            raise ValueError(f"Invalid amount: {value!r}") from None
+        if not pesos.is_finite():
+            raise ValueError(f"Invalid amount: {value!r}")
+        return cls(int((pesos * CENTS).quantize(Decimal(1), rounding=ROUND_HALF_UP)))
+
+    @property
+    def cents(self):
+        return int(self)
+
+    def to_decimal(self):
+        return Decimal(int(self)) / CENTS
+
+    def __add__(self, other):
+        return Money(int(self) + int(other))
+
+    __radd__ = __add__
+
+    def __sub__(self, other):
+        return Money(int(self) - int(other))
+
+    def __rsub__(self, other):
+        return Money(int(other) - int(self))
+
+    def __neg__(self):
+        return Money(-int(self))
+
+    def __str__(self):
+        return f"{self.to_decimal():,.2f}"
+
+    def __repr__(self):
+        return f"Money({int(self)})"
+
+    def __format__(self, spec):
+        # f"{balance:.2f}" formats pesos, not centavos
+        return format(self.to_decimal(), spec) if spec else str(self)
+
+
+def migrate_to_cents(conn):
+    """Rewrites REAL money columns as INTEGER centavos. Columns already INTEGER are skipped.
+
+    Tables are rebuilt one at a time in batches (schema.rewrite_table), so a large
+    database keeps accepting writes while it converts; a table left half done by
+    an interruption is still REAL and converts on the next run.
+    """
+    import schema
+
+    cursor = conn.cursor()
+    for table, columns in MONEY_COLUMNS.items():
+        cursor.execute(f"PRAGMA table_info({table})")
+        info = cursor.fetchall()
+        real = {row[1] for row in info if row[1] in columns and row[2].upper() == "REAL"}
+        if not real:
+            continue
+        keys = [row[1] for row in info if row[5] == 1]
+        cursor.execute("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?", (table,))
+        schema.rewrite_table(
+            conn, table, _integer_columns(cursor.fetchone()[0], real), [row[1] for row in info], keys[0],
+            {column: f"CAST(ROUND({{row}}{column} * 100) AS INTEGER)" for column in real},
+        )
+
+
+def _integer_columns(create_sql, real_columns):
+    """Returns a CREATE TABLE statement with the given REAL columns declared INTEGER."""
+    for column in real_columns:
+        create_sql = re.sub(rf"(\b{column}\s+)REAL(\s+DEFAULT\s+0\.0)?",
+                            lambda m: m.group(1) + "INTEGER" + (" DEFAULT 0" if m.group(2) else ""),
+                            create_sql, flags=re.IGNORECASE)
+    return create_sql
@@ -0,0 +1,194 @@
+import base64
+import os
+import threading
+
+# Password hashing. A stored hash names its algorithm and cost next to the salt
+# ("pbkdf2_sha256$260000$<salt>$<hash>"), so the setting can be raised at any
+# time: a hash made with another algorithm or cost is replaced the next time
+# its user logs in (see needs_upgrade). A bare 64-character hex string is an
+# unsalted SHA-256 hash from before this module; it still verifies and is
+# upgraded the same way.
+#
+# A good hash is deliberately slow, so a front end serving several users at once
+# should not compute it on its event loop or request thread. submit_hash and
+# submit_verify (and the async wrappers) run it on a shared pool; hashlib
+# releases the GIL while it works, so a thread pool already runs in parallel.
+
+SALT_BYTES = 16
+DEFAULT_ALGORITHM = "pbkdf2_sha256"
+POOL_KINDS = ("thread", "process")
+
+
+class PBKDF2Hasher:
+    """PBKDF2-HMAC-SHA256; the cost is the iteration count."""
+
+    algorithm = "pbkdf2_sha256"
+    default_cost = 260_000
+
+    def digest(self, password, salt, cost):
+        import hashlib  # loads OpenSSL; not needed until someone signs up or logs in
+
+        return hashlib.pbkdf2_hmac("sha256", password.encode(), salt, cost)
+
+
+class ScryptHasher:
+    """scrypt with r=8, p=1; the cost is log2 of N, which sets both time and memory (1 KiB * N)."""
+
+    algorithm = "scrypt"
+    default_cost = 15
+
+    def digest(self, password, salt, cost):
+        import hashlib
+
+        n = 2 ** cost
+        return hashlib.scrypt(password.encode(), salt=salt, n=n, r=8, p=1, maxmem=2048 * n)
+
+
+# Algorithms by the name stored in the hash. register_hasher adds more.
+HASHERS = {hasher.algorithm: hasher for hasher in (PBKDF2Hasher(), ScryptHasher())}
+
+_algorithm = DEFAULT_ALGORITHM
+_cost = None  # None: the algorithm's default_cost
+_pool_kind = "thread"
+_workers = None
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def register_hasher(hasher):
+    """Makes an algorithm available to configure() and to verify its stored hashes.
+
+    A hasher has an `algorithm` name, a `default_cost` and a
+    `digest(password, salt, cost)` method returning bytes.
+    """
+    HASHERS[hasher.algorithm] = hasher
+
+
+def configure(algorithm=None, cost=None, pool=None, workers=None):
+    """Sets the algorithm and cost new hashes use, and the kind and size of the hashing pool."""
+    global _algorithm, _cost, _pool_kind, _workers
+    if algorithm is not None:
+        if algorithm not in HASHERS:
+            raise ValueError(f"Unknown password hasher {algorithm!r}; choose from {', '.join(HASHERS)}.")
+        if algorithm != _algorithm:
+            _cost = None
+        _algorithm = algorithm
+    if cost is not None:
+        if int(cost) <= 0:
+            raise ValueError("Password hashing cost must be a positive integer.")
+        _cost = int(cost)
+    if pool is not None or workers is not None:
+        if pool is not None and pool not in POOL_KINDS:
+            raise ValueError(f"Pool must be one of {', '.join(POOL_KINDS)}.")
+        shutdown()
+        _pool_kind = pool or _pool_kind
+        _workers = workers or None
+
+
+def current_setting():
+    """Returns {"algorithm", "cost"} for new hashes."""
+    return {"algorithm": _algorithm, "cost": _cost or HASHERS[_algorithm].default_cost}
+
+
+def _b64(data):
+    return base64.b64encode(data).decode("ascii")
+
+
+def hash_password(password, algorithm=None, cost=None):
+    """Hashes a password with a fresh salt. Returns the string to store."""
+    setting = current_setting()
+    algorithm = algorithm or setting["algorithm"]
+    cost = cost or (setting["cost"] if algorithm == setting["algorithm"] else HASHERS[algorithm].default_cost)
+    salt = os.urandom(SALT_BYTES)
+    digest = HASHERS[algorithm].digest(password, salt, cost)
+    return f"{algorithm}${cost}${_b64(salt)}${_b64(digest)}"
+
+
+def _is_legacy(stored):
+    return len(stored) == 64 and "$" not in stored
+
+
+def _parse(stored):
+    """Returns (algorithm, cost, salt, digest), or None if `stored` isn't a hash this module made."""
+    parts = stored.split("$")
+    if len(parts) != 4 or parts[0] not in HASHERS:
+        return None
+    try:
+        return parts[0], int(parts[1]), base64.b64decode(parts[2]), base64.b64decode(parts[3])
+    except ValueError:
+        return None
+
+
+def verify_password(password, stored):
+    """True if `password` matches the stored hash. Comparison takes the same time either way."""
+    import hmac
+
+    if not stored:
+        return False
+    if _is_legacy(stored):
+        import hashlib
+
+        return hmac.compare_digest(hashlib.sha256(password.encode()).hexdigest(), stored)
+    parsed = _parse(stored)
+    if parsed is None:
+        return False
+    algorithm, cost, salt, digest = parsed
+    return hmac.compare_digest(HASHERS[algorithm].digest(password, salt, cost), digest)
+
+
+def needs_upgrade(stored):
+    """True if the hash was made with something other than the current algorithm and cost."""
+    if _is_legacy(stored):
+        return True
+    parsed = _parse(stored)
+    setting = current_setting()
+    return parsed is None or (parsed[0], parsed[1]) != (setting["algorithm"], setting["cost"])
+
+
+def get_executor():
+    """The shared hashing pool, created on first use."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+            if _pool_kind == "process":
+                _executor = ProcessPoolExecutor(max_workers=_workers)
+            else:
+                _executor = ThreadPoolExecutor(max_workers=_workers, thread_name_prefix="passwords")
+        return _executor
+
+
+def shutdown():
+    """Stops the hashing pool; the next submit starts a new one."""
+    global _executor
+    with _executor_lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown()
+
+
+def submit_hash(password):
+    """Hashes on the pool. Returns a concurrent.futures.Future of the stored string."""
+    setting = current_setting()
+    # Algorithm and cost are passed along: a process-pool worker has its own settings
+    return get_executor().submit(hash_password, password, setting["algorithm"], setting["cost"])
+
+
+def submit_verify(password, stored):
+    """Verifies on the pool. Returns a concurrent.futures.Future of the result."""
+    return get_executor().submit(verify_password, password, stored)
+
+
+async def hash_password_async(password):
+    """hash_password for asyncio code: the event loop keeps running meanwhile."""
+    import asyncio
+
+    return await asyncio.wrap_future(submit_hash(password))
+
+
+async def verify_password_async(password, stored):
+    """verify_password for asyncio code: the event loop keeps running meanwhile."""
+    import asyncio
+
+    return await asyncio.wrap_future(submit_verify(password, stored))
@@ -1,29 +1,51 @@
-import sqlite3
+import threading
 import time
+import database
+import ledger
+from money import Money
 
 class Wallet:
     def __init__(self, user_id):  # Use user_id instead of username
         self.user_id = user_id
-        self.balance = self.get_balance_from_db()
+        self._balance = None  # read on first use
+
+    @property
+    def balance(self):
+        """The cached balance, read from the database on first use or after invalidate()."""
+        if self._balance is None:
+            self._balance = self.get_balance_from_db()
+        return self._balance
+
+    @balance.setter
+    def balance(self, balance):
+        self._balance = balance
+
+    def invalidate(self):
+        """Forgets the cached balance so the next read goes to the database."""
+        self._balance = None
 
     def get_balance_from_db(self):
         """Fetches the wallet balance for the user from the database."""
-        conn = sqlite3.connect("freelancer_marketplace.db")
-        cursor = conn.cursor()
-        cursor.execute("SELECT balance FROM wallet WHERE user_id = ?", (self.user_id,))
-        result = cursor.fetchone()
-        conn.close()
-        return result[0] if result else 0.0  # Return balance or default 0.0
+        with database.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT balance FROM wallet WHERE user_id = ?", (self.user_id,))
+            result = cursor.fetchone()
+        return Money(result[0] if result else 0)  # Return balance or default 0
 
     def update_balance(self, amount):
-        """Updates the user's wallet balance in the database."""
-        conn = sqlite3.connect("freelancer_marketplace.db")
-        cursor = conn.cursor()
-        cursor.execute("UPDATE wallet SET balance = balance + ? WHERE user_id = ?", (amount, self.user_id))
-        conn.commit()
-        conn.close()
+        """Credits (amount > 0) or conditionally debits (amount < 0) the wallet through the ledger.
+
+        `amount` is in centavos (Money).
+        """
+        with database.connection() as conn:
+            if amount >= 0:
+                self.balance = ledger.deposit(conn, self.user_id, amount)
+            else:
+                # Raises InsufficientFundsError if another session spent the money first
+                self.balance = ledger.withdraw(conn, self.user_id, -amount)
 
     def deposit(self, amount):
+        amount = Money.parse(amount)
         if amount > 0:
             self.update_balance(amount)
             print("\nSuccessfully deposited!")
@@ -33,31 +55,72 @@ class Wallet:
             time.sleep(1.5)
 
     def withdraw(self, amount):
+        amount = Money.parse(amount)
+        # self.balance is only a hint for a fast rejection; the ledger debit is authoritative
         if amount > self.balance:
             print("\nInsufficient funds!")
             time.sleep(1.5)
         elif amount > 0:
-            self.update_balance(-amount)
+            try:
+                self.update_balance(-amount)
+            except ledger.InsufficientFundsError:
+                print("\nInsufficient funds!")
+                time.sleep(1.5)
+                return
             print(f"Successfuly Withdrawed!")
             time.sleep(1.5)
         else:
             print("Invalid withdrawal amount!")
             time.sleep(1.5)
 
+class WalletRepository:
+    """A session's Wallet objects, one per user. Ledger writes keep their cached balances current.
+
+    A balance is queried once; after that a deposit, withdrawal, transfer or
+    escrow payout made anywhere in this process updates (or at worst
+    invalidates) it, so redrawing a screen costs no query.
+    """
+
+    def __init__(self):
+        self._wallets = {}
+        self._lock = threading.Lock()
+        ledger.add_balance_listener(self._balance_changed)
+
+    def get(self, user_id):
+        """Returns the session's Wallet for a user, creating it (without a query) on first use."""
+        with self._lock:
+            wallet = self._wallets.get(user_id)
+            if wallet is None:
+                wallet = self._wallets[user_id] = Wallet(user_id)
+        return wallet
+
+    def invalidate(self, user_id=None):
+        """Drops cached balances (all of them by default), e.g. after writes made outside the ledger."""
+        with self._lock:
+            wallets = list(self._wallets.values()) if user_id is None else [self._wallets.get(user_id)]
+        for wallet in wallets:
+            if wallet is not None:
+                wallet.invalidate()
+
+    def _balance_changed(self, user_id, balance):
+        wallet = self._wallets.get(user_id)
+        if wallet is not None:
+            wallet.balance = balance  # None invalidates
+
 class Payment:
     def __init__(self, amount, milestone):
-        self.amount = amount
+        self.amount = Money.parse(amount)
         self.milestone = milestone
         self.status = "Pending"
 
     def release_payment(self, employer_wallet, freelancer_wallet):
         """Transfers funds from employer to freelancer."""
-        if employer_wallet.get_balance_from_db() >= self.amount:
-            employer_wallet.withdraw(self.amount)
-            freelancer_wallet.deposit(self.amount)
-            self.status = "Paid"
-            print(f"Php {self.amount} transferred for milestone '{self.milestone}'")
-        else:
+        try:
+            with database.connection() as conn:
+                ledger.transfer(conn, employer_wallet.user_id, freelancer_wallet.user_id, self.amount,
+                                memo=f"milestone:{self.milestone}")
+        except ledger.InsufficientFundsError:
             print("Insufficient funds to release payment!")
-
-
+            return
+        self.status = "Paid"
+        print(f"Php {self.amount} transferred for milestone '{self.milestone}'")
\ No newline at end of file
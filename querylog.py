@@ -0,0 +1,287 @@
+import re
+import sqlite3
+import sys
+import threading
+import time
+
+# Query instrumentation. Pooled connections are opened with InstrumentedConnection,
+# whose cursors time every statement (execute plus the fetches that read its
+# rows), count the rows returned and note the calling function. Results are
+# aggregated per statement fingerprint; statements slower than SLOW_QUERY_MS
+# are also written to the slow-query log.
+
+ENABLED = True
+SLOW_QUERY_MS = 50.0
+SLOW_QUERY_LOG = "slow_queries.log"
+SESSION_SUMMARY = False  # print a per-session summary on logout
+
+# Silent until configure() names the log file (main.py does at startup)
+_log_file = None
+_slow_log = None
+_slow_log_lock = threading.Lock()
+
+# Frames from these modules are plumbing, not the caller worth reporting
+_SKIP_MODULES = {__name__, "database", "contextlib", "sqlite3"}
+
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_IN_LISTS = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_SPACES = re.compile(r"\s+")
+
+
+def fingerprint(sql):
+    """Normalizes a statement so calls that differ only in values group together."""
+    sql = _LITERALS.sub("?", sql)
+    sql = _IN_LISTS.sub("(?...)", sql)
+    return _SPACES.sub(" ", sql).strip()
+
+
+def _caller():
+    frame = sys._getframe(3)
+    while frame is not None and frame.f_globals.get("__name__") in _SKIP_MODULES:
+        frame = frame.f_back
+    if frame is None:
+        return "?"
+    return f"{frame.f_globals.get('__name__')}.{frame.f_code.co_qualname}"
+
+
+class QueryStats:
+    """Thread-safe per-fingerprint totals: calls, time, rows and callers."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def add(self, fingerprint, caller, seconds, rows, calls=1):
+        with self._lock:
+            entry = self._stats.get(fingerprint)
+            if entry is None:
+                entry = self._stats[fingerprint] = {"calls": 0, "total_ms": 0.0, "max_ms": 0.0, "rows": 0, "callers": set()}
+            entry["calls"] += calls
+            entry["total_ms"] += seconds * 1000
+            entry["rows"] += rows
+            entry["callers"].add(caller)
+
+    def note_duration(self, fingerprint, seconds):
+        with self._lock:
+            entry = self._stats.get(fingerprint)
+            if entry is not None:
+                entry["max_ms"] = max(entry["max_ms"], seconds * 1000)
+
+    def snapshot(self):
+        """Returns {fingerprint: stats}, slowest total first."""
+        with self._lock:
+            items = [(key, dict(value, callers=sorted(value["callers"]))) for key, value in self._stats.items()]
+        for _, entry in items:
+            entry["avg_ms"] = entry["total_ms"] / entry["calls"] if entry["calls"] else 0.0
+        return dict(sorted(items, key=lambda item: -item[1]["total_ms"]))
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+
+
+stats = QueryStats()
+_sessions = []
+_sessions_lock = threading.Lock()
+
+
+def start_session():
+    """Starts collecting a separate QueryStats (e.g. for one logged-in user) alongside the global one."""
+    session = QueryStats()
+    with _sessions_lock:
+        _sessions.append(session)
+    return session
+
+
+def end_session(session):
+    with _sessions_lock:
+        if session in _sessions:
+            _sessions.remove(session)
+    return session
+
+
+def _collectors():
+    with _sessions_lock:
+        return [stats] + _sessions
+
+
+class _Statement:
+    """One executed statement, open until its cursor moves on."""
+
+    __slots__ = ("fingerprint", "sql", "caller", "seconds", "rows")
+
+    def __init__(self, sql, caller, seconds):
+        self.fingerprint = fingerprint(sql)
+        self.sql = sql
+        self.caller = caller
+        self.seconds = seconds
+        self.rows = 0
+
+
+class InstrumentedCursor(sqlite3.Cursor):
+    """A cursor that reports each statement's time, rows and caller to the collectors."""
+
+    _statement = None
+
+    def _begin(self, sql, started):
+        self._finish()
+        statement = self._statement = _Statement(sql, _caller(), time.perf_counter() - started)
+        for collector in _collectors():
+            collector.add(statement.fingerprint, statement.caller, statement.seconds, 0)
+
+    def _fetched(self, started, rows, exhausted):
+        statement = self._statement
+        if statement is None:
+            return
+        elapsed = time.perf_counter() - started
+        statement.seconds += elapsed
+        statement.rows += rows
+        for collector in _collectors():
+            collector.add(statement.fingerprint, statement.caller, elapsed, rows, calls=0)
+        if exhausted:
+            self._finish()
+
+    def _finish(self):
+        statement = self._statement
+        if statement is None:
+            return
+        self._statement = None
+        for collector in _collectors():
+            collector.note_duration(statement.fingerprint, statement.seconds)
+        if statement.seconds * 1000 >= SLOW_QUERY_MS:
+            get_slow_log().warning("%.2f ms  rows=%d  caller=%s  sql=%s",
+                                   statement.seconds * 1000, statement.rows, statement.caller, statement.fingerprint)
+
+    def execute(self, sql, parameters=()):
+        started = time.perf_counter()
+        super().execute(sql, parameters)
+        self._begin(sql, started)
+        if self.description is None:
+            self._finish()  # no result set to read
+        return self
+
+    def executemany(self, sql, seq_of_parameters):
+        started = time.perf_counter()
+        super().executemany(sql, seq_of_parameters)
+        self._begin(sql, started)
+        self._finish()
+        return self
+
+    def fetchone(self):
+        started = time.perf_counter()
+        row = super().fetchone()
+        self._fetched(started, row is not None, row is None)
+        return row
+
+    def fetchmany(self, size=None):
+        started = time.perf_counter()
+        rows = super().fetchmany(self.arraysize if size is None else size)
+        self._fetched(started, len(rows), len(rows) < (self.arraysize if size is None else size))
+        return rows
+
+    def fetchall(self):
+        started = time.perf_counter()
+        rows = super().fetchall()
+        self._fetched(started, len(rows), True)
+        return rows
+
+    def __next__(self):
+        started = time.perf_counter()
+        try:
+            row = super().__next__()
+        except StopIteration:
+            self._fetched(started, 0, True)
+            raise
+        self._fetched(started, 1, False)
+        return row
+
+    def close(self):
+        self._finish()
+        super().close()
+
+    def __del__(self):
+        # Statements read with a single fetchone() end when their cursor is dropped
+        try:
+            self._finish()
+        except Exception:
+            pass  # interpreter shutdown
+
+
+class InstrumentedConnection(sqlite3.Connection):
+    """A connection whose cursors, including those behind conn.execute(), are instrumented."""
+
+    def cursor(self, factory=InstrumentedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+
+def connection_factory():
+    """The sqlite3.connect factory the pool should use."""
+    return InstrumentedConnection if ENABLED else sqlite3.Connection
+
+
+def get_slow_log():
+    """The slow-query logger. `logging` is imported the first time a statement is slow."""
+    global _slow_log
+    with _slow_log_lock:
+        if _slow_log is None:
+            import logging
+
+            _slow_log = logging.getLogger("prodigi.slow_queries")
+            _slow_log.propagate = False
+            _attach_handler()
+    return _slow_log
+
+
+def _attach_handler():
+    import logging
+
+    for handler in list(_slow_log.handlers):
+        _slow_log.removeHandler(handler)
+        handler.close()
+    if _log_file:
+        handler = logging.FileHandler(_log_file, delay=True, encoding="utf-8")
+        handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+    else:
+        handler = logging.NullHandler()
+    _slow_log.addHandler(handler)
+
+
+def configure(enabled=None, slow_query_ms=None, log_path=None, session_summary=None):
+    """Adjusts instrumentation; `log_path` starts writing the slow-query log to that file.
+
+    Connections opened afterwards pick up `enabled`.
+    """
+    global ENABLED, SLOW_QUERY_MS, SLOW_QUERY_LOG, SESSION_SUMMARY, _log_file
+    if enabled is not None:
+        ENABLED = enabled
+    if slow_query_ms is not None:
+        SLOW_QUERY_MS = slow_query_ms
+    if session_summary is not None:
+        SESSION_SUMMARY = session_summary
+    if log_path is not None:
+        SLOW_QUERY_LOG = _log_file = log_path
+        with _slow_log_lock:
+            if _slow_log is not None:
+                _attach_handler()
+
+
+def print_summary(collected, limit=10, title="Query Summary"):
+    """Prints the statements that took the most total time."""
+    from utils import Utility
+
+    entries = list(collected.snapshot().items())[:limit]
+    Utility.display_header(title)
+    if not entries:
+        print("No queries recorded.")
+    for sql, entry in entries:
+        print(f"{entry['calls']:>5}x  {entry['total_ms']:8.2f} ms total  {entry['avg_ms']:7.2f} ms avg  "
+              f"{entry['max_ms']:7.2f} ms max  {entry['rows']} rows")
+        print(f"       {sql[:120]}")
+        print(f"       from {', '.join(entry['callers'])}")
+    Utility.divider()
@@ -0,0 +1,107 @@
+import re
+
+import database
+
+# Score = weighted sum of three factors, each in [0, 1]
+WEIGHTS = {"skills": 0.6, "budget": 0.3, "duration": 0.1}
+
+HOURS_PER_UNIT = {"hour": 1, "day": 8, "week": 40, "month": 160, "year": 1920}
+DEFAULT_HOURS = 40
+
+
+def estimate_hours(duration):
+    """Turns a free-text duration such as '2 weeks' or '1 month' into working hours.
+
+    The text must start with the number; anything else counts as DEFAULT_HOURS.
+    _hours_sql computes the same value inside a query, so the number is read the
+    way SQLite's CAST reads one: sign, '.5' and '5.' forms and an exponent included.
+    """
+    text = (duration or "").strip().lower()
+    match = re.match(r"[+-]?(?:\d+\.?\d*|\.\d+)(?:e[+-]?\d+)?", text)
+    number = float(match.group()) if match else 0
+    unit = next((hours for unit, hours in HOURS_PER_UNIT.items() if unit in text), None)
+    return number * unit if number > 0 and unit else DEFAULT_HOURS
+
+
+def _hours_sql(column):
+    """SQL for estimate_hours(column): CAST reads the leading number, LIKE finds the unit."""
+    units = " ".join(f"WHEN lower({column}) LIKE '%{unit}%' THEN {hours}" for unit, hours in HOURS_PER_UNIT.items())
+    return (f"COALESCE(CASE WHEN CAST(trim({column}) AS REAL) > 0 "
+            f"THEN CAST(trim({column}) AS REAL) * (CASE {units} END) END, {DEFAULT_HOURS})")
+
+
+def recommend_jobs(user_id, limit=10):
+    """Returns open jobs ranked by fit for a freelancer, as (id, title, budget, duration, score).
+
+    Skill overlap, budget and duration are scored in SQL: the freelancer's
+    skills are joined with each open job's through the job_skills index, and
+    only the `limit` best rows come back to Python.
+    """
+    with database.connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(f"""
+            WITH mine AS (SELECT skill_id FROM user_skills WHERE user_id = :user),
+            fit AS (
+                SELECT j.id, j.title, j.budget, j.duration, {_hours_sql("j.duration")} AS hours,
+                       (SELECT COUNT(*) FROM job_skills js WHERE js.job_id = j.id) AS wanted,
+                       (SELECT COUNT(*) FROM job_skills js JOIN mine m ON m.skill_id = js.skill_id
+                        WHERE js.job_id = j.id) AS shared
+                FROM jobs j
+                WHERE j.status = 'open'
+            ),
+            rate AS (SELECT hourly_rate FROM users WHERE id = :user)
+            SELECT id, title, budget, duration,
+                   :w_skills * (CASE WHEN wanted THEN 1.0 * shared / wanted ELSE 0.0 END)
+                   -- budget is in centavos, hourly_rate in pesos
+                   + :w_budget * (CASE WHEN (SELECT hourly_rate FROM rate)
+                                  THEN MIN(1.0, COALESCE(budget, 0) / 100.0 / ((SELECT hourly_rate FROM rate) * hours))
+                                  ELSE 0.5 END)
+                   + :w_duration * (1.0 / (1.0 + hours / {HOURS_PER_UNIT["month"]})) AS score
+            FROM fit
+            ORDER BY score DESC, id
+            LIMIT :limit
+        """, {"user": user_id, "limit": limit, "w_skills": WEIGHTS["skills"], "w_budget": WEIGHTS["budget"],
+              "w_duration": WEIGHTS["duration"]})
+        return [row[:4] + (round(row[4], 3),) for row in cursor.fetchall()]
+
+
+def rank_applicants(job_id, applicants):
+    """Orders applicant rows from Employer.view_applicants (freelancer id first) by fit, best first.
+
+    Returns (score, row) pairs. The scores come from one query that counts each
+    applicant's skills shared with the job (user_skills joined with job_skills,
+    grouped by applicant) and weighs their hourly rate against the budget.
+    """
+    if not applicants:
+        return []
+    ids = [row[0] for row in applicants]
+    placeholders = ", ".join("?" * len(ids))
+
+    with database.connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(f"""
+            WITH job AS (
+                SELECT COALESCE(budget, 0) / 100.0 AS budget, {_hours_sql("duration")} AS hours,
+                       (SELECT COUNT(*) FROM job_skills WHERE job_id = jobs.id) AS wanted
+                FROM jobs WHERE id = ?
+            ),
+            shared AS (
+                SELECT us.user_id, COUNT(*) AS shared
+                FROM user_skills us
+                JOIN job_skills js ON js.skill_id = us.skill_id AND js.job_id = ?
+                WHERE us.user_id IN ({placeholders})
+                GROUP BY us.user_id
+            )
+            SELECT u.id,
+                   ? * (CASE WHEN job.wanted THEN 1.0 * COALESCE(s.shared, 0) / job.wanted ELSE 0.0 END)
+                   -- applicants at or under the job's implied hourly rate fit the budget
+                   + ? * (CASE WHEN u.hourly_rate THEN MIN(1.0, job.budget / job.hours / u.hourly_rate) ELSE 0.5 END)
+            FROM users u
+            CROSS JOIN job
+            LEFT JOIN shared s ON s.user_id = u.id
+            WHERE u.id IN ({placeholders})
+        """, [job_id, job_id, *ids, WEIGHTS["skills"], WEIGHTS["budget"] + WEIGHTS["duration"], *ids])
+        scores = dict(cursor.fetchall())
+
+    ranked = sorted(applicants, key=lambda row: -scores.get(row[0], 0.0))
+    return [(round(scores.get(row[0], 0.0), 3), row) for row in ranked]
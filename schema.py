@@ -0,0 +1,301 @@
+import importlib
+import re
+
+# The one place the database layout is defined. Each migration moves the schema
+# from version N-1 to N and the version reached is kept in PRAGMA user_version,
+# so a database that is already current costs one PRAGMA read at startup.
+#
+# Every step is safe to rerun (CREATE ... IF NOT EXISTS, or a check of what is
+# already there). That is how databases from before versioning are adopted: they
+# report version 0, and replaying the steps only fills in whatever is missing.
+
+# Rows copied per transaction when a table is rebuilt (see rewrite_table)
+BATCH_SIZE = 5000
+
+CORE_SCHEMA = (
+    # Users table (Freelancers & Employers)
+    '''
+    CREATE TABLE IF NOT EXISTS users (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        username TEXT UNIQUE NOT NULL,
+        password TEXT NOT NULL,
+        role TEXT CHECK(role IN ('Freelancer', 'Employer')) NOT NULL,
+        name TEXT DEFAULT NULL,
+        skills TEXT,
+        experience TEXT,
+        hourly_rate REAL,
+        payment_method TEXT,
+        company_name TEXT
+    )
+    ''',
+    # Wallet table
+    '''
+    CREATE TABLE IF NOT EXISTS wallet (
+        user_id INTEGER PRIMARY KEY,
+        balance INTEGER DEFAULT 0,
+        FOREIGN KEY (user_id) REFERENCES users(id)
+    )
+    ''',
+    # Job Listings table
+    '''
+    CREATE TABLE IF NOT EXISTS jobs (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        employer_id INTEGER NOT NULL,
+        title TEXT NOT NULL,
+        description TEXT NOT NULL,
+        budget INTEGER NOT NULL,
+        skills_required TEXT NOT NULL,
+        duration TEXT NOT NULL,
+        status TEXT CHECK(status IN ('open', 'in_progress', 'completed')) DEFAULT 'open',
+        FOREIGN KEY (employer_id) REFERENCES users(id)
+    )
+    ''',
+    # Job Applications table
+    '''
+    CREATE TABLE IF NOT EXISTS job_applications (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        job_id INTEGER NOT NULL,
+        freelancer_id INTEGER NOT NULL,
+        status TEXT CHECK(status IN ('applied', 'accepted', 'rejected', 'in_progress', 'completed')) DEFAULT 'applied',
+        FOREIGN KEY (job_id) REFERENCES jobs(id),
+        FOREIGN KEY (freelancer_id) REFERENCES users(id)
+    )
+    ''',
+    # Milestones table
+    '''
+    CREATE TABLE IF NOT EXISTS milestones (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        job_id INTEGER NOT NULL,
+        freelancer_id INTEGER NOT NULL,
+        title TEXT NOT NULL,
+        status TEXT CHECK(status IN ('pending', 'for approval', 'approved')) DEFAULT 'pending',
+        payment INTEGER NOT NULL,
+        FOREIGN KEY (job_id) REFERENCES jobs(id),
+        FOREIGN KEY (freelancer_id) REFERENCES users(id)
+    )
+    ''',
+    # Payments table
+    '''
+    CREATE TABLE IF NOT EXISTS payments (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        employer_id INTEGER NOT NULL,
+        freelancer_id INTEGER NOT NULL,
+        job_id INTEGER NOT NULL,
+        milestone_id INTEGER NOT NULL,
+        amount INTEGER NOT NULL,
+        status TEXT CHECK(status IN ('pending', 'released')) DEFAULT 'pending',
+        FOREIGN KEY (employer_id) REFERENCES users(id),
+        FOREIGN KEY (freelancer_id) REFERENCES users(id),
+        FOREIGN KEY (job_id) REFERENCES jobs(id),
+        FOREIGN KEY (milestone_id) REFERENCES milestones(id)
+    )
+    ''',
+)
+
+# Escrow held for a freelancer until their job's payment is released
+TEMPORARY_WALLET_SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS temporary_wallet (
+        freelancer_id INTEGER PRIMARY KEY,
+        employer_id INTEGER NOT NULL,
+        balance INTEGER DEFAULT 0,
+        FOREIGN KEY (freelancer_id) REFERENCES users(id) ON DELETE CASCADE,
+        FOREIGN KEY (employer_id) REFERENCES users(id) ON DELETE CASCADE
+    )
+'''
+
+
+def create_core_tables(conn):
+    """Creates the core marketplace tables if they don't exist yet."""
+    cursor = conn.cursor()
+    for statement in CORE_SCHEMA + (TEMPORARY_WALLET_SCHEMA,):
+        cursor.execute(statement)
+    conn.commit()
+
+
+def unify_temporary_wallet(conn):
+    """Folds the old one-row-per-hold temporary_wallet layout into one row per freelancer."""
+    cursor = conn.cursor()
+    cursor.execute("PRAGMA table_info(temporary_wallet)")
+    if "id" not in {row[1] for row in cursor.fetchall()}:
+        return
+
+    conn.commit()
+    cursor.execute("BEGIN IMMEDIATE")
+    try:
+        cursor.execute("ALTER TABLE temporary_wallet RENAME TO temporary_wallet__old")
+        cursor.execute(TEMPORARY_WALLET_SCHEMA)
+        # Holds add up; the employer of the latest hold is kept
+        cursor.execute("""
+            INSERT INTO temporary_wallet (freelancer_id, employer_id, balance)
+            SELECT freelancer_id, employer_id, total FROM (
+                SELECT freelancer_id, employer_id, SUM(balance) AS total, MAX(id)
+                FROM temporary_wallet__old GROUP BY freelancer_id
+            )
+        """)
+        cursor.execute("DROP TABLE temporary_wallet__old")
+    except BaseException:
+        conn.rollback()
+        raise
+    conn.commit()
+
+
+def _step(module, function):
+    """A migration step defined in another module, which is imported only if the step runs."""
+    def step(conn):
+        return getattr(importlib.import_module(module), function)(conn)
+    step.__qualname__ = f"{module}.{function}"
+    return step
+
+
+# (version, description, step). Append new steps; never renumber or edit shipped ones.
+MIGRATIONS = (
+    (1, "core marketplace tables", create_core_tables),
+    (2, "one temporary_wallet layout, keyed by freelancer", unify_temporary_wallet),
+    (3, "money columns as integer centavos", _step("money", "migrate_to_cents")),
+    (4, "secondary indexes", _step("indexes", "ensure_indexes")),
+    (5, "full-text job search", _step("job_search", "ensure_search_index")),
+    (6, "normalized skills tables", _step("skill_index", "ensure_skills_schema")),
+    (7, "append-only money ledger", _step("ledger", "ensure_ledger_schema")),
+    (8, "per-job escrow accounts", _step("ledger", "ensure_escrow_schema")),
+    (9, "per-job budget totals", _step("job_budget", "ensure_budget_summary")),
+    (10, "profile versions for session caches", _step("session", "ensure_profile_version")),
+    (11, "skill change log for in-memory indexes", _step("skill_index", "ensure_change_log")),
+    (12, "skill index readers, so applied changes can be pruned", _step("skill_index", "ensure_change_log")),
+)
+
+CORE_VERSION = 2  # tables only: nothing indexed or backfilled yet
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def current_version(conn):
+    """Returns the schema version recorded in the database file."""
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def pending_migrations(conn, target=LATEST_VERSION):
+    """Returns the (version, description, step) entries not applied yet."""
+    version = current_version(conn)
+    return [migration for migration in MIGRATIONS if version < migration[0] <= target]
+
+
+def migrate(conn, target=LATEST_VERSION, progress=None):
+    """Brings the schema up to `target`. Returns the versions applied.
+
+    Each step commits its own work and the new version is recorded right after,
+    so an interrupted upgrade resumes at the step that did not finish.
+    """
+    applied = []
+    for version, description, step in pending_migrations(conn, target):
+        if progress:
+            progress(version, description)
+        step(conn)
+        if conn.in_transaction:
+            conn.commit()
+        conn.execute(f"PRAGMA user_version = {version}")
+        applied.append(version)
+    return applied
+
+
+def _rename_create(create_sql, name):
+    """Points a table's CREATE TABLE statement at another table name."""
+    return re.sub(r"^\s*CREATE TABLE\s+(IF NOT EXISTS\s+)?[\"`\[]?\w+[\"`\]]?",
+                  f"CREATE TABLE {name}", create_sql, count=1)
+
+
+def rewrite_table(conn, table, create_sql, columns, key, expressions=None, batch_size=None, progress=None):
+    """Rebuilds `table` from `create_sql` without holding the write lock for the whole copy.
+
+    A shadow table is kept in step with `table` by triggers while the existing
+    rows are copied into it `batch_size` at a time, one short transaction per
+    batch, so other connections can write in between. A final short transaction
+    swaps the shadow in and restores the table's indexes and triggers.
+
+    `key` is the table's INTEGER PRIMARY KEY. `expressions` maps a column to the
+    SQL computing its new value, with `{row}` where the old row's prefix goes,
+    e.g. "CAST(ROUND({row}balance * 100) AS INTEGER)".
+    """
+    batch_size = batch_size or BATCH_SIZE
+    expressions = expressions or {}
+    shadow = f"{table}__rewrite"
+    column_list = ", ".join(columns)
+
+    def values(row):
+        return ", ".join(expressions.get(column, "{row}" + column).format(row=row) for column in columns)
+
+    cursor = conn.cursor()
+    if conn.in_transaction:
+        conn.commit()
+
+    # 1. Shadow table plus triggers mirroring every change made from now on
+    cursor.execute("BEGIN IMMEDIATE")
+    try:
+        # Left over from an interrupted run
+        for trigger in ("insert", "update", "delete"):
+            cursor.execute(f"DROP TRIGGER IF EXISTS {shadow}_{trigger}")
+        cursor.execute(f"DROP TABLE IF EXISTS {shadow}")
+        cursor.execute(_rename_create(create_sql, shadow))
+        cursor.execute(f"""
+            CREATE TRIGGER {shadow}_insert AFTER INSERT ON {table} BEGIN
+                INSERT OR REPLACE INTO {shadow} ({column_list}) VALUES ({values("NEW.")});
+            END
+        """)
+        cursor.execute(f"""
+            CREATE TRIGGER {shadow}_update AFTER UPDATE ON {table} BEGIN
+                DELETE FROM {shadow} WHERE {key} = OLD.{key};
+                INSERT OR REPLACE INTO {shadow} ({column_list}) VALUES ({values("NEW.")});
+            END
+        """)
+        cursor.execute(f"""
+            CREATE TRIGGER {shadow}_delete AFTER DELETE ON {table} BEGIN
+                DELETE FROM {shadow} WHERE {key} = OLD.{key};
+            END
+        """)
+    except BaseException:
+        conn.rollback()
+        raise
+    conn.commit()
+
+    # 2. Existing rows, in key order, one batch per transaction
+    copied = 0
+    last = None
+    while True:
+        cursor.execute("BEGIN IMMEDIATE")
+        try:
+            after = "" if last is None else f"WHERE {key} > ?"
+            params = () if last is None else (last,)
+            cursor.execute(f"SELECT MAX({key}), COUNT(*) FROM (SELECT {key} FROM {table} {after} ORDER BY {key} LIMIT ?)",
+                           params + (batch_size,))
+            upper, count = cursor.fetchone()
+            if upper is not None:
+                bounds = f"{key} <= ?" if last is None else f"{key} > ? AND {key} <= ?"
+                # Rows the triggers already mirrored are newer than this copy; keep those
+                cursor.execute(f"INSERT OR IGNORE INTO {shadow} ({column_list}) "
+                               f"SELECT {values('')} FROM {table} WHERE {bounds}", params + (upper,))
+        except BaseException:
+            conn.rollback()
+            raise
+        conn.commit()
+        if upper is None:
+            break
+        last = upper
+        copied += count
+        if progress:
+            progress(table, copied)
+
+    # 3. Swap
+    cursor.execute("BEGIN IMMEDIATE")
+    try:
+        cursor.execute("""
+            SELECT sql FROM sqlite_master
+            WHERE tbl_name = ? AND type IN ('index', 'trigger') AND sql IS NOT NULL AND name NOT LIKE ?
+        """, (table, f"{shadow}_%"))
+        dependents = [row[0] for row in cursor.fetchall()]
+        cursor.execute(f"DROP TABLE {table}")
+        cursor.execute(f"ALTER TABLE {shadow} RENAME TO {table}")
+        for statement in dependents:
+            cursor.execute(statement)
+    except BaseException:
+        conn.rollback()
+        raise
+    conn.commit()
+    return copied
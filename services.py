@@ -0,0 +1,468 @@
+import sqlite3
+
+import database
+import job_budget
+import ledger
+import passwords
+import recommender
+import session
+import skill_index
+from money import Money
+
+# Headless business operations. Nothing here prompts, prints, sleeps or clears
+# the screen: each function returns its result or raises one of the errors
+# below, and the CLI classes (User, Employer, Freelancer) only add the I/O.
+
+ROLES = ("Freelancer", "Employer")
+
+
+class ServiceError(Exception):
+    """Base class for errors raised by the service layer."""
+
+
+class ValidationError(ServiceError, ValueError):
+    """The input is malformed, e.g. a non-positive amount or an unknown role."""
+
+
+class NotFoundError(ServiceError, LookupError):
+    """The user, job, application or milestone does not exist (for this caller)."""
+
+
+class ConflictError(ServiceError):
+    """The operation clashes with the current state, e.g. a taken username."""
+
+
+class AuthenticationError(ServiceError):
+    """Wrong username or password."""
+
+
+# Debits that would overdraw a wallet raise the ledger's own error
+InsufficientFundsError = ledger.InsufficientFundsError
+
+
+def hash_password(password):
+    """Salted hash of a password with the configured algorithm and cost (see passwords.py)."""
+    return passwords.hash_password(password)
+
+
+def _positive_amount(value, what):
+    try:
+        amount = Money.parse(value)
+    except ValueError:
+        raise ValidationError(f"{what} must be a number.") from None
+    if amount <= 0:
+        raise ValidationError(f"{what} must be greater than zero.")
+    return amount
+
+
+def is_username_taken(username):
+    with database.connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT username FROM users WHERE username = ?", (username,))
+        return cursor.fetchone() is not None
+
+
+def sign_up(username, password, role, name=None, skills=None, experience=None,
+            hourly_rate=None, payment_method=None, company_name=None, password_hash=None):
+    """Creates a user and an empty wallet. Returns the new user id.
+
+    password_hash is the password already hashed (e.g. on the passwords pool);
+    without it the password is hashed here.
+    """
+    if role not in ROLES:
+        raise ValidationError(f"Role must be one of {', '.join(ROLES)}.")
+
+    if role == "Freelancer":
+        try:
+            hourly_rate = float(hourly_rate)
+        except (TypeError, ValueError):
+            raise ValidationError("Hourly rate must be a number.") from None
+        if hourly_rate <= 0:
+            raise ValidationError("Hourly rate must be greater than zero.")
+        query = """
+            INSERT INTO users (username, password, role, name, skills, experience, hourly_rate, payment_method)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)"""
+        params = (username, password_hash or hash_password(password), role, name, skills, experience, hourly_rate,
+                  payment_method)
+    else:
+        query = """
+            INSERT INTO users (username, password, role, name, company_name)
+            VALUES (?, ?, ?, ?, ?)"""
+        params = (username, password_hash or hash_password(password), role, name or "N/A", company_name)
+
+    with database.connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT username FROM users WHERE username = ?", (username,))
+        if cursor.fetchone():
+            raise ConflictError("Username already taken!")
+        try:
+            cursor.execute(query, params)
+        except sqlite3.IntegrityError:
+            # Another session claimed the name between the check and the insert
+            conn.rollback()
+            raise ConflictError("Username already taken!") from None
+        user_id = cursor.lastrowid
+        cursor.execute("INSERT INTO wallet (user_id, balance) VALUES (?, ?)", (user_id, 0))
+        if role == "Freelancer":
+            skill_index.set_user_skills(conn, user_id, skills)
+        conn.commit()
+    return user_id
+
+
+def load_credentials(username):
+    """Returns the user's row as a dict with the stored password hash, or None.
+
+    The profile comes back with it, so a login session needn't read it again.
+    """
+    with database.connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(f"""
+            SELECT id, username, password, role, {', '.join(session.PROFILE_COLUMNS)}, profile_version
+            FROM users WHERE username = ?
+        """, (username,))
+        row = cursor.fetchone()
+    if row is None:
+        return None
+    return dict(zip(("id", "username", "password", "role") + session.PROFILE_COLUMNS + ("profile_version",), row))
+
+
+def authenticate(username, password):
+    """Checks credentials. Returns the user's row as a dict, without the password.
+
+    A stored hash older or cheaper than the current setting is replaced with a
+    fresh one while the password is at hand.
+    """
+    user = load_credentials(username)
+    # Hashing runs without holding a pooled connection
+    if user is None or not passwords.verify_password(password, user["password"]):
+        raise AuthenticationError("Invalid username or password!")
+    stored = user.pop("password")
+    if passwords.needs_upgrade(stored):
+        upgrade_password(user["id"], stored, password)
+    return user
+
+
+def login(username, password):
+    """Checks credentials. Returns (user_id, role)."""
+    user = authenticate(username, password)
+    return user["id"], user["role"]
+
+
+def upgrade_password(user_id, stored, password, rehashed=None):
+    """Rehashes a verified password with the current setting, unless it changed meanwhile.
+
+    rehashed is the new hash when the caller already computed it.
+    """
+    rehashed = rehashed or passwords.hash_password(password)
+    with database.connection() as conn:
+        conn.execute("UPDATE users SET password = ? WHERE id = ? AND password = ?", (rehashed, user_id, stored))
+        conn.commit()
+
+
+def get_balance(user_id):
+    with database.connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT balance FROM wallet WHERE user_id = ?", (user_id,))
+        row = cursor.fetchone()
+    if not row:
+        raise NotFoundError(f"No wallet for user {user_id}.")
+    return Money(row[0])
+
+
+def deposit(user_id, amount):
+    """Adds pesos to a wallet. Returns the new balance."""
+    amount = _positive_amount(amount, "Deposit amount")
+    with database.connection() as conn:
+        try:
+            return ledger.deposit(conn, user_id, amount)
+        except LookupError as e:
+            raise NotFoundError(str(e)) from None
+
+
+def withdraw(user_id, amount):
+    """Takes pesos out of a wallet. Returns the new balance; raises InsufficientFundsError."""
+    amount = _positive_amount(amount, "Withdrawal amount")
+    with database.connection() as conn:
+        return ledger.withdraw(conn, user_id, amount)
+
+
+def post_job(employer_id, title, description, budget, skills_required, duration):
+    """Posts an open job if the employer's wallet covers the budget. Returns the job id."""
+    budget = _positive_amount(budget, "Budget")
+    with database.connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT balance FROM wallet WHERE user_id = ?", (employer_id,))
+        row = cursor.fetchone()
+        if not row or budget > row[0]:
+            raise InsufficientFundsError("Your budget exceeds your wallet balance. Please deposit more funds.")
+
+        cursor.execute("""
+            INSERT INTO jobs (employer_id, title, description, budget, skills_required, duration, status)
+            VALUES (?, ?, ?, ?, ?, ?, 'open')
+        """, (employer_id, title, description, budget, skills_required, duration))
+        job_id = cursor.lastrowid
+        skill_index.set_job_skills(conn, job_id, skills_required)
+        conn.commit()
+    return job_id
+
+
+def apply_job(freelancer_id, job_id):
+    """Applies to an open job. Returns the application id."""
+    with database.connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT 1 FROM jobs WHERE id = ? AND status = 'open'", (job_id,))
+        if not cursor.fetchone():
+            raise NotFoundError(f"No open job with id {job_id}.")
+        cursor.execute("SELECT 1 FROM job_applications WHERE job_id = ? AND freelancer_id = ?", (job_id, freelancer_id))
+        if cursor.fetchone():
+            raise ConflictError("You have already applied for this job.")
+
+        cursor.execute("""
+            INSERT INTO job_applications (job_id, freelancer_id, status)
+            VALUES (?, ?, 'applied')
+        """, (job_id, freelancer_id))
+        application_id = cursor.lastrowid
+        conn.commit()
+    return application_id
+
+
+def list_applications(freelancer_id):
+    """Returns the freelancer's applications as (application id, job title, budget, status) rows."""
+    with database.connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT ja.id, j.title, j.budget, ja.status
+            FROM job_applications ja
+            JOIN jobs j ON ja.job_id = j.id
+            WHERE ja.freelancer_id = ?
+        """, (freelancer_id,))
+        return cursor.fetchall()
+
+
+def list_posted_jobs(employer_id):
+    """Returns the employer's jobs as (id, title, description, budget, skills, duration, status) rows."""
+    with database.connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT id, title, description, budget, skills_required, duration, status
+            FROM jobs
+            WHERE employer_id = ?
+        """, (employer_id,))
+        return cursor.fetchall()
+
+
+def matching_freelancers(employer_id, job_title):
+    """Returns (job_id, freelancer rows) for one of the employer's jobs, most shared skills first.
+
+    Rows are (freelancer id, name, skills, hourly rate, shared skills).
+    """
+    with database.connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT id FROM jobs WHERE title = ? AND employer_id = ?", (job_title, employer_id))
+        job = cursor.fetchone()
+    if not job:
+        raise NotFoundError(f"You haven't posted a job titled '{job_title}'.")
+    return job[0], skill_index.matching_freelancers(job[0])
+
+
+def list_applicants(employer_id, job_title):
+    """Returns (job_id, [(score, applicant row)]) for one of the employer's jobs, best fit first.
+
+    Applicant rows are (freelancer id, name, skills, experience, hourly rate, application id).
+    """
+    with database.connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT id FROM jobs WHERE title = ? AND employer_id = ?", (job_title, employer_id))
+        job = cursor.fetchone()
+        if not job:
+            raise NotFoundError(f"You haven't posted a job titled '{job_title}'.")
+
+        cursor.execute("""
+            SELECT u.id, u.name, u.skills, u.experience, u.hourly_rate, ja.id
+            FROM users u
+            JOIN job_applications ja ON u.id = ja.freelancer_id
+            WHERE ja.job_id = ? AND ja.status = 'applied'
+        """, (job[0],))
+        applicants = cursor.fetchall()
+
+    return job[0], recommender.rank_applicants(job[0], applicants)
+
+
+def decide_application(employer_id, application_id, accept):
+    """Accepts (starting the job) or rejects an application. Returns the new status."""
+    status = "accepted" if accept else "rejected"
+    with database.connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT ja.job_id FROM job_applications ja
+            JOIN jobs j ON j.id = ja.job_id
+            WHERE ja.id = ? AND j.employer_id = ?
+        """, (application_id, employer_id))
+        row = cursor.fetchone()
+        if not row:
+            raise NotFoundError(f"No application {application_id} for your jobs.")
+
+        cursor.execute("UPDATE job_applications SET status = ? WHERE id = ?", (status, application_id))
+        if accept:
+            cursor.execute("UPDATE jobs SET status = 'in_progress' WHERE id = ?", (row[0],))
+        conn.commit()
+    return status
+
+
+def add_milestone(employer_id, job_id, title, payment):
+    """Adds a pending milestone for the job's accepted freelancer. Returns the milestone id."""
+    payment = _positive_amount(payment, "Milestone payment")
+    with database.connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT 1 FROM jobs WHERE id = ? AND employer_id = ?", (job_id, employer_id))
+        if not cursor.fetchone():
+            raise NotFoundError(f"You haven't posted a job with id {job_id}.")
+
+        cursor.execute("SELECT freelancer_id FROM job_applications WHERE job_id = ? AND status = 'accepted'", (job_id,))
+        freelancer = cursor.fetchone()
+        if not freelancer:
+            raise NotFoundError("No freelancer has been assigned to this job.")
+
+        remaining = job_budget.get_budget(cursor, job_id)[3]
+        if payment > remaining:
+            raise ValidationError(f"Not enough budget. Remaining budget is Php {remaining}")
+
+        cursor.execute('''
+            INSERT INTO milestones (job_id, freelancer_id, title, status, payment)
+            VALUES (?, ?, ?, 'pending', ?)
+        ''', (job_id, freelancer[0], title, payment))
+        milestone_id = cursor.lastrowid
+        conn.commit()
+    return milestone_id
+
+
+def submit_milestone(freelancer_id, title):
+    """Marks a freelancer's milestone as waiting for approval. Returns the job id."""
+    with database.connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT job_id, status FROM milestones
+            WHERE freelancer_id = ? AND title = ?
+        ''', (freelancer_id, title))
+        milestone = cursor.fetchone()
+        if not milestone:
+            raise NotFoundError(f"Milestone '{title}' not found or does not belong to you.")
+
+        job_id, status = milestone
+        if status == "approved":
+            raise ConflictError("This milestone has already been approved.")
+        if status == "for approval":
+            raise ConflictError("This milestone is already waiting for employer approval.")
+
+        cursor.execute('''
+            UPDATE milestones
+            SET status = 'for approval'
+            WHERE job_id = ? AND freelancer_id = ? AND title = ?
+        ''', (job_id, freelancer_id, title))
+        conn.commit()
+    return job_id
+
+
+def _completed_jobs(cursor, job_ids):
+    """Of `job_ids`, those with no milestone left to approve. Both approval paths settle jobs by this rule."""
+    pending = {row[0] for row in database.execute_in(
+        cursor, "SELECT DISTINCT job_id FROM milestones WHERE status != 'approved' AND job_id IN ({})", job_ids)}
+    return {job_id for job_id in job_ids if job_id not in pending}
+
+
+def approve_milestone(employer_id, title):
+    """Approves a milestone, holding its payment in escrow.
+
+    When it was the job's last open milestone the escrow is paid out in the same
+    transaction. Returns (freelancer_id, released), `released` being Money(0)
+    unless that payout happened.
+    """
+    with database.connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT m.id, m.payment, m.freelancer_id, m.job_id, m.status
+            FROM milestones m
+            JOIN jobs j ON j.id = m.job_id
+            WHERE m.title = ? AND j.employer_id = ?
+        """, (title, employer_id))
+        milestone = cursor.fetchone()
+        if not milestone:
+            raise NotFoundError("Milestone not found.")
+
+        milestone_id, amount, freelancer_id, job_id, status = milestone
+        if status == "approved":
+            raise ConflictError("Milestone is already approved.")
+
+        released = Money(0)
+        with ledger.transaction(conn) as cursor:
+            # Conditional debit: fails instead of overdrawing if the balance changed meanwhile
+            ledger.hold_in_escrow(conn, employer_id, job_id, freelancer_id, Money(amount), memo=f"milestone:{milestone_id}")
+
+            # Only if nobody approved it in the meantime
+            cursor.execute("UPDATE milestones SET status = 'approved' WHERE id = ? AND status != 'approved'", (milestone_id,))
+            if cursor.rowcount == 0:
+                raise ConflictError("Milestone is already approved.")
+
+            if _completed_jobs(cursor, [job_id]):
+                released = ledger.release_escrow(conn, job_id, freelancer_id, memo=f"job:{job_id}")
+    return freelancer_id, released
+
+
+def approve_milestones(employer_id, milestone_ids):
+    """Approves many milestones in one transaction and settles every job they complete.
+
+    The employer's wallet is debited once, for the total of all the milestones
+    that can be approved; if it can't cover that, nothing is approved. Missing
+    or already approved milestones are skipped. Returns a dict with `results`
+    (one {"milestone_id", "ok", "message"} per id), the `total` put in escrow
+    and the `released` payouts ({"job_id", "freelancer_id", "amount"}).
+    """
+    if isinstance(milestone_ids, (str, bytes)) or not hasattr(milestone_ids, "__iter__"):
+        raise ValidationError("Milestone ids must be a list of integers.")
+    ids = list(dict.fromkeys(milestone_ids))
+    if any(not isinstance(milestone_id, int) or isinstance(milestone_id, bool) for milestone_id in ids):
+        raise ValidationError("Milestone ids must be integers.")
+    if not ids:
+        raise ValidationError("No milestones to approve.")
+
+    results = []
+    released = []
+    total = Money(0)
+    with database.connection() as conn:
+        with ledger.transaction(conn) as cursor:
+            # Read under the write lock, so nobody approves them in the meantime
+            found = {row[0]: row[1:] for row in database.execute_in(cursor, """
+                SELECT m.id, m.job_id, m.freelancer_id, m.payment, m.status
+                FROM milestones m
+                JOIN jobs j ON j.id = m.job_id
+                WHERE j.employer_id = ? AND m.id IN ({})
+            """, ids, (employer_id,))}
+
+            holds = {}  # (job_id, freelancer_id) -> amount
+            approvable = []
+            for milestone_id in ids:
+                if milestone_id not in found:
+                    results.append({"milestone_id": milestone_id, "ok": False, "message": "Milestone not found."})
+                    continue
+                job_id, freelancer_id, payment, status = found[milestone_id]
+                if status == "approved":
+                    results.append({"milestone_id": milestone_id, "ok": False, "message": "Milestone is already approved."})
+                    continue
+                approvable.append(milestone_id)
+                holds[(job_id, freelancer_id)] = holds.get((job_id, freelancer_id), 0) + payment
+                results.append({"milestone_id": milestone_id, "ok": True,
+                                "message": f"Approved; Php {Money(payment)} held in escrow."})
+
+            if approvable:
+                total = ledger.hold_in_escrow_many(
+                    conn, employer_id, [(job_id, freelancer_id, Money(amount)) for (job_id, freelancer_id), amount in holds.items()],
+                    memo=f"milestones:{','.join(map(str, approvable))}")
+                database.execute_in(cursor, "UPDATE milestones SET status = 'approved' WHERE id IN ({})", approvable)
+
+                # One pass over the jobs touched: those with every milestone approved are paid out
+                complete = _completed_jobs(cursor, sorted({job_id for job_id, _ in holds}))
+                for job_id, freelancer_id in holds:
+                    if job_id in complete:
+                        amount = ledger.release_escrow(conn, job_id, freelancer_id, memo=f"job:{job_id}")
+                        released.append({"job_id": job_id, "freelancer_id": freelancer_id, "amount": amount})
+    return {"results": results, "total": total, "released": released}
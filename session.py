@@ -0,0 +1,150 @@
+import threading
+import time
+
+import database
+
+# A login session's identity map: one User object per user id, reused for the
+# rest of the session so screens that show a profile don't read it again. The
+# logged-in user's profile comes with the login query itself; anyone else's is
+# loaded with one primary-key query on first use.
+#
+# Cached profiles are kept coherent two ways:
+#   - the user's own edits (Freelancer.update_*) change the cached object as
+#     they write, so it never needs reloading for them;
+#   - users.profile_version is bumped by a trigger on every profile write, from
+#     any process. Once a cached profile is older than max_age, get() compares
+#     that one column and reloads the profile into the same object only if it
+#     has moved. invalidate() forces the next get() to reload.
+
+DEFAULT_MAX_AGE = 30.0  # seconds a cached profile is trusted before its version is checked
+
+# Columns read into a User besides id, username and role; the class decides which ones it keeps
+PROFILE_COLUMNS = ("name", "skills", "experience", "hourly_rate", "payment_method", "company_name")
+
+PROFILE_VERSION_SCHEMA = '''
+    CREATE TRIGGER IF NOT EXISTS users_profile_version
+    AFTER UPDATE OF username, role, name, skills, experience, hourly_rate, payment_method, company_name ON users
+    WHEN NEW.profile_version = OLD.profile_version
+    BEGIN
+        UPDATE users SET profile_version = profile_version + 1 WHERE id = NEW.id;
+    END
+'''
+
+
+def ensure_profile_version(conn):
+    """Adds users.profile_version and the trigger that bumps it on profile writes."""
+    cursor = conn.cursor()
+    cursor.execute("PRAGMA table_info(users)")
+    if "profile_version" not in {row[1] for row in cursor.fetchall()}:
+        cursor.execute("ALTER TABLE users ADD COLUMN profile_version INTEGER NOT NULL DEFAULT 0")
+    cursor.execute(PROFILE_VERSION_SCHEMA)
+    conn.commit()
+
+
+def _user_class(role):
+    if role == "Freelancer":
+        from freelancer import Freelancer
+        return Freelancer
+    from employer import Employer
+    return Employer
+
+
+class Session:
+    """The users loaded during one login, by id."""
+
+    def __init__(self, max_age=DEFAULT_MAX_AGE):
+        self.max_age = max_age
+        self._users = {}
+        self._checked = {}  # user id -> time.monotonic() of the last load or version check
+        self._lock = threading.Lock()
+
+    def login(self, username, password):
+        """Checks credentials and returns the user's object, built from the row the check read.
+
+        Raises services.AuthenticationError like services.login.
+        """
+        import services
+
+        return self.adopt(services.authenticate(username, password))
+
+    def adopt(self, row):
+        """Returns the user's object built from a row services.authenticate returned, without a query."""
+        with self._lock:
+            return self._build(row)
+
+    def get(self, user_id):
+        """Returns the session's User for `user_id`, loading it on first use. None if there is no such user.
+
+        The same object is returned for the rest of the session; a profile
+        changed elsewhere is reloaded into it (see the module comment).
+        """
+        with self._lock:
+            user = self._users.get(user_id)
+            if user is None:
+                return self._load(user_id)
+            if time.monotonic() - self._checked[user_id] >= self.max_age:
+                return self._revalidate(user)
+            return user
+
+    def track(self, user):
+        """Adds an already-built User to the map; its profile is (re)loaded on the next get()."""
+        with self._lock:
+            user.session = self
+            user.profile_version = None
+            self._users[user.id] = user
+            self._checked[user.id] = float("-inf")
+
+    def invalidate(self, user_id=None):
+        """Makes the next get() reload the profile (every cached one by default)."""
+        with self._lock:
+            for cached_id in list(self._users) if user_id is None else [user_id]:
+                if cached_id in self._users:
+                    self._users[cached_id].profile_version = None
+                    self._checked[cached_id] = float("-inf")
+
+    def _load(self, user_id, into=None):
+        with database.connection() as conn:
+            row = conn.execute(f"""
+                SELECT id, username, role, {', '.join(PROFILE_COLUMNS)}, profile_version
+                FROM users WHERE id = ?
+            """, (user_id,)).fetchone()
+        if row is None:
+            self._users.pop(user_id, None)
+            self._checked.pop(user_id, None)
+            return None
+        return self._build(dict(zip(("id", "username", "role") + PROFILE_COLUMNS + ("profile_version",), row)), into)
+
+    def _build(self, row, into=None):
+        # The class's own constructor normalizes the fields (e.g. skills into a list)
+        profile = {column: row[column] for column in PROFILE_COLUMNS if column in row}
+        loaded = _user_class(row["role"])(row["id"], row["username"], None, row["role"], **profile)
+        if into is not None and type(into) is type(loaded):
+            for column in PROFILE_COLUMNS:
+                if hasattr(loaded, column):
+                    setattr(into, column, getattr(loaded, column))
+            into.username = loaded.username
+            loaded = into
+        loaded.session = self
+        loaded.profile_version = row.get("profile_version")
+        self._users[loaded.id] = loaded
+        self._checked[loaded.id] = time.monotonic()
+        return loaded
+
+    def _revalidate(self, user):
+        if user.profile_version is not None:
+            with database.connection() as conn:
+                row = conn.execute("SELECT profile_version FROM users WHERE id = ?", (user.id,)).fetchone()
+            if row is not None and row[0] == user.profile_version:
+                self._checked[user.id] = time.monotonic()
+                return user
+        return self._load(user.id, into=user)
+
+
+def profile_written(user):
+    """Records a profile write the user just committed: the trigger moved the version on by one.
+
+    If someone else wrote in between, the cached version still lags behind and
+    the next check reloads the profile.
+    """
+    if getattr(user, "profile_version", None) is not None:
+        user.profile_version += 1
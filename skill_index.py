@@ -0,0 +1,396 @@
+import threading
+import time
+import uuid
+from collections import Counter
+
+import database
+
+# Normalized skills: one row per distinct skill, linked to users and jobs
+SKILLS_SCHEMA = (
+    '''
+    CREATE TABLE IF NOT EXISTS skills (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT UNIQUE NOT NULL
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS user_skills (
+        user_id INTEGER NOT NULL,
+        skill_id INTEGER NOT NULL,
+        PRIMARY KEY (user_id, skill_id),
+        FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
+        FOREIGN KEY (skill_id) REFERENCES skills(id)
+    ) WITHOUT ROWID
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS job_skills (
+        job_id INTEGER NOT NULL,
+        skill_id INTEGER NOT NULL,
+        PRIMARY KEY (job_id, skill_id),
+        FOREIGN KEY (job_id) REFERENCES jobs(id) ON DELETE CASCADE,
+        FOREIGN KEY (skill_id) REFERENCES skills(id)
+    ) WITHOUT ROWID
+    ''',
+    "CREATE INDEX IF NOT EXISTS idx_user_skills_skill ON user_skills (skill_id, user_id)",
+    "CREATE INDEX IF NOT EXISTS idx_job_skills_skill ON job_skills (skill_id, job_id)",
+)
+
+# Users and jobs whose skills (or, for jobs, status) changed, in commit order. A
+# change is logged in the same transaction as the write, so one that is rolled
+# back never appears, and every process's in-memory index catches up by reading
+# the rows past the last one it has seen (see SkillIndex.refresh). Each index
+# records how far it has read in skill_index_readers; rows every live reader has
+# applied are pruned.
+CHANGE_LOG_SCHEMA = (
+    '''
+    CREATE TABLE IF NOT EXISTS skill_changes (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        kind TEXT CHECK(kind IN ('user', 'job')) NOT NULL,
+        owner_id INTEGER NOT NULL
+    )
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS jobs_status_skill_change AFTER UPDATE OF status ON jobs
+    WHEN NEW.status IS NOT OLD.status
+    BEGIN
+        INSERT INTO skill_changes (kind, owner_id) VALUES ('job', NEW.id);
+    END
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS skill_index_readers (
+        reader TEXT PRIMARY KEY,
+        last_change INTEGER NOT NULL,
+        seen_at REAL NOT NULL
+    )
+    ''',
+)
+
+# A reader not seen for this long (its process has exited) stops holding rows back.
+# If it was only idle, its next refresh finds its row gone and the index is reloaded.
+READER_TIMEOUT = 3600
+
+
+def split_skills(text):
+    """Splits a comma separated skills string into trimmed names, keeping their case."""
+    if not text:
+        return []
+    seen = set()
+    names = []
+    for part in text.split(","):
+        name = part.strip()
+        if name and name.lower() not in seen:
+            seen.add(name.lower())
+            names.append(name)
+    return names
+
+
+def normalize_skills(text):
+    """Returns the set of normalized (lower case) skill names in a skills string."""
+    return {name.lower() for name in split_skills(text)}
+
+
+def ensure_skills_schema(conn):
+    """Creates the skill tables, backfilling them from the legacy text columns on first run."""
+    cursor = conn.cursor()
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'skills'")
+    existed = cursor.fetchone() is not None
+
+    for statement in SKILLS_SCHEMA:
+        cursor.execute(statement)
+
+    if not existed:
+        cursor.execute("SELECT id, skills FROM users WHERE skills IS NOT NULL")
+        for user_id, text in cursor.fetchall():
+            _link(cursor, "user_skills", "user_id", user_id, normalize_skills(text))
+        cursor.execute("SELECT id, skills_required FROM jobs")
+        for job_id, text in cursor.fetchall():
+            _link(cursor, "job_skills", "job_id", job_id, normalize_skills(text))
+    ensure_change_log(conn)
+
+
+def ensure_change_log(conn):
+    """Creates the skill_changes log, its readers table and the trigger that logs job status changes."""
+    cursor = conn.cursor()
+    for statement in CHANGE_LOG_SCHEMA:
+        cursor.execute(statement)
+    conn.commit()
+
+
+def _skill_ids(cursor, names):
+    """Returns skill ids for the given normalized names, creating missing skills."""
+    if not names:
+        return []
+    cursor.executemany("INSERT OR IGNORE INTO skills (name) VALUES (?)", [(name,) for name in names])
+    cursor.execute(f"SELECT id FROM skills WHERE name IN ({', '.join('?' * len(names))})", list(names))
+    return [row[0] for row in cursor.fetchall()]
+
+
+def _link(cursor, table, owner_column, owner_id, names):
+    """Replaces the skill links of one user or job."""
+    cursor.execute(f"DELETE FROM {table} WHERE {owner_column} = ?", (owner_id,))
+    ids = _skill_ids(cursor, sorted(names))
+    cursor.executemany(f"INSERT INTO {table} ({owner_column}, skill_id) VALUES (?, ?)",
+                       [(owner_id, skill_id) for skill_id in ids])
+
+
+def _link_many(cursor, table, owner_column, owners):
+    """Links many new users or jobs, given as {owner_id: names}, using batched statements."""
+    ids = {}
+    names = sorted(set().union(*owners.values()))
+    if names:
+        cursor.executemany("INSERT OR IGNORE INTO skills (name) VALUES (?)", [(name,) for name in names])
+        for start in range(0, len(names), 500):
+            chunk = names[start:start + 500]
+            cursor.execute(f"SELECT name, id FROM skills WHERE name IN ({', '.join('?' * len(chunk))})", chunk)
+            ids.update(cursor.fetchall())
+    cursor.executemany(f"INSERT OR IGNORE INTO {table} ({owner_column}, skill_id) VALUES (?, ?)",
+                       [(owner_id, ids[name]) for owner_id, owned in owners.items() for name in owned])
+
+
+def _log_changes(cursor, kind, owner_ids):
+    cursor.executemany("INSERT INTO skill_changes (kind, owner_id) VALUES (?, ?)",
+                       [(kind, owner_id) for owner_id in owner_ids])
+
+
+def set_user_skills(conn, user_id, text):
+    """Stores a freelancer's skills. The caller commits; the index picks the change up after that."""
+    cursor = conn.cursor()
+    _link(cursor, "user_skills", "user_id", user_id, normalize_skills(text))
+    _log_changes(cursor, "user", [user_id])
+
+
+def set_job_skills(conn, job_id, text):
+    """Stores a job's required skills. The caller commits; the index picks the change up after that."""
+    cursor = conn.cursor()
+    _link(cursor, "job_skills", "job_id", job_id, normalize_skills(text))
+    _log_changes(cursor, "job", [job_id])
+
+
+def add_skills_many(conn, users=None, jobs=None):
+    """Links freshly inserted users and jobs, each given as {id: skills text}, in bulk. The caller commits."""
+    cursor = conn.cursor()
+    for table, owner_column, texts, kind in (("user_skills", "user_id", users, "user"),
+                                             ("job_skills", "job_id", jobs, "job")):
+        if not texts:
+            continue
+        _link_many(cursor, table, owner_column, {owner_id: normalize_skills(text) for owner_id, text in texts.items()})
+        _log_changes(cursor, kind, texts)
+
+
+class SkillIndex:
+    """In-memory inverted index from skill name to the open jobs and the freelancers that have it."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.last_change = 0  # the newest skill_changes row applied
+        self.reader = uuid.uuid4().hex  # this index's row in skill_index_readers
+        self._seen_at = 0.0
+        self._job_skills = {}
+        self._user_skills = {}
+        self._jobs_by_skill = {}
+        self._users_by_skill = {}
+
+    @staticmethod
+    def _replace(forward, inverted, owner_id, names):
+        for name in forward.pop(owner_id, ()):
+            owners = inverted.get(name)
+            if owners is not None:
+                owners.discard(owner_id)
+                if not owners:
+                    del inverted[name]
+        if names:
+            forward[owner_id] = frozenset(names)
+            for name in names:
+                inverted.setdefault(name, set()).add(owner_id)
+
+    def set_job(self, job_id, names):
+        with self._lock:
+            self._replace(self._job_skills, self._jobs_by_skill, job_id, names)
+
+    def set_user(self, user_id, names):
+        with self._lock:
+            self._replace(self._user_skills, self._users_by_skill, user_id, names)
+
+    def job_skills(self, job_id):
+        return self._job_skills.get(job_id, frozenset())
+
+    def user_skills(self, user_id):
+        return self._user_skills.get(user_id, frozenset())
+
+    @staticmethod
+    def _rank(inverted, names):
+        """Counts overlaps by walking only the posting lists of the requested skills."""
+        overlap = Counter()
+        for name in names:
+            overlap.update(inverted.get(name, ()))
+        return sorted(overlap.items(), key=lambda item: (-item[1], item[0]))
+
+    def jobs_matching(self, names):
+        """Returns [(job_id, shared skill count)], best match first."""
+        with self._lock:
+            return self._rank(self._jobs_by_skill, names)
+
+    def users_matching(self, names):
+        """Returns [(user_id, shared skill count)], best match first."""
+        with self._lock:
+            return self._rank(self._users_by_skill, names)
+
+    @classmethod
+    def load(cls, conn):
+        """Builds the index from the skill tables."""
+        index = cls()
+        started = not conn.in_transaction
+        # Read first: a change committed while loading is applied again by the next refresh. The
+        # reader row is written by the same statement, so no change after the watermark is pruned.
+        index._seen_at = time.time()
+        index.last_change = conn.execute("""
+            INSERT INTO skill_index_readers (reader, last_change, seen_at)
+            VALUES (?, (SELECT COALESCE(MAX(id), 0) FROM skill_changes), ?)
+            RETURNING last_change
+        """, (index.reader, index._seen_at)).fetchone()[0]
+        if started:
+            conn.commit()
+        for job_id, names in _owner_skills(conn, "job").items():
+            index.set_job(job_id, names)
+        for user_id, names in _owner_skills(conn, "user").items():
+            index.set_user(user_id, names)
+        return index
+
+    def refresh(self, conn):
+        """Applies the changes committed since the last load or refresh, by any process.
+
+        Returns False if this reader was dropped as idle and changes it had not
+        applied may have been pruned: the index has to be loaded again.
+        """
+        cursor = conn.cursor()
+        cursor.execute("SELECT id, kind, owner_id FROM skill_changes WHERE id > ? ORDER BY id", (self.last_change,))
+        changes = cursor.fetchall()
+        # Checked after the read: while the row is there, nothing past last_change has been pruned
+        cursor.execute("SELECT 1 FROM skill_index_readers WHERE reader = ?", (self.reader,))
+        if cursor.fetchone() is None:
+            return False
+        if changes:
+            self._apply(conn, changes)
+        if changes or time.time() - self._seen_at > READER_TIMEOUT / 2:
+            self._checkpoint(conn)
+        return True
+
+    def _apply(self, conn, changes):
+        for kind, update in (("job", self.set_job), ("user", self.set_user)):
+            owner_ids = sorted({owner_id for _, changed, owner_id in changes if changed == kind})
+            for start in range(0, len(owner_ids), 500):
+                chunk = owner_ids[start:start + 500]
+                current = _owner_skills(conn, kind, chunk)
+                for owner_id in chunk:
+                    update(owner_id, current.get(owner_id))  # no skills (or a closed job): dropped
+        self.last_change = changes[-1][0]
+
+    def _checkpoint(self, conn):
+        """Records how far this index has read and prunes the changes every live reader has applied."""
+        started = not conn.in_transaction
+        now = time.time()
+        cursor = conn.cursor()
+        cursor.execute("UPDATE skill_index_readers SET last_change = ?, seen_at = ? WHERE reader = ?",
+                       (self.last_change, now, self.reader))
+        cursor.execute("DELETE FROM skill_index_readers WHERE seen_at < ?", (now - READER_TIMEOUT,))
+        cursor.execute("DELETE FROM skill_changes WHERE id <= (SELECT MIN(last_change) FROM skill_index_readers)")
+        if started:
+            conn.commit()
+        self._seen_at = now
+
+
+# What the index holds, by kind: (query for owner id and skill name, owner column)
+INDEXED_SKILLS = {
+    "job": ("""
+        SELECT js.job_id, s.name FROM job_skills js
+        JOIN skills s ON s.id = js.skill_id JOIN jobs j ON j.id = js.job_id
+        WHERE j.status = 'open'
+    """, "js.job_id"),
+    "user": ("""
+        SELECT us.user_id, s.name FROM user_skills us JOIN skills s ON s.id = us.skill_id WHERE 1
+    """, "us.user_id"),
+}
+
+
+def _owner_skills(conn, kind, owner_ids=None):
+    """Returns {owner id: set of skill names} the index should hold, for all owners or some."""
+    query, owner_column = INDEXED_SKILLS[kind]
+    params = []
+    if owner_ids is not None:
+        query += f" AND {owner_column} IN ({', '.join('?' * len(owner_ids))})"
+        params = owner_ids
+    rows = {}
+    for owner_id, name in conn.execute(query, params):
+        rows.setdefault(owner_id, set()).add(name)
+    return rows
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_index():
+    """Returns the process-wide skill index, up to date with every committed change.
+
+    It is loaded from the database on first use; after that each call applies
+    whatever skill_changes rows have been committed since (usually none).
+    """
+    global _index
+    with _index_lock:
+        with database.connection() as conn:
+            if _index is None or not _index.refresh(conn):
+                _index = SkillIndex.load(conn)
+        return _index
+
+
+def reset_index():
+    """Drops the in-memory index so the next lookup reloads it."""
+    global _index
+    with _index_lock:
+        _index = None
+
+
+def matching_jobs(text, limit=10):
+    """Returns open jobs sharing skills with `text`, as (id, title, budget, skills, shared count)."""
+    ranked = get_index().jobs_matching(normalize_skills(text))
+    if not ranked:
+        return []
+    overlap = dict(ranked)
+    ids = [job_id for job_id, _ in ranked]
+
+    results = []
+    with database.connection() as conn:
+        cursor = conn.cursor()
+        # Ranked candidates are checked against the live job status in chunks
+        for start in range(0, len(ids), 500):
+            chunk = ids[start:start + 500]
+            cursor.execute(f"""
+                SELECT id, title, budget, skills_required FROM jobs
+                WHERE status = 'open' AND id IN ({', '.join('?' * len(chunk))})
+            """, chunk)
+            results.extend(row + (overlap[row[0]],) for row in cursor.fetchall())
+            if len(results) >= limit:
+                break
+    results.sort(key=lambda row: (-row[4], row[0]))
+    return results[:limit]
+
+
+def matching_freelancers(job_id, limit=10):
+    """Returns freelancers sharing skills with a job, as (id, name, skills, hourly_rate, shared count)."""
+    index = get_index()
+    with database.connection() as conn:
+        cursor = conn.cursor()
+        # Read from the table: the index holds open jobs only, and this one may be under way
+        cursor.execute("SELECT s.name FROM job_skills js JOIN skills s ON s.id = js.skill_id WHERE js.job_id = ?",
+                       (job_id,))
+        ranked = index.users_matching({row[0] for row in cursor.fetchall()})[:limit]
+        if not ranked:
+            return []
+        overlap = dict(ranked)
+        cursor.execute(f"""
+            SELECT id, name, skills, hourly_rate FROM users
+            WHERE role = 'Freelancer' AND id IN ({', '.join('?' * len(ranked))})
+        """, [user_id for user_id, _ in ranked])
+        results = [row + (overlap[row[0]],) for row in cursor.fetchall()]
+    results.sort(key=lambda row: (-row[4], row[0]))
+    return results
@@ -0,0 +1,75 @@
+import sqlite3
+
+# Named storage profiles: the PRAGMAs every pooled connection gets when it is
+# opened. journal_mode=WAL lets readers keep going while one writer commits and
+# busy_timeout makes a blocked writer wait for the lock instead of failing with
+# "database is locked". Negative cache_size values are KiB, mmap_size is bytes.
+
+DEFAULT_PROFILE = "interactive"
+
+PROFILES = {
+    # Plain SQLite settings, kept as the baseline for benchmarks
+    "sqlite-defaults": {
+        "journal_mode": "DELETE",
+        "synchronous": "FULL",
+        "busy_timeout": 0,
+        "cache_size": -2000,
+        "mmap_size": 0,
+    },
+    # The menus: short transactions from several sessions at once
+    "interactive": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "busy_timeout": 5000,
+        "cache_size": -16000,
+        "mmap_size": 64 * 1024 * 1024,
+    },
+    # Seeding and imports: few large transactions, durability of each one matters less
+    "bulk-load": {
+        "journal_mode": "WAL",
+        "synchronous": "OFF",
+        "busy_timeout": 30000,
+        "cache_size": -64000,
+        "mmap_size": 0,
+    },
+    # Reports and browsing: mostly reads over a large file
+    "read-heavy": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "busy_timeout": 5000,
+        "cache_size": -64000,
+        "mmap_size": 256 * 1024 * 1024,
+    },
+}
+
+# journal_mode is set first: it is the one that can fail (e.g. on a read-only file)
+_ORDER = ("journal_mode", "busy_timeout", "synchronous", "cache_size", "mmap_size")
+
+
+def get_profile(name):
+    """Returns the settings of a named profile."""
+    try:
+        return PROFILES[name]
+    except KeyError:
+        raise ValueError(f"Unknown storage profile {name!r}; choose from {', '.join(PROFILES)}.") from None
+
+
+def apply_profile(conn, name=DEFAULT_PROFILE):
+    """Applies a profile's PRAGMAs to an open connection."""
+    settings = get_profile(name)
+    for pragma in _ORDER:
+        try:
+            conn.execute(f"PRAGMA {pragma} = {settings[pragma]}")
+        except sqlite3.OperationalError:
+            if pragma != "journal_mode":
+                raise
+            # Another connection holds the file in a mode that can't be switched now; keep it
+
+
+def current_settings(conn):
+    """Reads back the settings a profile controls, for checks and reports."""
+    settings = {}
+    for pragma in _ORDER:
+        value = conn.execute(f"PRAGMA {pragma}").fetchone()[0]
+        settings[pragma] = value.upper() if isinstance(value, str) else value
+    return settings
@@ -0,0 +1,121 @@
+import atexit
+import os
+import shutil
+import sys
+import threading
+
+# ANSI control sequences (VT100); no shell or subprocess is involved
+HOME = "\x1b[H"
+CLEAR_SCREEN = "\x1b[2J"
+CLEAR_LINE_END = "\x1b[K"
+CLEAR_BELOW = "\x1b[J"
+
+
+def goto_row(row):
+    """Moves the cursor to the start of a 1-based screen row."""
+    return f"\x1b[{row};1H"
+
+
+class FrameWriter:
+    """Stands in for sys.stdout and paints each screen as a single write.
+
+    After `new_frame()` output is collected instead of written. The next flush
+    (input() flushes stdout before reading) paints the collected frame: rows
+    that match what is already on screen are skipped, the others are rewritten
+    in place, and whatever is left of the previous frame is cleared. Output
+    after that, like a message printed under a prompt, passes straight through.
+    A frame nobody flushed is painted when the next one starts, so nothing
+    printed is lost.
+    """
+
+    def __init__(self, stream, size=shutil.get_terminal_size):
+        self.stream = stream
+        self._size = size
+        self._lock = threading.RLock()
+        self._pending = None  # text of the frame being built, not painted yet
+        self._rows = []       # rows of the last painted frame
+        self._clean = 0       # leading rows of it still known to be on screen unchanged
+        self._extra = 0       # lines written below it since (pass-through output, typed input)
+
+    def new_frame(self):
+        """Starts collecting a new screen, painting the previous one first if it never was."""
+        with self._lock:
+            if self._pending:
+                self._paint()
+                self.stream.flush()
+            self._pending = []
+
+    def write(self, text):
+        with self._lock:
+            if self._pending is not None:
+                self._pending.append(text)
+            else:
+                self._extra += text.count("\n")
+                self.stream.write(text)
+        return len(text)
+
+    def flush(self):
+        with self._lock:
+            if self._pending is not None:
+                self._paint()
+            # The flush before input() is followed by the user's typing and Enter
+            self._extra += 1
+            self.stream.flush()
+
+    def _paint(self):
+        frame = "".join(self._pending)
+        self._pending = None
+        self.stream.write(self.render(frame))
+
+    def render(self, frame):
+        """Returns the escape sequences that turn the screen into `frame`."""
+        rows = frame.split("\n")
+        columns, lines = self._size()
+        full = (
+            not self._rows
+            or len(rows) >= lines
+            or len(self._rows) + self._extra >= lines  # the old frame may have scrolled
+            or any(len(row) >= columns for row in rows + self._rows)  # wrapped rows shift positions
+        )
+        old_rows, clean = self._rows, self._clean
+        self._rows = rows
+        self._clean = len(rows) - 1  # the last row is where the prompt and typing go
+        self._extra = 0
+
+        if full:
+            return HOME + CLEAR_SCREEN + frame
+
+        parts = []
+        for index, row in enumerate(rows[:-1]):
+            if index < clean and old_rows[index] == row:
+                continue
+            parts.append(goto_row(index + 1) + row + CLEAR_LINE_END)
+        parts.append(goto_row(len(rows)) + rows[-1] + CLEAR_BELOW)
+        return "".join(parts)
+
+    def __getattr__(self, name):
+        # encoding, isatty, fileno... come from the real stream
+        return getattr(self.stream, name)
+
+
+_writer = None
+
+
+def _install():
+    global _writer
+    if os.name == "nt":
+        os.system("")  # once per process: switches the Windows console to ANSI mode
+    _writer = FrameWriter(sys.stdout)
+    sys.stdout = _writer
+    atexit.register(_writer.flush)
+    return _writer
+
+
+def new_frame():
+    """Starts a new screen on a terminal. When stdout is not a terminal it does nothing."""
+    writer = _writer
+    if writer is None or sys.stdout is not writer:
+        if not sys.stdout.isatty():
+            return
+        writer = _install()
+    writer.new_frame()
@@ -0,0 +1,44 @@
+import os
+import sys
+import tempfile
+import unittest
+
+# Add the parent directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database
+import passwords
+import schema
+import skill_index
+
+
+class DatabaseTestCase(unittest.TestCase):
+    """Runs each test against its own database file, built by schema.migrate, in a temporary directory.
+
+    Passwords hash at a cheap cost while the test runs. The pool's database and
+    profile, the skill index and the password setting are put back afterwards.
+    """
+
+    db_name = "test.db"
+    migrate = True  # False: the code under test builds the schema at self.path itself
+
+    def setUp(self):
+        # Cheap hashes: at the default cost every sign-up and login takes a tenth of a second
+        self.addCleanup(passwords.configure, **passwords.current_setting())
+        passwords.configure(cost=1_000)
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        self.path = os.path.join(self.tmpdir.name, self.db_name)
+        self.addCleanup(database.use_database, database.current_database(), database.current_profile())
+        database.use_database(self.path)
+        self.addCleanup(skill_index.reset_index)
+        skill_index.reset_index()
+        if self.migrate:
+            with database.connection() as conn:
+                schema.migrate(conn, target=schema.CORE_VERSION)
+                self.seed(conn)
+                conn.commit()
+                schema.migrate(conn)
+
+    def seed(self, conn):
+        """Fills the core tables before the later migrations (indexes, skills, ledger) run. Nothing by default."""
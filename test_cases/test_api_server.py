@@ -0,0 +1,182 @@
+import unittest
+import asyncio
+import http.client
+import json
+import os
+import sys
+import threading
+from unittest.mock import patch
+
+# Add the parent directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import api_server
+import database
+import passwords
+import services
+from test_cases.support import DatabaseTestCase
+
+
+class TestApiServer(DatabaseTestCase):
+    def setUp(self):
+        super().setUp()
+        # The server's event loop runs on its own thread; the test talks HTTP to it
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever)
+        self.thread.start()
+        self.server = api_server.ApiServer(port=0, workers=2)
+        self.on_loop(self.server.start())
+        self.conn = http.client.HTTPConnection("127.0.0.1", self.server.port, timeout=10)
+
+    def tearDown(self):
+        self.conn.close()
+        self.on_loop(self.server.shutdown(grace=5))
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+        self.loop.close()
+
+    def on_loop(self, coroutine):
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop).result(10)
+
+    def call(self, method, path, body=None, token=None, conn=None):
+        headers = {"Authorization": f"Bearer {token}"} if token else {}
+        conn = conn or self.conn
+        conn.request(method, path, body=None if body is None else json.dumps(body), headers=headers)
+        response = conn.getresponse()
+        return response.status, json.loads(response.read()), response
+
+    def log_in(self, username, role, **profile):
+        self.assertEqual(self.call("POST", "/users", dict(username=username, password="pw", role=role, **profile))[0], 201)
+        status, payload, _ = self.call("POST", "/login", {"username": username, "password": "pw"})
+        self.assertEqual(status, 200)
+        return payload["token"]
+
+    def test_a_job_runs_from_posting_to_payout(self):
+        employer = self.log_in("acme", "Employer", company_name="Acme")
+        freelancer = self.log_in("ana", "Freelancer", name="Ana", skills="Python, SQL", hourly_rate=20)
+        self.assertEqual(self.call("POST", "/wallet/deposit", {"amount": "1000"}, employer)[1], {"balance": 100000})
+        status, payload, _ = self.call("POST", "/jobs", {"title": "ETL", "description": "d", "budget": "500",
+                                                         "skills_required": "Python", "duration": "1 week"}, employer)
+        self.assertEqual(status, 201)
+        job_id = payload["job_id"]
+        self.assertEqual([job["id"] for job in self.call("GET", "/jobs/matching", token=freelancer)[1]["jobs"]], [job_id])
+        application_id = self.call("POST", f"/jobs/{job_id}/apply", token=freelancer)[1]["application_id"]
+        applicants = self.call("GET", "/applicants?job_title=ETL", token=employer)[1]["applicants"]
+        self.assertEqual([applicant["name"] for applicant in applicants], ["Ana"])
+        self.assertEqual(self.call("POST", f"/applications/{application_id}/decision", {"accept": True}, employer)[1],
+                         {"status": "accepted"})
+        self.call("POST", f"/jobs/{job_id}/milestones", {"title": "M1", "payment": "500"}, employer)
+        self.call("POST", "/milestones/submit", {"title": "M1"}, freelancer)
+        self.assertEqual(self.call("POST", "/milestones/approve", {"title": "M1"}, employer)[1]["released"], 50000)
+        self.assertEqual(self.call("GET", "/wallet", token=freelancer)[1], {"balance": 50000})
+
+    def test_profile_edits_and_keep_alive(self):
+        token = self.log_in("ana", "Freelancer", name="Ana", skills="Python", hourly_rate=20)
+        self.call("GET", "/me", token=token)
+        sock = self.conn.sock
+        status, profile, response = self.call("PATCH", "/me", {"skills": "Go, Rust", "hourly_rate": 30}, token)
+        self.assertEqual((status, profile["skills"], profile["hourly_rate"]), (200, ["Go", "Rust"], 30))
+        self.assertIs(self.conn.sock, sock)  # the same connection served every request
+        self.assertEqual(response.getheader("Connection"), "keep-alive")
+        self.assertIn("app;dur=", response.getheader("Server-Timing"))
+        self.assertEqual(services.login("ana", "pw")[0], profile["id"])
+        with database.connection() as conn:
+            self.assertEqual(conn.execute("SELECT skills FROM users WHERE id = ?", (profile["id"],)).fetchone()[0],
+                             "Go, Rust")
+
+    def test_fields_of_the_wrong_type_are_rejected(self):
+        token = self.log_in("ana", "Freelancer", name="Ana", skills="Python", hourly_rate=20)
+        for body in ({"name": 5}, {"experience": ["3 years"]}, {"payment_method": None}, {"hourly_rate": "30"},
+                     {"hourly_rate": True}, {"name": "Ana B", "skills": None}):
+            status, payload, _ = self.call("PATCH", "/me", body, token)
+            self.assertEqual((status, payload["error"]), (400, "Bad Request"), body)
+        self.assertEqual(self.call("GET", "/me", token=token)[1]["name"], "Ana")  # nothing was half-applied
+        self.assertEqual(self.call("POST", "/users", {"username": "bo", "password": 1234, "role": "Employer"})[0], 400)
+        self.assertEqual(self.call("POST", "/login", {"username": "ana", "password": ["pw"]})[0], 400)
+
+    def test_every_body_is_type_checked(self):
+        employer = self.log_in("acme", "Employer", company_name="Acme")
+        freelancer = self.log_in("ana", "Freelancer", name="Ana", skills="Python", hourly_rate=20)
+        job = {"title": ["x"], "description": "d", "budget": "5", "skills_required": "Go", "duration": "1 week"}
+        self.assertEqual(self.call("POST", "/jobs", job, employer)[0], 400)
+        self.assertEqual(self.call("POST", "/milestones/submit", {"title": {}}, freelancer)[0], 400)
+        self.assertEqual(self.call("POST", "/wallet/deposit", {"amount": [5]}, employer)[0], 400)
+        self.assertEqual(self.call("POST", "/applications/1/decision", {"accept": "yes"}, employer)[0], 400)
+
+    def test_page_limits_out_of_range_are_rejected(self):
+        token = self.log_in("ana", "Freelancer", name="Ana", skills="Python", hourly_rate=20)
+        for limit in ("0", "-1", "101"):
+            self.assertEqual(self.call("GET", f"/jobs?limit={limit}", token=token)[0], 400, limit)
+        self.assertEqual(self.call("GET", "/jobs/search?q=x&page=0", token=token)[0], 400)
+        self.assertEqual(self.call("GET", "/jobs?limit=100", token=token)[1], {"jobs": [], "next_after": None})
+
+    def test_milestone_ids_must_be_a_list_of_integers(self):
+        employer = self.log_in("acme", "Employer", company_name="Acme")
+        for milestone_ids in ("12", 3, [], [1, "2"], [True], None):
+            status, _, _ = self.call("POST", "/milestones/approve-many", {"milestone_ids": milestone_ids}, employer)
+            self.assertEqual(status, 400, milestone_ids)
+        status, payload, _ = self.call("POST", "/milestones/approve-many", {"milestone_ids": [99]}, employer)
+        self.assertEqual((status, payload["results"][0]["ok"]), (200, False))
+
+    def test_errors_map_to_statuses(self):
+        employer = self.log_in("acme", "Employer", company_name="Acme")
+        self.assertEqual(self.call("GET", "/wallet")[0], 401)
+        self.assertEqual(self.call("GET", "/wallet", token="nope")[0], 401)
+        self.assertEqual(self.call("GET", "/applications", token=employer)[0], 403)
+        self.assertEqual(self.call("GET", "/nowhere", token=employer)[0], 404)
+        status, _, response = self.call("DELETE", "/jobs", token=employer)
+        self.assertEqual((status, response.getheader("Allow")), (405, "GET, POST"))
+        self.assertEqual(self.call("POST", "/login", {"username": "acme", "password": "bad"})[0], 401)
+        self.assertEqual(self.call("POST", "/wallet/withdraw", {"amount": "5"}, employer)[1]["error"],
+                         "InsufficientFundsError")
+        self.assertEqual(self.call("POST", "/users", {"username": "acme", "password": "pw", "role": "Employer"})[0], 409)
+        self.conn.request("POST", "/wallet/deposit", body="{not json", headers={"Authorization": f"Bearer {employer}"})
+        self.assertEqual(self.conn.getresponse().status, 400)
+        self.conn.close()
+        self.assertEqual(self.call("POST", "/logout", token=employer)[0], 200)
+        self.assertEqual(self.call("GET", "/me", token=employer)[0], 401)
+        routes = self.call("GET", "/stats")[1]["routes"]
+        self.assertEqual(routes["POST login"]["errors"], 1)
+
+    def test_sign_up_and_login_hash_on_a_process_pool(self):
+        passwords.configure(pool="process", workers=1)
+        self.addCleanup(passwords.configure, pool="thread")
+        threads = []
+        load_credentials = services.load_credentials
+
+        def recording_load(username):
+            threads.append(threading.current_thread().name)
+            return load_credentials(username)
+
+        with patch.object(services, "load_credentials", recording_load):
+            token = self.log_in("ana", "Freelancer", name="Ana", skills="Python", hourly_rate=20)
+        self.assertEqual(self.call("GET", "/me", token=token)[1]["name"], "Ana")
+        self.assertTrue(threads[0].startswith("api"))  # the query ran on the bounded pool, not the hashing one
+
+    def test_shutdown_lets_requests_in_flight_finish(self):
+        token = self.log_in("acme", "Employer", company_name="Acme")
+        entered, release = threading.Event(), threading.Event()
+
+        def slow_balance(user_id):
+            entered.set()
+            release.wait(5)
+            return 123
+
+        results = []
+        with patch.object(services, "get_balance", slow_balance):
+            caller = threading.Thread(target=lambda: results.append(self.call("GET", "/wallet", token=token)))
+            caller.start()
+            self.assertTrue(entered.wait(5))
+            stopping = asyncio.run_coroutine_threadsafe(self.server.shutdown(grace=5), self.loop)
+            release.set()
+            caller.join(5)
+            stopping.result(10)
+        status, payload, response = results[0]
+        self.assertEqual((status, payload), (200, {"balance": 123}))
+        self.assertEqual(response.getheader("Connection"), "close")
+        with self.assertRaises(ConnectionError):
+            self.call("GET", "/stats", conn=http.client.HTTPConnection("127.0.0.1", self.server.port, timeout=2))
+
+
+if __name__ == "__main__":
+    unittest.main()
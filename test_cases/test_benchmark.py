@@ -0,0 +1,61 @@
+import unittest
+import os
+import sys
+
+# Add the parent directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import benchmark
+import database
+import passwords
+from test_cases.support import DatabaseTestCase
+
+
+class TestBenchmark(DatabaseTestCase):
+    # The database the caller was using, which every run must point the pool back at
+    db_name = "caller.db"
+    migrate = False
+
+    def test_run_reports_every_operation(self):
+        sizes = dict(users=20, jobs=30, applications=40, milestones=8, repeat=5, warmup=1, seed=7)
+        report = benchmark.run(sizes)
+        self.assertEqual(report["params"], sizes)
+        self.assertEqual(set(report["results"]), {
+            "login", "post_job", "browse_jobs", "view_applicants", "approve_milestone", "finalize_payment"})
+        for name, stats in report["results"].items():
+            self.assertGreater(stats["samples"], 0, name)
+            self.assertLessEqual(stats["p50_ms"], stats["p99_ms"])
+        self.assertEqual(report["meta"]["storage_profile"], "interactive")
+        # The scratch database is dropped and the caller's one restored
+        self.assertEqual(database.get_pool().path, self.path)
+
+    def test_profiles_run_side_by_side(self):
+        sizes = dict(users=10, jobs=10, applications=10, milestones=4, repeat=2, warmup=0, seed=3)
+        reports = benchmark.compare_profiles(sizes, ["sqlite-defaults", "bulk-load"], only=["login"])
+        self.assertEqual(list(reports), ["sqlite-defaults", "bulk-load"])
+        self.assertEqual(reports["bulk-load"]["meta"]["storage_profile"], "bulk-load")
+        self.assertIn("login", reports["sqlite-defaults"]["results"])
+        self.assertEqual(database.current_profile(), "interactive")
+
+    def test_password_costs_are_compared(self):
+        reports = benchmark.compare_password_costs([1_000, 2_000], "pbkdf2_sha256", users=5, logins=6, concurrency=2)
+        self.assertEqual(list(reports), [1_000, 2_000])
+        for stats in reports.values():
+            self.assertEqual(stats["samples"], 6)
+            self.assertGreater(stats["logins_per_s"], 0)
+        self.assertEqual(passwords.current_setting()["cost"], 1_000)
+        self.assertEqual(database.get_pool().path, self.path)
+
+    def test_percentile_interpolates(self):
+        self.assertEqual(benchmark.percentile([1, 2, 3, 4, 5], 50), 3)
+        self.assertEqual(benchmark.percentile([0, 10], 90), 9)
+
+    def test_compare_flags_regressions(self):
+        base = {"results": {"login": {"p50_ms": 1.0}, "post_job": {"p50_ms": 2.0}}}
+        new = {"results": {"login": {"p50_ms": 1.05}, "post_job": {"p50_ms": 3.0}, "extra": {"p50_ms": 1.0}}}
+        rows = benchmark.compare(base, new, threshold=0.10)
+        self.assertEqual([(row[0], row[4]) for row in rows], [("login", False), ("post_job", True)])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,134 @@
+import unittest
+import io
+import json
+import os
+import sqlite3
+import sys
+from contextlib import redirect_stdout
+from unittest.mock import patch
+
+# Add the parent directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import bulk_import
+import database
+import passwords
+import services
+from test_cases.support import DatabaseTestCase
+
+
+class TestBulkImport(DatabaseTestCase):
+    db_name = "import.db"
+    migrate = False  # bulk_import.run migrates the file it loads into
+
+    def write(self, name, text):
+        path = os.path.join(self.tmpdir.name, name)
+        with open(path, "w", encoding="utf-8", newline="") as out:
+            out.write(text)
+        return path
+
+    def query(self, sql):
+        conn = sqlite3.connect(self.path)
+        try:
+            return conn.execute(sql).fetchall()
+        finally:
+            conn.close()
+
+    def import_users(self, **options):
+        users = self.write("users.csv", "\n".join([
+            "username,password,role,name,skills,hourly_rate,company_name",
+            "acme,pw,Employer,,,,Acme",
+            "ana,secret,freelancer,Ana,\"Python, SQL\",20,",
+            "ben,pw,Freelancer,Ben,Figma,-3,",
+            "ana,pw,Freelancer,Other Ana,Go,10,",
+            "cy,pw,Freelancer,Cy,python,15,",
+        ]) + "\n")
+        return bulk_import.run("users", users, self.path, batch_size=2, workers=0, **options)
+
+    def test_users_are_validated_and_batched(self):
+        report = self.import_users()
+        self.assertEqual((report["read"], report["imported"], report["rejected"], report["batches"]), (5, 3, 2, 2))
+        self.assertEqual([error["line"] for error in report["errors"]], [4, 5])
+        rows = self.query("SELECT u.username, u.role, u.password, w.balance FROM users u JOIN wallet w ON w.user_id = u.id "
+                          "ORDER BY u.id")
+        self.assertEqual([row[:2] for row in rows], [("acme", "Employer"), ("ana", "Freelancer"), ("cy", "Freelancer")])
+        self.assertTrue(passwords.verify_password("secret", rows[1][2]))
+        self.assertEqual({row[3] for row in rows}, {0})
+        skills = self.query("SELECT s.name FROM user_skills us JOIN skills s ON s.id = us.skill_id ORDER BY us.user_id, s.name")
+        self.assertEqual(skills, [("python",), ("sql",), ("python",)])
+
+    def test_rates_must_be_finite(self):
+        for rate in ("nan", "inf", "-inf"):
+            row = {"username": "ana", "password": "pw", "role": "Freelancer", "hourly_rate": rate}
+            with self.assertRaises(services.ValidationError):
+                bulk_import.validate_user(row)
+
+    def test_main_reports_bad_paths(self):
+        out = io.StringIO()
+        with redirect_stdout(out):
+            self.assertEqual(bulk_import.main(["users", self.write("users.txt", ""), "--db", self.path]), 1)
+            missing = os.path.join(self.tmpdir.name, "gone.csv")
+            self.assertEqual(bulk_import.main(["users", missing, "--db", self.path]), 1)
+        self.assertIn("Can't tell the format", out.getvalue())
+        self.assertIn("gone.csv", out.getvalue())
+
+    def test_in_lists_are_chunked(self):
+        with patch.object(database, "IN_CHUNK", 2):
+            users = self.write("users.jsonl", "".join(
+                json.dumps({"username": f"user{n % 5}", "password": "pw", "role": "Employer"}) + "\n" for n in range(7)))
+            report = bulk_import.run("users", users, self.path, batch_size=7, workers=0)
+        self.assertEqual((report["imported"], report["rejected"]), (5, 2))
+
+    def test_a_name_claimed_during_hashing_is_rejected(self):
+        """Another session signs up 'dee' after the first check; the write transaction sees it"""
+        self.import_users()
+        hash_password = passwords.hash_password
+
+        def hash_while_someone_signs_up(*args, **kwargs):
+            conn = sqlite3.connect(self.path)
+            conn.execute("INSERT OR IGNORE INTO users (username, password, role) VALUES ('dee', 'x', 'Employer')")
+            conn.commit()
+            conn.close()
+            return hash_password(*args, **kwargs)
+
+        users = self.write("more.csv", "username,password,role\ndee,pw,Employer\neve,pw,Employer\n")
+        with patch.object(passwords, "hash_password", hash_while_someone_signs_up):
+            report = bulk_import.run("users", users, self.path, workers=0)
+        self.assertEqual((report["imported"], report["rejected"]), (1, 1))
+        self.assertEqual(report["errors"], [{"line": 2, "message": "Username already taken!"}])
+        self.assertEqual(self.query("SELECT password FROM users WHERE username = 'dee'"), [("x",)])
+
+    def test_jobs_resolve_employers_and_keep_indexes(self):
+        self.import_users()
+        jobs = self.write("jobs.jsonl", "\n".join([
+            json.dumps({"employer": "acme", "title": "ETL", "description": "d", "budget": "150.50",
+                        "skills_required": "Python", "duration": "1 week"}),
+            json.dumps({"employer_id": 1, "title": "Logo", "description": "d", "budget": 20,
+                        "skills_required": "Figma", "duration": "3 days", "status": "in_progress"}),
+            json.dumps({"employer": "ana", "title": "X", "description": "d", "budget": "5",
+                        "skills_required": "Go", "duration": "1 week"}),
+            json.dumps({"employer": "acme", "title": "Y", "description": "d", "budget": "0",
+                        "skills_required": "Go", "duration": "1 week"}),
+            "[1, 2]",
+            "{broken",
+        ]) + "\n")
+        indexes_before = self.query("SELECT name FROM sqlite_master WHERE type = 'index' ORDER BY name")
+        report = bulk_import.run("jobs", jobs, self.path, defer_indexes=True)
+        self.assertEqual((report["imported"], report["rejected"]), (2, 4))
+        self.assertEqual(self.query("SELECT employer_id, budget, status FROM jobs ORDER BY id"),
+                         [(1, 15050, "open"), (1, 2000, "in_progress")])
+        self.assertEqual(self.query("SELECT job_id, budget FROM job_budget_summary ORDER BY job_id"), [(1, 15050), (2, 2000)])
+        self.assertEqual(self.query("SELECT rowid FROM jobs_fts WHERE jobs_fts MATCH 'Logo'"), [(2,)])
+        self.assertEqual(self.query("SELECT name FROM sqlite_master WHERE type = 'index' ORDER BY name"), indexes_before)
+
+    def test_passwords_can_be_hashed_in_a_process_pool(self):
+        users = self.write("users.jsonl", "".join(
+            json.dumps({"username": f"user{n}", "password": f"pw{n}", "role": "Employer"}) + "\n" for n in range(10)))
+        report = bulk_import.run("users", users, self.path, workers=2)
+        self.assertEqual(report["imported"], 10)
+        stored = self.query("SELECT password FROM users WHERE username = 'user7'")[0][0]
+        self.assertTrue(passwords.verify_password("pw7", stored))
+
+
+if __name__ == "__main__":
+    unittest.main()
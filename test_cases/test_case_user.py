@@ -7,6 +7,7 @@ from unittest.mock import patch, MagicMock
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from user import User
+import database
 
 # Global list to store test results
 test_results = []
@@ -37,6 +38,13 @@ def log_test_result(test_name, output_lines, expected_message):
 
 class TestUserFunctional(unittest.TestCase):
 
+    def setUp(self):
+        # Pooled connections must be opened under each test's sqlite3.connect patch
+        database.reset_pool()
+
+    def tearDown(self):
+        database.reset_pool()
+
     @patch("utils.Utility.display_header")
     @patch("builtins.input", side_effect=["Test Company"])
     @patch("sqlite3.connect")
@@ -102,6 +110,33 @@ class TestUserFunctional(unittest.TestCase):
 
         print(cleaned_output)
 
+class TestLazyLoading(unittest.TestCase):
+    def setUp(self):
+        database.reset_pool()
+
+    def tearDown(self):
+        database.reset_pool()
+
+    @patch("database.sqlite3.connect")
+    def test_wallet_loads_on_first_use(self, mock_connect):
+        from employer import Employer
+        mock_conn, mock_cursor = setup_mock_db(mock_connect)
+        mock_cursor.fetchone.return_value = (2500,)
+
+        employer = Employer(1, "acme", "hash", "Employer")
+        mock_connect.assert_not_called()
+        self.assertEqual(employer.wallet.balance, 2500)
+        mock_cursor.execute.assert_called_with("SELECT balance FROM wallet WHERE user_id = ?", (1,))
+
+    def test_main_defers_user_modules(self):
+        import subprocess
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        deferred = {'user', 'services', 'employer', 'freelancer', 'batch',
+                    'indexes', 'job_search', 'session', 'skill_index'}  # the last four back schema migrations
+        code = f"import sys, main; print(sorted({deferred!r} & set(sys.modules)))"
+        output = subprocess.run([sys.executable, "-c", code], cwd=root, capture_output=True, text=True, check=True)
+        self.assertEqual(output.stdout.strip(), "[]")
+
 if __name__ == "__main__":
     # Suppress default unittest output except for custom print statements
     unittest.main(exit=False, verbosity=0, testRunner=unittest.TextTestRunner(stream=open(os.devnull, 'w')))
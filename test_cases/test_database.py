@@ -0,0 +1,86 @@
+import unittest
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+
+# Add the parent directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import ConnectionPool
+
+
+class TestConnectionPool(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.pool = ConnectionPool(os.path.join(self.tmpdir.name, "pool.db"), max_size=2, timeout=1.0)
+        with self.pool.connection() as conn:
+            conn.execute("CREATE TABLE items (id INTEGER PRIMARY KEY, name TEXT)")
+            conn.commit()
+
+    def tearDown(self):
+        self.pool.close_all()
+        self.tmpdir.cleanup()
+
+    def test_connection_is_reused(self):
+        """A returned connection is handed out again instead of opening a new one"""
+        with self.pool.connection() as first:
+            pass
+        with self.pool.connection() as second:
+            pass
+        self.assertIs(first, second)
+        stats = self.pool.stats()
+        self.assertEqual(stats["misses"], 1)
+        self.assertEqual(stats["hits"], 2)
+
+    def test_nested_borrow_shares_connection(self):
+        """Nested borrows on one thread get the same connection"""
+        with self.pool.connection() as outer:
+            with self.pool.connection() as inner:
+                self.assertIs(outer, inner)
+        self.assertEqual(self.pool.stats()["reentrant"], 1)
+
+    def test_uncommitted_work_is_rolled_back(self):
+        """Uncommitted writes are discarded when the connection goes back to the pool"""
+        with self.pool.connection() as conn:
+            conn.execute("INSERT INTO items (name) VALUES ('lost')")
+        with self.pool.connection() as conn:
+            count = conn.execute("SELECT COUNT(*) FROM items").fetchone()[0]
+        self.assertEqual(count, 0)
+
+    def test_connections_returned_after_close_all_are_closed(self):
+        """A connection borrowed across close_all (say, by reset_pool) is not left open in the old pool"""
+        with self.pool.connection() as conn:
+            self.pool.close_all()
+        with self.assertRaises(sqlite3.ProgrammingError):
+            conn.execute("SELECT 1")
+        self.assertEqual((self.pool.stats()["idle"], self.pool.stats()["open"]), (0, 0))
+
+    def test_exhausted_pool_times_out(self):
+        """Borrowing from an exhausted pool waits and then raises TimeoutError"""
+        ready = threading.Barrier(3)
+        release = threading.Event()
+
+        def hold():
+            with self.pool.connection():
+                ready.wait()
+                release.wait()
+
+        threads = [threading.Thread(target=hold) for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        ready.wait()
+
+        self.pool.timeout = 0.05
+        with self.assertRaises(TimeoutError):
+            self.pool.acquire()
+        self.assertGreaterEqual(self.pool.stats()["waits"], 1)
+
+        release.set()
+        for thread in threads:
+            thread.join()
+
+
+if __name__ == "__main__":
+    unittest.main()
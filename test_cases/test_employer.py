@@ -7,6 +7,10 @@ import sys
 sys.path.append(os.path.dirname(os.path.abspath(__file__)) + "/..")
 
 from employer import Employer
+import database
+import skill_index
+import job_budget
+import ledger
 from utils import Utility
 import job_system
 
@@ -26,6 +30,7 @@ class TestEmployerFunctions(unittest.TestCase):
         cls.cursor = cls.conn.cursor()
 
     def setUp(self):
+        database.reset_pool()
         self._reset_database()
 
     def _reset_database(self):
@@ -36,6 +41,13 @@ class TestEmployerFunctions(unittest.TestCase):
             DROP TABLE IF EXISTS wallet;
             DROP TABLE IF EXISTS milestones;
             DROP TABLE IF EXISTS temporary_wallet;
+            DROP TABLE IF EXISTS escrow_accounts;
+            DROP TABLE IF EXISTS job_budget_summary;
+            DROP TABLE IF EXISTS skills;
+            DROP TABLE IF EXISTS user_skills;
+            DROP TABLE IF EXISTS job_skills;
+            DROP TABLE IF EXISTS ledger_entries;
+            DROP TABLE IF EXISTS ledger_transfers;
 
             CREATE TABLE users (
                 id INTEGER PRIMARY KEY,
@@ -53,7 +65,7 @@ class TestEmployerFunctions(unittest.TestCase):
                 employer_id INTEGER,
                 title TEXT,
                 description TEXT,
-                budget REAL,
+                budget INTEGER,
                 skills_required TEXT,
                 duration TEXT,
                 status TEXT
@@ -68,7 +80,7 @@ class TestEmployerFunctions(unittest.TestCase):
 
             CREATE TABLE wallet (
                 user_id INTEGER PRIMARY KEY,
-                balance REAL
+                balance INTEGER
             );
 
             CREATE TABLE milestones (
@@ -77,23 +89,23 @@ class TestEmployerFunctions(unittest.TestCase):
                 freelancer_id INTEGER,
                 title TEXT,
                 status TEXT,
-                payment REAL
-            );
-
-            CREATE TABLE temporary_wallet (
-                freelancer_id INTEGER PRIMARY KEY,
-                employer_id INTEGER,
-                balance REAL
+                payment INTEGER
             );
         """)
 
-        # Insert test users and wallet balances
+        # Insert test users and wallet balances (money is stored in centavos)
         self.cursor.execute("INSERT INTO users (id, username, password, role, name) VALUES (1, 'employer1', 'pass', 'employer', 'Employer One')")
         self.cursor.execute("INSERT INTO users (id, username, password, role, name, skills, experience, hourly_rate) VALUES (2, 'freelancer1', 'pass', 'freelancer', 'Freelancer One', 'Python, SQL', '3 years', 20.0)")
-        self.cursor.execute("INSERT INTO wallet (user_id, balance) VALUES (1, 1000.0)")
-        self.cursor.execute("INSERT INTO wallet (user_id, balance) VALUES (2, 0.0)")
+        self.cursor.execute("INSERT INTO wallet (user_id, balance) VALUES (1, 100000)")
+        self.cursor.execute("INSERT INTO wallet (user_id, balance) VALUES (2, 0)")
         self.conn.commit()
 
+        skill_index.ensure_skills_schema(self.conn)
+        ledger.ensure_ledger_schema(self.conn)
+        ledger.ensure_escrow_schema(self.conn)
+        job_budget.ensure_budget_summary(self.conn)
+        skill_index.reset_index()
+
     def test_post_job(self):
         try:
             employer = Employer(1, 'employer1', 'pass', 'employer', name='Employer One')
@@ -135,7 +147,7 @@ class TestEmployerFunctions(unittest.TestCase):
             freelancer_balance = cursor.fetchone()[0]
             conn.close()
 
-            assert freelancer_balance == 200
+            assert freelancer_balance == 20000
             print("✅ Milestone approved and payment recorded correctly.")
             self.__class__.test_results.append(("test_add_and_approve_milestone", "PASS"))
         except Exception as e:
@@ -153,8 +165,8 @@ class TestEmployerFunctions(unittest.TestCase):
             conn = sqlite3.connect("freelancer_marketplace.db")
             cursor = conn.cursor()
             cursor.execute("INSERT INTO job_applications (job_id, freelancer_id, status) VALUES (?, ?, 'accepted')", (job.id, 2))
-            cursor.execute("INSERT INTO milestones (job_id, freelancer_id, title, status, payment) VALUES (?, ?, ?, 'approved', ?)", (job.id, 2, "Last Milestone", 200))
-            cursor.execute("INSERT INTO temporary_wallet (freelancer_id, employer_id, balance) VALUES (2, 1, 200)")
+            cursor.execute("INSERT INTO milestones (job_id, freelancer_id, title, status, payment) VALUES (?, ?, ?, 'approved', ?)", (job.id, 2, "Last Milestone", 20000))
+            cursor.execute("INSERT INTO escrow_accounts (job_id, freelancer_id, employer_id, balance, funded) VALUES (?, 2, 1, 20000, 20000)", (job.id,))
             conn.commit()
 
             employer.finalize_payment(2, job.id, conn, cursor)
@@ -163,7 +175,7 @@ class TestEmployerFunctions(unittest.TestCase):
             balance = cursor.fetchone()[0]
             conn.close()
 
-            assert balance >= 200
+            assert balance >= 20000
             print("✅ Final payment successfully transferred to freelancer.")
             self.__class__.test_results.append(("test_finalize_payment", "PASS"))
         except Exception as e:
@@ -172,6 +184,7 @@ class TestEmployerFunctions(unittest.TestCase):
 
     @classmethod
     def tearDownClass(cls):
+        database.reset_pool()
         cls.conn.close()
         cls.print_test_results()
 
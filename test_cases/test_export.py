@@ -0,0 +1,85 @@
+import unittest
+import csv
+import json
+import os
+import sys
+from unittest.mock import patch
+
+# Add the parent directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import export
+import services
+from test_cases.support import DatabaseTestCase
+
+
+class TestExport(DatabaseTestCase):
+    db_name = "export.db"
+
+    def setUp(self):
+        super().setUp()
+        self.state = os.path.join(self.tmpdir.name, "watermarks.json")
+        self.employer = services.sign_up("acme", "pw", "Employer", company_name="Acme")
+        services.deposit(self.employer, "1000")
+        for n in range(5):
+            services.post_job(self.employer, f"Job {n}", "d", "100", "Python", "1 week")
+
+    def out(self, name):
+        return os.path.join(self.tmpdir.name, name)
+
+    def run_export(self, source, name, **options):
+        return export.run(source, self.out(name), self.path, state_path=self.state, chunk_size=2, **options)
+
+    def test_table_to_csv_leaves_passwords_out(self):
+        summary = self.run_export("users", "users.csv")
+        self.assertEqual(summary["rows"], 1)
+        with open(self.out("users.csv"), newline="", encoding="utf-8") as exported:
+            rows = list(csv.DictReader(exported))
+        self.assertEqual(rows[0]["username"], "acme")
+        self.assertNotIn("password", rows[0])
+
+    def test_report_to_jsonl_in_chunks(self):
+        summary = self.run_export("job_budgets", "budgets.jsonl", fmt="jsonl")
+        self.assertEqual((summary["rows"], summary["last_id"]), (5, None))
+        with open(self.out("budgets.jsonl"), encoding="utf-8") as exported:
+            rows = [json.loads(line) for line in exported]
+        self.assertEqual([row["job_id"] for row in rows], [1, 2, 3, 4, 5])
+        self.assertEqual(rows[0]["remaining"], 10000)
+
+    def test_since_last_exports_only_new_rows(self):
+        first = self.run_export("ledger", "first.jsonl", fmt="jsonl", since_last=True)
+        services.deposit(self.employer, "5")
+        summary = self.run_export("ledger", "second.jsonl", fmt="jsonl", since_last=True)
+        self.assertEqual((summary["since"], summary["rows"]), (first["last_id"], 2))
+        self.assertEqual(export.load_watermarks(self.state), {"ledger": summary["last_id"]})
+        self.assertEqual(self.run_export("ledger", "third.jsonl", fmt="jsonl", since_last=True)["rows"], 0)
+        self.assertEqual(export.load_watermarks(self.state), {"ledger": summary["last_id"]})
+
+    def test_sources_updated_in_place_are_full_exports_only(self):
+        for source in ("users", "wallet", "jobs", "job_budget_summary", "wallet_balances", "job_budgets"):
+            with self.assertRaises(services.ValidationError, msg=source):
+                self.run_export(source, "x.csv", since_last=True)
+
+    def test_failed_export_leaves_no_file_or_watermark(self):
+        def fail_midway(path, columns, chunks):
+            with open(path, "w", encoding="utf-8") as out:
+                out.write(",".join(columns))
+                next(iter(chunks))
+                raise OSError("disk full")
+
+        with patch.dict(export.WRITERS, {"csv": fail_midway}):
+            with self.assertRaises(OSError):
+                self.run_export("ledger_entries", "entries.csv", since_last=True)
+        self.assertFalse(os.path.exists(self.out("entries.csv")))
+        self.assertFalse(os.path.exists(self.out("entries.csv.partial")))
+        self.assertEqual(export.load_watermarks(self.state), {})
+
+    def test_unknown_sources_are_refused(self):
+        with self.assertRaises(services.ValidationError):
+            self.run_export("sqlite_master", "x.csv")
+        with self.assertRaises(services.ValidationError):
+            self.run_export("escrow_accounts", "x.csv", since=3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,57 @@
+import unittest
+import sqlite3
+import os
+import sys
+import tempfile
+
+# Add the parent directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database
+import schema
+from indexes import INDEXES, ensure_indexes, explain_queries
+
+
+class TestIndexes(unittest.TestCase):
+    def setUp(self):
+        self.conn = sqlite3.connect(":memory:")
+        self.conn.executescript("""
+            CREATE TABLE jobs (id INTEGER PRIMARY KEY, employer_id INTEGER, title TEXT, status TEXT);
+            CREATE TABLE job_applications (id INTEGER PRIMARY KEY, job_id INTEGER, freelancer_id INTEGER, status TEXT);
+            CREATE TABLE milestones (id INTEGER PRIMARY KEY, job_id INTEGER, freelancer_id INTEGER, title TEXT, status TEXT);
+        """)
+
+    def tearDown(self):
+        self.conn.close()
+
+    def test_ensure_indexes_is_idempotent(self):
+        """Running the index bootstrap twice creates each index exactly once"""
+        ensure_indexes(self.conn)
+        ensure_indexes(self.conn)
+        names = {row[0] for row in self.conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+        self.assertEqual(names, {name for name, _, _ in INDEXES})
+
+    def test_open_jobs_lookup_uses_index(self):
+        """Browsing open jobs searches the status index instead of scanning"""
+        ensure_indexes(self.conn)
+        plan = self.conn.execute("EXPLAIN QUERY PLAN SELECT id FROM jobs WHERE status = 'open'").fetchall()
+        self.assertIn("idx_jobs_status", plan[0][3])
+
+
+class TestShippedQueries(unittest.TestCase):
+    def test_shipped_queries_run_on_the_current_schema_without_scans(self):
+        """Every query listed for --explain still matches the schema, and none scans a whole table"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            database.use_database(os.path.join(tmpdir, "plans.db"))
+            try:
+                with database.connection() as conn:
+                    schema.migrate(conn)
+                plans = explain_queries()
+            finally:
+                database.use_database(database.DB_PATH)
+        for name, plan in plans:
+            self.assertFalse([line for line in plan if line.startswith("SCAN") and "VIRTUAL TABLE" not in line], name)
+
+
+if __name__ == "__main__":
+    unittest.main()
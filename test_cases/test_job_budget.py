@@ -0,0 +1,58 @@
+import unittest
+import sqlite3
+import os
+import sys
+
+# Add the parent directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import job_budget
+
+
+class TestJobBudget(unittest.TestCase):
+    def setUp(self):
+        self.conn = sqlite3.connect(":memory:")
+        self.conn.executescript("""
+            CREATE TABLE jobs (id INTEGER PRIMARY KEY AUTOINCREMENT, budget INTEGER);
+            CREATE TABLE milestones (id INTEGER PRIMARY KEY AUTOINCREMENT, job_id INTEGER, status TEXT, payment INTEGER);
+            INSERT INTO jobs (budget) VALUES (1000);
+            INSERT INTO milestones (job_id, status, payment) VALUES (1, 'approved', 300), (1, 'pending', 200);
+        """)
+        job_budget.ensure_budget_summary(self.conn)
+
+    def tearDown(self):
+        self.conn.close()
+
+    def budget(self, job_id):
+        return job_budget.get_budget(self.conn.cursor(), job_id)
+
+    def test_existing_milestones_are_backfilled(self):
+        self.assertEqual(self.budget(1), (1000, 500, 300, 500))
+
+    def test_writes_keep_totals_current(self):
+        self.conn.execute("INSERT INTO jobs (budget) VALUES (400)")
+        self.conn.execute("INSERT INTO milestones (job_id, status, payment) VALUES (2, 'pending', 150)")
+        self.conn.execute("UPDATE milestones SET status = 'approved' WHERE id = 2")
+        self.conn.execute("UPDATE milestones SET payment = 250, job_id = 2 WHERE id = 1")
+        self.conn.execute("UPDATE jobs SET budget = 1200 WHERE id = 1")
+        self.assertEqual(self.budget(1), (1200, 200, 200, 1000))
+        self.assertEqual(self.budget(2), (400, 400, 250, 0))
+        self.conn.execute("DELETE FROM milestones WHERE job_id = 2")
+        self.conn.execute("DELETE FROM jobs WHERE id = 1")
+        self.assertEqual(self.budget(2), (400, 0, 0, 400))
+        self.assertIsNone(self.budget(1))
+        self.assertEqual(job_budget.check_budget_summary(self.conn), [])
+
+    def test_check_finds_and_repairs_drift(self):
+        self.conn.execute("DROP TRIGGER job_budget_after_milestone_insert")
+        self.conn.execute("INSERT INTO milestones (job_id, status, payment) VALUES (1, 'pending', 100)")
+        self.conn.execute("INSERT INTO job_budget_summary (job_id, budget) VALUES (9, 50)")
+        self.assertEqual(job_budget.check_budget_summary(self.conn), [1, 9])
+        self.assertEqual(job_budget.check_budget_summary(self.conn, repair=True), [1, 9])
+        self.assertEqual(self.budget(1), (1000, 600, 300, 400))
+        self.assertIsNone(self.budget(9))
+        self.assertEqual(job_budget.check_budget_summary(self.conn), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
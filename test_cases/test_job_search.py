@@ -0,0 +1,79 @@
+import unittest
+import os
+import sys
+
+# Add the parent directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database
+import job_search
+from test_cases.support import DatabaseTestCase
+
+
+class TestJobSearch(DatabaseTestCase):
+    def seed(self, conn):
+        # One job exists before the index, to check the backfill
+        conn.execute("INSERT INTO users (id, username, password, role) VALUES (1, 'acme', 'x', 'Employer')")
+        conn.execute("INSERT INTO jobs VALUES (1, 1, 'Logo Design', 'Brand refresh', 100, 'Illustrator', '1 week', 'open')")
+
+    def setUp(self):
+        super().setUp()
+        with database.connection() as conn:
+            conn.executemany("INSERT INTO jobs (employer_id, title, description, budget, skills_required, duration, status) VALUES (?, ?, ?, ?, ?, ?, ?)", [
+                (1, "Python API", "Build a REST backend", 500, "Python, SQL", "1 month", "open"),
+                (1, "Data cleanup", "Clean a Python dataset", 200, "Excel", "2 weeks", "open"),
+                (1, "Python Scraper", "Scrape listings", 300, "Python", "1 week", "in_progress"),
+            ])
+            conn.commit()
+
+    def test_backfills_existing_jobs(self):
+        """Jobs inserted before the index was created are searchable"""
+        results = job_search.search_jobs("logo")
+        self.assertEqual([row[0] for row in results], [1])
+
+    def test_title_matches_rank_first(self):
+        """A title hit outranks a description hit, and only open jobs are returned"""
+        results = job_search.search_jobs("python")
+        self.assertEqual([row[1] for row in results], ["Python API", "Data cleanup"])
+
+    def test_updates_are_reindexed(self):
+        """Triggers keep the index in sync when a job is edited or deleted"""
+        with database.connection() as conn:
+            conn.execute("UPDATE jobs SET title = 'Go API' WHERE title = 'Python API'")
+            conn.execute("DELETE FROM jobs WHERE title = 'Data cleanup'")
+            conn.commit()
+        # Still found through its skills, but no longer by the old title or the deleted job
+        self.assertEqual([row[1] for row in job_search.search_jobs("python")], ["Go API"])
+        self.assertEqual([row[1] for row in job_search.search_jobs("go")], ["Go API"])
+
+    def test_paging(self):
+        """Results are returned one page at a time"""
+        first = job_search.search_jobs("python", page=1, page_size=1)
+        second = job_search.search_jobs("python", page=2, page_size=1)
+        self.assertEqual(len(first), 1)
+        self.assertEqual(len(second), 1)
+        self.assertNotEqual(first[0][0], second[0][0])
+
+
+    def test_open_jobs_keyset_pages(self):
+        """Open jobs are paged by id and in-progress jobs are skipped"""
+        first, has_more = job_search.open_jobs_page(page_size=2)
+        self.assertEqual([row[0] for row in first], [1, 2])
+        self.assertTrue(has_more)
+
+        second, has_more = job_search.open_jobs_page(first[-1][0], page_size=2)
+        self.assertEqual([row[0] for row in second], [3])
+        self.assertFalse(has_more)
+
+    def test_page_size_is_bounded(self):
+        for page_size in (0, -1, job_search.MAX_PAGE_SIZE + 1):
+            with self.assertRaises(ValueError):
+                job_search.open_jobs_page(page_size=page_size)
+
+    def test_iter_open_jobs_streams_every_page(self):
+        """The lazy iterator walks all pages in id order"""
+        self.assertEqual([row[0] for row in job_search.iter_open_jobs(page_size=1)], [1, 2, 3])
+
+
+if __name__ == "__main__":
+    unittest.main()
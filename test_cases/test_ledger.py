@@ -0,0 +1,152 @@
+import unittest
+import sqlite3
+import os
+import sys
+import tempfile
+import threading
+
+# Add the parent directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import ledger
+
+
+class TestLedger(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "ledger.db")
+        self.conn = sqlite3.connect(self.path)
+        self.conn.executescript("""
+            CREATE TABLE wallet (user_id INTEGER PRIMARY KEY, balance INTEGER DEFAULT 0);
+            INSERT INTO wallet VALUES (1, 100);
+            INSERT INTO wallet VALUES (2, 0);
+        """)
+        ledger.ensure_ledger_schema(self.conn)
+        ledger.ensure_escrow_schema(self.conn)
+
+    def tearDown(self):
+        self.conn.close()
+        self.tmpdir.cleanup()
+
+    def balance(self, user_id):
+        return self.conn.execute("SELECT balance FROM wallet WHERE user_id = ?", (user_id,)).fetchone()[0]
+
+    def test_entries_balance_to_zero(self):
+        """Every transfer's entries sum to zero and carry the balance snapshot"""
+        ledger.deposit(self.conn, 1, 50)
+        ledger.transfer(self.conn, 1, 2, 30)
+        sums = self.conn.execute("SELECT SUM(amount) FROM ledger_entries GROUP BY transfer_id").fetchall()
+        self.assertEqual(sums, [(0,), (0,)])
+        snapshot = self.conn.execute(
+            "SELECT balance_after FROM ledger_entries WHERE account_type = 'wallet' AND account_id = 1 ORDER BY id DESC"
+        ).fetchone()[0]
+        self.assertEqual(snapshot, self.balance(1))
+
+    def test_overdraft_is_refused_atomically(self):
+        """A failed debit leaves balances and the ledger untouched"""
+        with self.assertRaises(ledger.InsufficientFundsError):
+            ledger.transfer(self.conn, 1, 2, 500)
+        self.assertEqual(self.balance(1), 100)
+        self.assertEqual(self.balance(2), 0)
+        self.assertEqual(self.conn.execute("SELECT COUNT(*) FROM ledger_entries").fetchone()[0], 0)
+
+    def test_escrow_hold_and_release(self):
+        ledger.hold_in_escrow(self.conn, 1, 7, 2, 40)
+        ledger.hold_in_escrow(self.conn, 1, 7, 2, 10)
+        self.assertEqual(ledger.release_escrow(self.conn, 7, 2), 50)
+        self.assertEqual(self.balance(1), 50)
+        self.assertEqual(self.balance(2), 50)
+        self.assertEqual(ledger.release_escrow(self.conn, 7, 2), 0)
+
+    def test_escrow_is_kept_per_job(self):
+        """Partial releases come out of one job's escrow; settling pays the rest"""
+        ledger.hold_in_escrow(self.conn, 1, 7, 2, 40)
+        ledger.hold_in_escrow(self.conn, 1, 8, 2, 30)
+        self.assertEqual(ledger.release_escrow(self.conn, 7, 2, amount=15), 15)
+        self.assertEqual(ledger.escrow_summary(self.conn, 7), (25, 40, 15))
+        self.assertEqual(ledger.escrow_summary(self.conn, 8), (30, 30, 0))
+        with self.assertRaises(ledger.InsufficientFundsError):
+            ledger.release_escrow(self.conn, 7, 2, amount=26)
+        self.assertEqual(ledger.release_escrow(self.conn, 7, 2), 25)
+        status = self.conn.execute("SELECT status FROM escrow_accounts WHERE job_id = 7").fetchone()[0]
+        self.assertEqual(status, "settled")
+        self.assertEqual(self.balance(2), 40)
+        sums = self.conn.execute("SELECT SUM(amount) FROM ledger_entries GROUP BY transfer_id").fetchall()
+        self.assertTrue(all(total == 0 for (total,) in sums))
+
+    def test_escrow_entries_name_the_job_and_the_freelancer(self):
+        """Two freelancers on one job have separate escrow accounts in the ledger too"""
+        self.conn.execute("INSERT INTO wallet VALUES (3, 0)")
+        ledger.hold_in_escrow_many(self.conn, 1, [(7, 2, 40), (7, 3, 25)])
+        ledger.release_escrow(self.conn, 7, 3)
+        entries = self.conn.execute("""
+            SELECT freelancer_id, SUM(amount) FROM ledger_entries
+            WHERE account_type = 'escrow' AND account_id = 7 GROUP BY freelancer_id
+        """).fetchall()
+        self.assertEqual(entries, [(2, 40), (3, 0)])
+        wallet_entries = self.conn.execute("SELECT freelancer_id FROM ledger_entries WHERE account_type = 'wallet'")
+        self.assertEqual({row[0] for row in wallet_entries}, {None})
+
+    def test_migrated_holdings_get_an_opening_transfer(self):
+        self.conn.executescript("""
+            DROP TABLE escrow_accounts;
+            CREATE TABLE jobs (id INTEGER PRIMARY KEY, employer_id INTEGER, status TEXT);
+            CREATE TABLE job_applications (job_id INTEGER, freelancer_id INTEGER, status TEXT);
+            CREATE TABLE temporary_wallet (freelancer_id INTEGER PRIMARY KEY, employer_id INTEGER, balance INTEGER);
+            INSERT INTO jobs VALUES (7, 1, 'in_progress');
+            INSERT INTO job_applications VALUES (7, 2, 'accepted');
+            INSERT INTO temporary_wallet VALUES (2, 1, 60);
+        """)
+        ledger.ensure_escrow_schema(self.conn)
+        self.assertEqual(ledger.escrow_summary(self.conn, 7), (60, 60, 0))
+        entries = self.conn.execute("""
+            SELECT t.kind, e.account_type, e.account_id, e.freelancer_id, e.amount, e.balance_after
+            FROM ledger_entries e JOIN ledger_transfers t ON t.id = e.transfer_id ORDER BY e.id
+        """).fetchall()
+        self.assertEqual(entries, [("opening_balance", "external", None, None, -60, None),
+                                   ("opening_balance", "escrow", 7, 2, 60, 60)])
+        self.assertEqual(ledger.release_escrow(self.conn, 7, 2), 60)
+
+    def test_entries_are_append_only(self):
+        ledger.deposit(self.conn, 1, 5)
+        with self.assertRaises(sqlite3.DatabaseError):
+            self.conn.execute("UPDATE ledger_entries SET amount = 0")
+
+    def test_listeners_hear_committed_balances(self):
+        changes = []
+        listener = lambda user_id, balance: changes.append((user_id, balance))
+        ledger.add_balance_listener(listener)
+        ledger.transfer(self.conn, 1, 2, 30)
+        with self.assertRaises(ledger.InsufficientFundsError):
+            ledger.withdraw(self.conn, 2, 500)  # rolled back: nothing to hear
+        self.conn.execute("UPDATE wallet SET balance = balance WHERE user_id = 1")  # someone else's transaction
+        ledger.deposit(self.conn, 1, 5)
+        self.conn.commit()
+        self.assertEqual(changes, [(1, 70), (2, 30), (1, None)])
+
+    def test_concurrent_withdrawals_never_overdraw(self):
+        """Parallel sessions racing for the same money can't both win"""
+        results = []
+
+        def spend():
+            conn = sqlite3.connect(self.path, timeout=10)
+            try:
+                ledger.withdraw(conn, 1, 60)
+                results.append("ok")
+            except ledger.InsufficientFundsError:
+                results.append("refused")
+            finally:
+                conn.close()
+
+        threads = [threading.Thread(target=spend) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(results.count("ok"), 1)
+        self.assertEqual(self.balance(1), 40)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,62 @@
+import unittest
+import os
+import sqlite3
+import sys
+from unittest.mock import patch
+
+# Add the parent directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database
+import loadgen
+from test_cases.support import DatabaseTestCase
+
+
+class TestLoadgen(DatabaseTestCase):
+    db_name = "load.db"
+    migrate = False  # loadgen.run builds its own database
+
+    def test_threads_drive_both_roles(self):
+        report = loadgen.run(self.path, users=6, employer_ratio=0.5, concurrency=3, flows=4)
+        self.assertEqual(report["params"]["employers"], 3)
+        self.assertEqual(report["throughput"]["flows"], 24)
+        for operation in ("sign_up", "login", "post_job", "browse_jobs", "apply_job", "view_applicants"):
+            self.assertIn(operation, report["operations"])
+        self.assertEqual(sum(report["histogram_ms"].values()), report["throughput"]["operations"])
+        self.assertIn("sqlite_busy", report["contention"])
+
+        # The simulated users really wrote to the target file
+        conn = sqlite3.connect(self.path)
+        self.assertEqual(conn.execute("SELECT COUNT(*) FROM users").fetchone()[0], 6)
+        conn.close()
+
+    def test_the_callers_database_is_restored(self):
+        caller_db = os.path.join(self.tmpdir.name, "caller.db")
+        database.use_database(caller_db, "read-heavy")
+        loadgen.run(self.path, users=1, concurrency=1, flows=1)
+        self.assertEqual((database.current_database(), database.current_profile()), (caller_db, "read-heavy"))
+        with patch.object(loadgen, "run_user", side_effect=RuntimeError("boom")):
+            with self.assertRaises(RuntimeError):
+                loadgen.run(self.path, users=1, concurrency=1, flows=1)
+        self.assertEqual((database.current_database(), database.current_profile()), (caller_db, "read-heavy"))
+
+    def test_busy_errors_are_counted(self):
+        recorder = loadgen.Recorder()
+
+        def locked():
+            raise sqlite3.OperationalError("database is locked")
+
+        self.assertIsNone(recorder.call("post_job", locked))
+        self.assertEqual(recorder.busy, 1)
+        self.assertEqual(recorder.errors["post_job:busy"], 1)
+        with self.assertRaises(sqlite3.OperationalError):
+            recorder.call("post_job", lambda: (_ for _ in ()).throw(sqlite3.OperationalError("no such table: x")))
+
+    def test_histogram_buckets(self):
+        self.assertEqual(loadgen.bucket_of(0.4), "<=1")
+        self.assertEqual(loadgen.bucket_of(7), "<=10")
+        self.assertEqual(loadgen.bucket_of(9000), ">5000")
+
+
+if __name__ == "__main__":
+    unittest.main()
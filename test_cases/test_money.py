@@ -0,0 +1,72 @@
+import unittest
+import sqlite3
+import os
+import sys
+
+# Add the parent directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import money
+from money import Money
+
+
+class TestMoney(unittest.TestCase):
+    def test_parse_rounds_to_centavos(self):
+        self.assertEqual(Money.parse("12.5"), 1250)
+        self.assertEqual(Money.parse(0.1), 10)
+        self.assertEqual(Money.parse("1,000"), 100000)
+        self.assertEqual(Money.parse("0.005"), 1)  # half up
+        self.assertEqual(Money.parse(Money(7)), 7)
+
+    def test_parse_rejects_bad_input(self):
+        for value in ("abc", "", "nan", "inf"):
+            with self.assertRaises(ValueError):
+                Money.parse(value)
+
+    def test_sums_are_exact(self):
+        # 0.1 + 0.2 != 0.3 in floats, but centavos add exactly
+        total = sum((Money.parse("0.1"), Money.parse("0.2")), Money(0))
+        self.assertEqual(total, Money.parse("0.3"))
+        self.assertIsInstance(total, Money)
+        self.assertIsInstance(-total, Money)
+
+    def test_formatting_shows_pesos(self):
+        self.assertEqual(str(Money(123450)), "1,234.50")
+        self.assertEqual(f"{Money(5)}", "0.05")
+        self.assertEqual(f"{Money(123450):.2f}", "1234.50")
+
+
+class TestMigrateToCents(unittest.TestCase):
+    def setUp(self):
+        self.conn = sqlite3.connect(":memory:")
+        self.conn.executescript("""
+            CREATE TABLE wallet (user_id INTEGER PRIMARY KEY, balance REAL DEFAULT 0.0);
+            CREATE TABLE jobs (id INTEGER PRIMARY KEY, title TEXT, budget REAL, status TEXT);
+            CREATE INDEX idx_jobs_status ON jobs (status);
+            INSERT INTO wallet VALUES (1, 10.1), (2, 0.0);
+            INSERT INTO jobs VALUES (1, 'Logo', 499.99, 'open');
+        """)
+
+    def tearDown(self):
+        self.conn.close()
+
+    def column_type(self, table, column):
+        return {row[1]: row[2] for row in self.conn.execute(f"PRAGMA table_info({table})")}[column]
+
+    def test_real_columns_become_integer_cents(self):
+        money.migrate_to_cents(self.conn)
+        self.assertEqual(self.column_type("wallet", "balance"), "INTEGER")
+        self.assertEqual(self.conn.execute("SELECT balance FROM wallet ORDER BY user_id").fetchall(), [(1010,), (0,)])
+        self.assertEqual(self.conn.execute("SELECT budget FROM jobs").fetchone(), (49999,))
+        # Indexes survive the table rewrite
+        names = {row[0] for row in self.conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+        self.assertIn("idx_jobs_status", names)
+
+    def test_migration_runs_once(self):
+        money.migrate_to_cents(self.conn)
+        money.migrate_to_cents(self.conn)
+        self.assertEqual(self.conn.execute("SELECT balance FROM wallet WHERE user_id = 1").fetchone(), (1010,))
+
+
+if __name__ == "__main__":
+    unittest.main()
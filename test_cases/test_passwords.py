@@ -0,0 +1,108 @@
+import unittest
+import asyncio
+import hashlib
+import os
+import sys
+import tempfile
+
+# Add the parent directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database
+import passwords
+import schema
+import services
+import skill_index
+
+
+class TestPasswords(unittest.TestCase):
+    def setUp(self):
+        self.password_setting = passwords.current_setting()
+        passwords.configure(algorithm="pbkdf2_sha256", cost=1_000)
+
+    def tearDown(self):
+        passwords.configure(**self.password_setting)
+
+    def test_hashes_are_salted_and_name_their_setting(self):
+        first, second = passwords.hash_password("secret"), passwords.hash_password("secret")
+        self.assertNotEqual(first, second)
+        self.assertTrue(first.startswith("pbkdf2_sha256$1000$"))
+        self.assertTrue(passwords.verify_password("secret", first))
+        self.assertFalse(passwords.verify_password("Secret", first))
+        self.assertFalse(passwords.verify_password("secret", "garbage"))
+
+    def test_scrypt_hashes_verify(self):
+        stored = passwords.hash_password("secret", algorithm="scrypt", cost=10)
+        self.assertTrue(stored.startswith("scrypt$10$"))
+        self.assertTrue(passwords.verify_password("secret", stored))
+        self.assertTrue(passwords.needs_upgrade(stored))
+
+    def test_legacy_and_cheaper_hashes_need_upgrade(self):
+        legacy = hashlib.sha256(b"secret").hexdigest()
+        self.assertTrue(passwords.verify_password("secret", legacy))
+        self.assertTrue(passwords.needs_upgrade(legacy))
+        current = passwords.hash_password("secret")
+        self.assertFalse(passwords.needs_upgrade(current))
+        passwords.configure(cost=2_000)
+        self.assertTrue(passwords.needs_upgrade(current))
+        self.assertTrue(passwords.verify_password("secret", current))
+
+    def test_configure_rejects_unknown_settings(self):
+        with self.assertRaises(ValueError):
+            passwords.configure(algorithm="md5")
+        with self.assertRaises(ValueError):
+            passwords.configure(cost=0)
+        with self.assertRaises(ValueError):
+            passwords.configure(pool="fiber")
+
+    def test_async_wrappers_run_on_the_pool(self):
+        async def sign_up_and_log_in():
+            stored = await passwords.hash_password_async("secret")
+            return stored, await passwords.verify_password_async("secret", stored)
+
+        stored, verified = asyncio.run(sign_up_and_log_in())
+        self.assertTrue(verified)
+        self.assertTrue(stored.startswith("pbkdf2_sha256$1000$"))
+
+
+class TestLoginUpgrade(unittest.TestCase):
+    def setUp(self):
+        self.password_setting = passwords.current_setting()
+        passwords.configure(algorithm="pbkdf2_sha256", cost=1_000)
+        self.tmpdir = tempfile.TemporaryDirectory()
+        database.use_database(os.path.join(self.tmpdir.name, "passwords.db"))
+        with database.connection() as conn:
+            schema.migrate(conn)
+
+    def tearDown(self):
+        passwords.configure(**self.password_setting)
+        database.use_database(database.DB_PATH)
+        skill_index.reset_index()
+        self.tmpdir.cleanup()
+
+    def stored_password(self, user_id):
+        with database.connection() as conn:
+            return conn.execute("SELECT password FROM users WHERE id = ?", (user_id,)).fetchone()[0]
+
+    def test_login_upgrades_a_legacy_hash(self):
+        user_id = services.sign_up("ana", "pw", "Employer", company_name="Acme")
+        with database.connection() as conn:
+            conn.execute("UPDATE users SET password = ? WHERE id = ?", (hashlib.sha256(b"pw").hexdigest(), user_id))
+            conn.commit()
+        self.assertEqual(services.login("ana", "pw"), (user_id, "Employer"))
+        upgraded = self.stored_password(user_id)
+        self.assertTrue(upgraded.startswith("pbkdf2_sha256$1000$"))
+        self.assertEqual(services.login("ana", "pw"), (user_id, "Employer"))
+        self.assertEqual(self.stored_password(user_id), upgraded)
+        with self.assertRaises(services.AuthenticationError):
+            services.login("ana", "wrong")
+
+    def test_raising_the_cost_rehashes_at_next_login(self):
+        user_id = services.sign_up("ana", "pw", "Employer", company_name="Acme")
+        passwords.configure(cost=1_500)
+        services.login("ana", "pw")
+        self.assertTrue(self.stored_password(user_id).startswith("pbkdf2_sha256$1500$"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -2,59 +2,74 @@ import unittest
 from unittest.mock import patch, MagicMock
 import os
 import sys
+import tempfile
 
 
 # Add the parent directory to the Python path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from payment_system import Wallet, Payment  # assuming your code is in wallet.py
+from payment_system import Wallet, WalletRepository, Payment  # assuming your code is in wallet.py
+import database
+from ledger import InsufficientFundsError
+from money import Money
 
 
 class TestWalletFunctionality(unittest.TestCase):
 
 
-    @patch('payment_system.sqlite3.connect')
-    def setUp(self, mock_connect):
-        # Mock the database connection and cursor
+    def setUp(self):
+        database.reset_pool()
+
+        # Mock the database connection and cursor (the balance is read lazily, so keep it patched)
+        patcher = patch('database.sqlite3.connect')
+        mock_connect = patcher.start()
+        self.addCleanup(patcher.stop)
         self.mock_conn = MagicMock()
         self.mock_cursor = MagicMock()
         mock_connect.return_value = self.mock_conn
         self.mock_conn.cursor.return_value = self.mock_cursor
-        self.mock_cursor.fetchone.return_value = (1000.0,)  # Mock initial balance
+        self.mock_cursor.fetchone.return_value = (100000,)  # Mock initial balance (Php 1,000.00 in centavos)
        
-        self.wallet = Wallet(user_id=1)  # Initialize with mocked balance
+        self.wallet = Wallet(user_id=1)  # Balance is loaded from the mock on first read
+
+    def tearDown(self):
+        database.reset_pool()
 
+    def test_balance_is_read_once(self):
+        self.mock_cursor.execute.assert_not_called()
+        self.assertEqual(self.wallet.balance, Money(100000))
+        self.assertEqual(self.wallet.balance, Money(100000))
+        self.assertEqual(self.mock_cursor.execute.call_count, 1)
 
     def test_get_balance_from_db(self):
-        self.assertEqual(self.wallet.balance, 1000.0)
+        self.assertEqual(self.wallet.balance, Money(100000))
+        self.assertIsInstance(self.wallet.balance, Money)
         self.mock_cursor.execute.assert_called_with("SELECT balance FROM wallet WHERE user_id = ?", (1,))
 
 
-    @patch('payment_system.sqlite3.connect')
-    def test_update_balance_positive(self, mock_connect):
+    @patch('payment_system.ledger.deposit', return_value=1500.0)
+    @patch('database.sqlite3.connect')
+    def test_update_balance_positive(self, mock_connect, mock_deposit):
         mock_connect.return_value = self.mock_conn
        
         self.wallet.update_balance(500.0)
-        self.mock_cursor.execute.assert_called_with(
-            "UPDATE wallet SET balance = balance + ? WHERE user_id = ?", (500.0, 1)
-        )
-        self.mock_conn.commit.assert_called_once()
+        mock_deposit.assert_called_once_with(self.mock_conn, 1, 500.0)
+        self.assertEqual(self.wallet.balance, 1500.0)
 
 
-    @patch('payment_system.sqlite3.connect')
-    def test_update_balance_negative(self, mock_connect):
+    @patch('payment_system.ledger.withdraw', return_value=700.0)
+    @patch('database.sqlite3.connect')
+    def test_update_balance_negative(self, mock_connect, mock_withdraw):
         mock_connect.return_value = self.mock_conn
        
         self.wallet.update_balance(-300.0)
-        self.mock_cursor.execute.assert_called_with(
-            "UPDATE wallet SET balance = balance + ? WHERE user_id = ?", (-300.0, 1)
-        )
-        self.mock_conn.commit.assert_called_once()
+        mock_withdraw.assert_called_once_with(self.mock_conn, 1, 300.0)
+        self.assertEqual(self.wallet.balance, 700.0)
 
 
     @patch('payment_system.Wallet.update_balance')
     def test_deposit_valid_amount(self, mock_update_balance):
         self.wallet.deposit(200)
-        mock_update_balance.assert_called_with(200)
+        mock_update_balance.assert_called_with(Money(20000))
 
 
     @patch('payment_system.Wallet.update_balance')
@@ -66,46 +81,92 @@ class TestWalletFunctionality(unittest.TestCase):
     @patch('payment_system.Wallet.update_balance')
     def test_withdraw_valid_amount(self, mock_update_balance):
         self.wallet.withdraw(300)
-        mock_update_balance.assert_called_with(-300)
+        mock_update_balance.assert_called_with(-Money(30000))
 
 
     @patch('payment_system.Wallet.update_balance')
     def test_withdraw_insufficient_funds(self, mock_update_balance):
-        self.wallet.balance = 100  # set low balance
+        self.wallet.balance = Money(10000)  # set low balance
         self.wallet.withdraw(200)
         mock_update_balance.assert_not_called()
 
 
+    @patch('payment_system.time.sleep')
+    @patch('payment_system.Wallet.update_balance', side_effect=InsufficientFundsError)
+    def test_withdraw_stale_balance(self, mock_update_balance, mock_sleep):
+        # The cached balance looks sufficient but the conditional debit refuses
+        with patch('builtins.print') as mock_print:
+            self.wallet.withdraw(300)
+        mock_print.assert_any_call("\nInsufficient funds!")
+
+
+class TestWalletRepository(unittest.TestCase):
+    def setUp(self):
+        import schema
+        self.tmpdir = tempfile.TemporaryDirectory()
+        database.use_database(os.path.join(self.tmpdir.name, "wallets.db"))
+        with database.connection() as conn:
+            schema.migrate(conn)
+            conn.execute("INSERT INTO wallet (user_id, balance) VALUES (1, 5000), (2, 0)")
+            conn.commit()
+
+    def tearDown(self):
+        database.use_database(database.DB_PATH)
+        self.tmpdir.cleanup()
+
+    @patch('payment_system.time.sleep')
+    def test_ledger_writes_update_cached_balances(self, mock_sleep):
+        repository = WalletRepository()
+        employer, freelancer = repository.get(1), repository.get(2)
+        self.assertIs(repository.get(1), employer)
+        with patch.object(Wallet, 'get_balance_from_db', autospec=True,
+                          side_effect=Wallet.get_balance_from_db) as reads, patch('builtins.print'):
+            self.assertEqual((employer.balance, freelancer.balance), (5000, 0))
+            employer.deposit(10)
+            Payment(amount=20, milestone="Logo").release_payment(employer, freelancer)
+            self.assertEqual((employer.balance, freelancer.balance), (4000, 2000))
+            self.assertEqual(reads.call_count, 2)  # one per wallet, none after the writes
+
+            repository.invalidate()
+            self.assertEqual(freelancer.balance, 2000)
+            self.assertEqual(reads.call_count, 3)
+
+
 class TestPaymentFunctionality(unittest.TestCase):
 
 
+    def setUp(self):
+        database.reset_pool()
+
+
+    def tearDown(self):
+        database.reset_pool()
+
+
     @patch('payment_system.Wallet.get_balance_from_db', return_value=1000)
-    @patch('payment_system.Wallet.withdraw')
-    @patch('payment_system.Wallet.deposit')
-    def test_release_payment_successful(self, mock_deposit, mock_withdraw, mock_get_balance):
+    @patch('payment_system.ledger.transfer')
+    @patch('database.sqlite3.connect')
+    def test_release_payment_successful(self, mock_connect, mock_transfer, mock_get_balance):
         employer_wallet = Wallet(user_id=1)
         freelancer_wallet = Wallet(user_id=2)
         payment = Payment(amount=500, milestone="Website Design")
        
         payment.release_payment(employer_wallet, freelancer_wallet)
        
-        mock_withdraw.assert_called_with(500)
-        mock_deposit.assert_called_with(500)
+        mock_transfer.assert_called_once_with(mock_connect.return_value, 1, 2, Money(50000), memo="milestone:Website Design")
         self.assertEqual(payment.status, "Paid")
 
 
     @patch('payment_system.Wallet.get_balance_from_db', return_value=400)
-    @patch('payment_system.Wallet.withdraw')
-    @patch('payment_system.Wallet.deposit')
-    def test_release_payment_insufficient_funds(self, mock_deposit, mock_withdraw, mock_get_balance):
+    @patch('payment_system.ledger.transfer', side_effect=InsufficientFundsError)
+    @patch('database.sqlite3.connect')
+    def test_release_payment_insufficient_funds(self, mock_connect, mock_transfer, mock_get_balance):
         employer_wallet = Wallet(user_id=1)
         freelancer_wallet = Wallet(user_id=2)
         payment = Payment(amount=500, milestone="App Development")
        
         payment.release_payment(employer_wallet, freelancer_wallet)
        
-        mock_withdraw.assert_not_called()
-        mock_deposit.assert_not_called()
         self.assertEqual(payment.status, "Pending")
 
 
@@ -0,0 +1,94 @@
+import unittest
+import logging
+import os
+import sqlite3
+import sys
+import tempfile
+
+# Add the parent directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import querylog
+
+
+def run_lookup(conn, user_id):
+    return conn.execute("SELECT name FROM people WHERE id = ?", (user_id,)).fetchone()
+
+
+class TestQueryLog(unittest.TestCase):
+    def setUp(self):
+        self.conn = sqlite3.connect(":memory:", factory=querylog.InstrumentedConnection)
+        self.conn.execute("CREATE TABLE people (id INTEGER PRIMARY KEY, name TEXT)")
+        self.conn.executemany("INSERT INTO people (name) VALUES (?)", [("Ana",), ("Ben",), ("Cy",)])
+        self.session = querylog.start_session()
+        self.threshold = querylog.SLOW_QUERY_MS
+
+    def tearDown(self):
+        querylog.end_session(self.session)
+        querylog.SLOW_QUERY_MS = self.threshold
+        self.conn.close()
+
+    def test_fingerprint_groups_values(self):
+        self.assertEqual(
+            querylog.fingerprint("SELECT * FROM jobs  WHERE budget > 500 AND title = 'Logo'"),
+            "SELECT * FROM jobs WHERE budget > ? AND title = ?",
+        )
+        self.assertEqual(querylog.fingerprint("SELECT 1 WHERE id IN (?, ?, ?)"), "SELECT ? WHERE id IN (?...)")
+
+    def test_records_calls_rows_and_caller(self):
+        self.conn.execute("SELECT name FROM people").fetchall()
+        self.conn.execute("SELECT name FROM people").fetchall()
+        entry = self.session.snapshot()["SELECT name FROM people"]
+        self.assertEqual(entry["calls"], 2)
+        self.assertEqual(entry["rows"], 6)
+        self.assertEqual(entry["callers"], [f"{__name__}.TestQueryLog.test_records_calls_rows_and_caller"])
+
+    def test_caller_is_the_function_that_ran_the_query(self):
+        run_lookup(self.conn, 1)
+        entry = self.session.snapshot()["SELECT name FROM people WHERE id = ?"]
+        self.assertEqual(entry["callers"], [f"{__name__}.run_lookup"])
+        self.assertEqual(entry["rows"], 1)
+
+    def test_iteration_counts_rows(self):
+        names = [row[0] for row in self.conn.execute("SELECT name FROM people ORDER BY id")]
+        self.assertEqual(names, ["Ana", "Ben", "Cy"])
+        self.assertEqual(self.session.snapshot()["SELECT name FROM people ORDER BY id"]["rows"], 3)
+
+    def test_ended_session_stops_collecting(self):
+        querylog.end_session(self.session)
+        self.conn.execute("SELECT name FROM people").fetchall()
+        self.assertNotIn("SELECT name FROM people", self.session.snapshot())
+
+    def test_slow_statements_are_logged(self):
+        records = []
+        handler = logging.Handler()
+        handler.emit = records.append
+        querylog.get_slow_log().addHandler(handler)
+        try:
+            querylog.SLOW_QUERY_MS = 0
+            self.conn.execute("SELECT name FROM people WHERE id = 2").fetchall()
+        finally:
+            querylog.get_slow_log().removeHandler(handler)
+        messages = [record.getMessage() for record in records]
+        self.assertTrue(any("SELECT name FROM people WHERE id = ?" in message and "rows=1" in message
+                            for message in messages))
+
+    def test_configure_writes_log_file(self):
+        slow_log = querylog.get_slow_log()
+        handlers = list(slow_log.handlers)
+        path = os.path.join(tempfile.mkdtemp(), "slow.log")
+        try:
+            querylog.configure(slow_query_ms=0, log_path=path)
+            self.conn.execute("SELECT COUNT(*) FROM people").fetchone()
+        finally:
+            for handler in list(slow_log.handlers):
+                slow_log.removeHandler(handler)
+                handler.close()
+            for handler in handlers:
+                slow_log.addHandler(handler)
+        with open(path, encoding="utf-8") as log:
+            self.assertIn("SELECT COUNT(*) FROM people", log.read())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,74 @@
+import unittest
+import os
+import sys
+
+# Add the parent directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database
+import recommender
+import skill_index
+from test_cases.support import DatabaseTestCase
+
+
+class TestScoring(unittest.TestCase):
+    def test_estimate_hours(self):
+        self.assertEqual(recommender.estimate_hours("2 weeks"), 80)
+        self.assertEqual(recommender.estimate_hours("1 Month"), 160)
+        self.assertEqual(recommender.estimate_hours(".5 weeks"), 20)
+        self.assertEqual(recommender.estimate_hours("soon"), recommender.DEFAULT_HOURS)
+
+
+class TestRecommendations(DatabaseTestCase):
+    def seed(self, conn):
+        conn.executescript("""
+            INSERT INTO users (id, username, password, role, name, skills, hourly_rate)
+            VALUES (1, 'ana', 'x', 'Freelancer', 'Ana', 'Python, SQL', 10),
+                   (2, 'ben', 'x', 'Freelancer', 'Ben', 'Excel', 10),
+                   (3, 'acme', 'x', 'Employer', 'Acme', NULL, NULL);
+            INSERT INTO jobs (id, employer_id, title, description, budget, skills_required, duration, status)
+            VALUES (1, 3, 'Spreadsheet', 'd', 400, 'Excel', '1 week', 'open'),
+                   (2, 3, 'API', 'd', 400, 'Python, SQL', '1 week', 'open'),
+                   (3, 3, 'Old API', 'd', 400, 'Python', '1 week', 'completed');
+        """)
+
+    def test_recommend_jobs(self):
+        """Open jobs come back best fit first"""
+        jobs = recommender.recommend_jobs(1)
+        self.assertEqual([row[0] for row in jobs], [2, 1])
+
+    def test_scores(self):
+        """Ana shares both of the API's skills and none of the spreadsheet's; both pay far below her rate"""
+        jobs = recommender.recommend_jobs(1)
+        self.assertEqual([(row[0], row[4]) for row in jobs], [(2, 0.683), (1, 0.083)])
+        self.assertEqual(len(recommender.recommend_jobs(1, limit=1)), 1)
+
+    def test_budget_fit(self):
+        """A job that pays the freelancer's rate for its hours outranks one that pays less"""
+        with database.connection() as conn:
+            conn.execute("INSERT INTO jobs (id, employer_id, title, description, budget, skills_required, duration) "
+                         "VALUES (4, 3, 'Big API', 'd', 400000, 'Python, SQL', '1 week')")
+            skill_index.set_job_skills(conn, 4, "Python, SQL")
+            conn.commit()
+        jobs = recommender.recommend_jobs(1)
+        self.assertEqual([(row[0], row[4]) for row in jobs[:2]], [(4, 0.98), (2, 0.683)])
+
+    def test_sql_hours_match_estimate_hours(self):
+        with database.connection() as conn:
+            for duration in ("2 weeks", "1 Month", "3 days", "1.5 hours", "soon", "", None, "0 days", "about 2 weeks",
+                             ".5 weeks", "2. days", "+1 week", "1e1 hours", "-1 week"):
+                sql = conn.execute(f"SELECT {recommender._hours_sql(':d')}", {"d": duration}).fetchone()[0]
+                self.assertEqual(sql, recommender.estimate_hours(duration), duration)
+
+    def test_rank_applicants(self):
+        """The applicant whose skills match the job ranks first"""
+        applicants = [
+            (2, "Ben", "Excel", "1 year", 10.0, 11),
+            (1, "Ana", "Python, SQL", "2 years", 10.0, 12),
+        ]
+        ranked = recommender.rank_applicants(2, applicants)
+        self.assertEqual([row[1] for _, row in ranked], ["Ana", "Ben"])
+
+
+if __name__ == "__main__":
+    unittest.main()
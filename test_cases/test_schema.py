@@ -0,0 +1,125 @@
+import unittest
+import sqlite3
+import os
+import sys
+from unittest.mock import Mock, patch
+
+# Add the parent directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import schema
+
+
+class TestMigrate(unittest.TestCase):
+    def setUp(self):
+        self.conn = sqlite3.connect(":memory:")
+
+    def tearDown(self):
+        self.conn.close()
+
+    def tables(self):
+        return {row[0] for row in self.conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+
+    def test_fresh_database_reaches_latest_version(self):
+        applied = schema.migrate(self.conn)
+        self.assertEqual(applied, [version for version, _, _ in schema.MIGRATIONS])
+        self.assertEqual(schema.current_version(self.conn), schema.LATEST_VERSION)
+        self.assertTrue({"users", "jobs", "escrow_accounts", "jobs_fts", "skills", "ledger_entries"} <= self.tables())
+
+    def test_current_database_skips_every_step(self):
+        schema.migrate(self.conn)
+        steps = tuple((version, description, Mock()) for version, description, _ in schema.MIGRATIONS)
+        with patch.object(schema, "MIGRATIONS", steps):
+            self.assertEqual(schema.migrate(self.conn), [])
+        for _, _, step in steps:
+            step.assert_not_called()
+
+    def test_target_stops_early(self):
+        self.assertEqual(schema.migrate(self.conn, target=schema.CORE_VERSION), [1, 2])
+        self.assertNotIn("jobs_fts", self.tables())
+        self.assertEqual(schema.migrate(self.conn), list(range(3, schema.LATEST_VERSION + 1)))
+
+    def test_unversioned_database_is_adopted(self):
+        """A database created before versioning (with REAL money) is upgraded in place"""
+        self.conn.executescript("""
+            CREATE TABLE users (id INTEGER PRIMARY KEY AUTOINCREMENT, username TEXT UNIQUE, password TEXT,
+                                role TEXT, name TEXT, skills TEXT, experience TEXT, hourly_rate REAL,
+                                payment_method TEXT, company_name TEXT);
+            CREATE TABLE wallet (user_id INTEGER PRIMARY KEY, balance REAL DEFAULT 0.0);
+            INSERT INTO users (username, password, role, skills) VALUES ('ana', 'x', 'Freelancer', 'Python');
+            INSERT INTO wallet VALUES (1, 12.5);
+        """)
+        schema.migrate(self.conn)
+        self.assertEqual(self.conn.execute("SELECT balance FROM wallet").fetchone(), (1250,))
+        self.assertEqual(self.conn.execute("SELECT COUNT(*) FROM user_skills").fetchone(), (1,))
+
+    def test_old_temporary_wallet_layout_is_merged(self):
+        self.conn.executescript("""
+            CREATE TABLE temporary_wallet (id INTEGER PRIMARY KEY AUTOINCREMENT, employer_id INTEGER NOT NULL,
+                                           freelancer_id INTEGER NOT NULL, balance INTEGER DEFAULT 0);
+            INSERT INTO temporary_wallet (employer_id, freelancer_id, balance) VALUES (1, 5, 100), (2, 5, 50), (1, 6, 10);
+        """)
+        schema.migrate(self.conn, target=schema.CORE_VERSION)
+        rows = self.conn.execute("SELECT freelancer_id, employer_id, balance FROM temporary_wallet ORDER BY 1").fetchall()
+        self.assertEqual(rows, [(5, 2, 150), (6, 1, 10)])
+
+    def test_escrow_moves_to_the_accepted_job(self):
+        schema.migrate(self.conn, target=schema.CORE_VERSION)
+        self.conn.executescript("""
+            INSERT INTO jobs (id, employer_id, title, description, budget, skills_required, duration, status)
+            VALUES (7, 1, 'Logo', 'd', 10, 'Design', '1 week', 'in_progress');
+            INSERT INTO job_applications (job_id, freelancer_id, status) VALUES (7, 5, 'accepted');
+            INSERT INTO temporary_wallet (freelancer_id, employer_id, balance) VALUES (5, 1, 150), (6, 1, 10);
+        """)
+        schema.migrate(self.conn)
+        rows = self.conn.execute("SELECT job_id, freelancer_id, balance, funded, status FROM escrow_accounts ORDER BY 2").fetchall()
+        self.assertEqual(rows, [(7, 5, 150, 150, "open"), (0, 6, 10, 10, "open")])
+        self.assertNotIn("temporary_wallet", self.tables())
+
+
+class TestRewriteTable(unittest.TestCase):
+    def setUp(self):
+        self.conn = sqlite3.connect(":memory:")
+        self.conn.executescript("""
+            CREATE TABLE jobs (id INTEGER PRIMARY KEY, title TEXT, budget REAL);
+            CREATE INDEX idx_jobs_title ON jobs (title);
+        """)
+        self.conn.executemany("INSERT INTO jobs VALUES (?, ?, ?)", [(n, f"Job {n}", n + 0.5) for n in range(1, 8)])
+        self.conn.commit()
+
+    def tearDown(self):
+        self.conn.close()
+
+    def rewrite(self, progress=None):
+        return schema.rewrite_table(
+            self.conn, "jobs", "CREATE TABLE jobs (id INTEGER PRIMARY KEY, title TEXT, budget INTEGER)",
+            ["id", "title", "budget"], "id", {"budget": "CAST(ROUND({row}budget * 100) AS INTEGER)"},
+            batch_size=3, progress=progress)
+
+    def test_copies_in_batches_and_keeps_indexes(self):
+        batches = []
+        self.assertEqual(self.rewrite(lambda table, copied: batches.append(copied)), 7)
+        self.assertEqual(batches, [3, 6, 7])
+        self.assertEqual(self.conn.execute("SELECT budget FROM jobs WHERE id = 2").fetchone(), (250,))
+        names = {row[0] for row in self.conn.execute("SELECT name FROM sqlite_master")}
+        self.assertIn("idx_jobs_title", names)
+        self.assertFalse({name for name in names if "__rewrite" in name})
+
+    def test_writes_between_batches_are_kept(self):
+        def write_between_batches(table, copied):
+            if copied == 3:
+                self.conn.execute("UPDATE jobs SET budget = 99.0 WHERE id = 6")
+                self.conn.execute("DELETE FROM jobs WHERE id = 7")
+                self.conn.execute("INSERT INTO jobs VALUES (8, 'Job 8', 1.0)")
+                self.conn.commit()
+
+        self.rewrite(write_between_batches)
+        rows = dict(self.conn.execute("SELECT id, budget FROM jobs").fetchall())
+        self.assertEqual(rows[6], 9900)
+        self.assertNotIn(7, rows)
+        self.assertEqual(rows[8], 100)
+        self.assertEqual(len(rows), 7)
+
+
+if __name__ == "__main__":
+    unittest.main()
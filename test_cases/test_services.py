@@ -0,0 +1,136 @@
+import unittest
+import io
+import json
+import os
+import sys
+from unittest.mock import patch
+
+# Add the parent directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import batch
+import database
+import services
+from money import Money
+from test_cases.support import DatabaseTestCase
+
+
+class TestServices(DatabaseTestCase):
+    def hire(self):
+        employer = services.sign_up("acme", "pw", "Employer", company_name="Acme")
+        freelancer = services.sign_up("ana", "pw", "Freelancer", name="Ana", skills="Python", hourly_rate=20)
+        services.deposit(employer, "1000")
+        job = services.post_job(employer, "ETL", "Pipelines", "300", "Python", "1 week")
+        application = services.apply_job(freelancer, job)
+        services.decide_application(employer, application, accept=True)
+        return employer, freelancer, job
+
+    def test_sign_up_and_login(self):
+        user_id = services.sign_up("ana", "pw", "Freelancer", hourly_rate=20)
+        self.assertEqual(services.login("ana", "pw"), (user_id, "Freelancer"))
+        self.assertEqual(services.get_balance(user_id), Money(0))
+        with self.assertRaises(services.ConflictError):
+            services.sign_up("ana", "other", "Employer")
+        with self.assertRaises(services.AuthenticationError):
+            services.login("ana", "wrong")
+        with self.assertRaises(services.ValidationError):
+            services.sign_up("bob", "pw", "Freelancer", hourly_rate="-5")
+
+    def test_post_job_needs_funds(self):
+        employer = services.sign_up("acme", "pw", "Employer")
+        with self.assertRaises(services.InsufficientFundsError):
+            services.post_job(employer, "ETL", "d", "10", "Python", "1 week")
+        with self.assertRaises(services.ValidationError):
+            services.deposit(employer, "abc")
+
+    def test_milestone_flow_pays_out(self):
+        employer, freelancer, job = self.hire()
+        services.add_milestone(employer, job, "M1", "100")
+        services.add_milestone(employer, job, "M2", "200")
+        with self.assertRaises(services.ValidationError):
+            services.add_milestone(employer, job, "M3", "0.01")  # budget fully allocated
+
+        services.submit_milestone(freelancer, "M1")
+        with self.assertRaises(services.ConflictError):
+            services.submit_milestone(freelancer, "M1")
+        self.assertEqual(services.approve_milestone(employer, "M1"), (freelancer, Money(0)))
+        with self.assertRaises(services.ConflictError):
+            services.approve_milestone(employer, "M1")
+        self.assertEqual(services.approve_milestone(employer, "M2"), (freelancer, Money(30000)))
+        self.assertEqual(services.get_balance(freelancer), Money(30000))
+        self.assertEqual(services.get_balance(employer), Money(70000))
+
+    def test_bulk_approval_settles_completed_jobs(self):
+        employer, freelancer, job = self.hire()
+        other_job = services.post_job(employer, "API", "Endpoints", "300", "Python", "1 week")
+        services.decide_application(employer, services.apply_job(freelancer, other_job), accept=True)
+        first = services.add_milestone(employer, job, "M1", "100")
+        second = services.add_milestone(employer, job, "M2", "200")
+        third = services.add_milestone(employer, other_job, "M3", "50")
+        services.add_milestone(employer, other_job, "M4", "50")
+        services.approve_milestone(employer, "M1")
+
+        outcome = services.approve_milestones(employer, [first, second, third, 999])
+        self.assertEqual([result["ok"] for result in outcome["results"]], [False, True, True, False])
+        self.assertEqual(outcome["total"], Money(25000))
+        self.assertEqual(outcome["released"], [{"job_id": job, "freelancer_id": freelancer, "amount": Money(30000)}])
+        self.assertEqual(services.get_balance(freelancer), Money(30000))
+        self.assertEqual(services.get_balance(employer), Money(100000 - 35000))
+
+    def test_bulk_approval_is_all_or_nothing(self):
+        employer, freelancer, job = self.hire()
+        first = services.add_milestone(employer, job, "M1", "100")
+        second = services.add_milestone(employer, job, "M2", "200")
+        services.withdraw(employer, "800")
+        with self.assertRaises(services.InsufficientFundsError):
+            services.approve_milestones(employer, [first, second])
+        self.assertEqual(services.get_balance(employer), Money(20000))
+        # The single-milestone path still works afterwards: nothing was left approved
+        self.assertEqual(services.approve_milestone(employer, "M1"), (freelancer, Money(0)))
+        with self.assertRaises(services.ValidationError):
+            services.approve_milestones(employer, [])
+
+    def test_bulk_approval_checks_ids_and_chunks_lookups(self):
+        employer, freelancer, job = self.hire()
+        ids = [services.add_milestone(employer, job, f"M{n}", "50") for n in range(5)]
+        for bad in (["1"], [1.5], [True], "12", None):
+            with self.assertRaises(services.ValidationError):
+                services.approve_milestones(employer, bad)
+        with patch.object(database, "IN_CHUNK", 2):
+            outcome = services.approve_milestones(employer, ids)
+        self.assertTrue(all(result["ok"] for result in outcome["results"]))
+        self.assertEqual(outcome["released"], [{"job_id": job, "freelancer_id": freelancer, "amount": Money(25000)}])
+
+    def test_other_employers_cannot_act(self):
+        employer, freelancer, job = self.hire()
+        rival = services.sign_up("rival", "pw", "Employer")
+        with self.assertRaises(services.NotFoundError):
+            services.add_milestone(rival, job, "M1", "10")
+        services.add_milestone(employer, job, "M1", "10")
+        with self.assertRaises(services.NotFoundError):
+            services.approve_milestone(rival, "M1")
+
+
+class TestBatch(DatabaseTestCase):
+    def test_runs_script_with_references(self):
+        script = [
+            '{"op": "sign_up", "username": "acme", "password": "pw", "role": "Employer", "as": "acme"}',
+            "# comments and blank lines are skipped",
+            "",
+            '{"op": "deposit", "user_id": "$acme", "amount": "12.50"}',
+            '{"op": "withdraw", "user_id": "$acme", "amount": "20"}',
+            '{"op": "nope"}',
+        ]
+        out = io.StringIO()
+        failures = batch.run(script, out)
+
+        records = [json.loads(line) for line in out.getvalue().splitlines()]
+        self.assertEqual(failures, 2)
+        self.assertEqual([record["line"] for record in records], [1, 4, 5, 6])
+        self.assertEqual(records[1]["result"], 1250)
+        self.assertEqual(records[2]["error"], "InsufficientFundsError")
+        self.assertEqual(records[3]["error"], "ValidationError")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,90 @@
+import unittest
+import os
+import sys
+
+# Add the parent directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database
+import passwords
+import querylog
+import services
+import session
+from test_cases.support import DatabaseTestCase
+
+
+class TestSession(DatabaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.freelancer_id = services.sign_up("ana", "pw", "Freelancer", name="Ana", skills="Python, SQL",
+                                              experience="3 years", hourly_rate=20, payment_method="GCash")
+        self.employer_id = services.sign_up("acme", "pw", "Employer", company_name="Acme")
+        self.queries = querylog.start_session()
+
+    def tearDown(self):
+        querylog.end_session(self.queries)
+
+    def user_queries(self):
+        return sum(entry["calls"] for sql, entry in self.queries.snapshot().items() if "FROM users" in sql)
+
+    def write(self, sql, *params):
+        with database.connection() as conn:
+            conn.execute(sql, params)
+            conn.commit()
+
+    def test_login_loads_the_profile_with_the_credentials(self):
+        user = session.Session().login("ana", "pw")
+        self.assertEqual((user.id, user.name, user.skills, user.hourly_rate), (self.freelancer_id, "Ana", ["Python", "SQL"], 20))
+        self.assertIs(user.session.get(user.id), user)
+        self.assertEqual(self.user_queries(), 1)
+        with self.assertRaises(services.AuthenticationError):
+            session.Session().login("ana", "wrong")
+
+    def test_other_users_are_loaded_once_by_id(self):
+        current = session.Session()
+        employer = current.get(self.employer_id)
+        self.assertEqual(employer.company_name, "Acme")
+        self.assertIs(current.get(self.employer_id), employer)
+        self.assertEqual(self.user_queries(), 1)
+        self.assertIsNone(current.get(999))
+
+    def test_own_writes_keep_the_cached_profile(self):
+        current = session.Session(max_age=0)
+        user = current.login("ana", "pw")
+        with database.connection() as conn:
+            user.update_skills("Go", conn)
+            user.update_hourly_rate(35.0, conn)
+        before = self.user_queries()
+        self.assertIs(current.get(user.id), user)
+        self.assertEqual((user.skills, user.hourly_rate), (["Go"], 35.0))
+        # Only the version was checked; the profile was not reloaded
+        self.assertEqual(self.user_queries() - before, 1)
+
+    def test_writes_elsewhere_reload_into_the_same_object(self):
+        current = session.Session(max_age=60)
+        user = current.login("ana", "pw")
+        self.write("UPDATE users SET name = 'Ana B' WHERE id = ?", user.id)
+        self.assertEqual(current.get(user.id).name, "Ana")  # still within max_age
+        current.max_age = 0
+        self.assertIs(current.get(user.id), user)
+        self.assertEqual(user.name, "Ana B")
+
+    def test_invalidate_forces_a_reload(self):
+        current = session.Session()
+        employer = current.get(self.employer_id)
+        self.write("UPDATE users SET company_name = 'Acme Ltd' WHERE id = ?", self.employer_id)
+        current.invalidate(self.employer_id)
+        self.assertIs(current.get(self.employer_id), employer)
+        self.assertEqual(employer.company_name, "Acme Ltd")
+
+    def test_password_upgrades_leave_the_version_alone(self):
+        user = session.Session().login("ana", "pw")
+        passwords.configure(cost=1_500)
+        services.login("ana", "pw")
+        with database.connection() as conn:
+            version = conn.execute("SELECT profile_version FROM users WHERE id = ?", (user.id,)).fetchone()[0]
+        self.assertEqual(version, user.profile_version)
+
+
+if __name__ == "__main__":
+    unittest.main()
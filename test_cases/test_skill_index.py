@@ -0,0 +1,124 @@
+import unittest
+import os
+import sqlite3
+import sys
+
+# Add the parent directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database
+import skill_index
+from skill_index import SkillIndex, split_skills, normalize_skills
+from test_cases.support import DatabaseTestCase
+
+
+class TestSkillParsing(unittest.TestCase):
+    def test_split_skills(self):
+        """Skills are split on commas with or without spaces, trimmed and de-duplicated"""
+        self.assertEqual(split_skills("Python,SQL, python ,  Go"), ["Python", "SQL", "Go"])
+        self.assertEqual(split_skills(None), [])
+
+    def test_normalize_skills(self):
+        self.assertEqual(normalize_skills("Python, SQL"), {"python", "sql"})
+
+
+class TestSkillIndex(unittest.TestCase):
+    def test_ranks_by_shared_skills(self):
+        """Jobs sharing more skills with the query rank first"""
+        index = SkillIndex()
+        index.set_job(1, {"python"})
+        index.set_job(2, {"python", "sql"})
+        index.set_job(3, {"excel"})
+        self.assertEqual(index.jobs_matching({"python", "sql"}), [(2, 2), (1, 1)])
+
+    def test_incremental_update_replaces_old_skills(self):
+        """Re-setting a freelancer's skills removes them from the old postings"""
+        index = SkillIndex()
+        index.set_user(7, {"python"})
+        index.set_user(7, {"go"})
+        self.assertEqual(index.users_matching({"python"}), [])
+        self.assertEqual(index.users_matching({"go"}), [(7, 1)])
+
+
+class TestSkillTables(DatabaseTestCase):
+    def seed(self, conn):
+        """Rows written before the skills tables existed; migrating backfills them"""
+        conn.executescript("""
+            INSERT INTO users (id, username, password, role, name, skills, hourly_rate)
+            VALUES (1, 'ana', 'x', 'Freelancer', 'Ana', 'Python, SQL', 20),
+                   (2, 'ben', 'x', 'Freelancer', 'Ben', 'Excel', 15),
+                   (3, 'acme', 'x', 'Employer', 'Acme', NULL, NULL);
+            INSERT INTO jobs (id, employer_id, title, description, budget, skills_required, duration, status)
+            VALUES (1, 3, 'API', 'd', 50000, 'python', '1 week', 'open'),
+                   (2, 3, 'Report', 'd', 10000, 'Excel, SQL', '1 week', 'open'),
+                   (3, 3, 'Old API', 'd', 30000, 'Python', '1 week', 'in_progress');
+        """)
+
+    def test_backfill_and_match_open_jobs(self):
+        """Existing text skills are backfilled and only open jobs are returned"""
+        jobs = skill_index.matching_jobs("Python, SQL")
+        self.assertEqual([(row[0], row[4]) for row in jobs], [(1, 1), (2, 1)])
+
+    def test_new_job_is_indexed(self):
+        """Posting a job updates the tables and the loaded index"""
+        skill_index.get_index()
+        with database.connection() as conn:
+            conn.execute("INSERT INTO jobs (id, employer_id, title, description, budget, skills_required, duration) "
+                         "VALUES (4, 3, 'Sheets', 'd', 5000, 'Excel', '1 day')")
+            skill_index.set_job_skills(conn, 4, "Excel")
+            conn.commit()
+        names = [row[1] for row in skill_index.matching_freelancers(4)]
+        self.assertEqual(names, ["Ben"])
+
+    def test_rolled_back_writes_never_reach_the_index(self):
+        skill_index.get_index()
+        with database.connection() as conn:
+            skill_index.set_user_skills(conn, 2, "Python")
+            skill_index.set_job_skills(conn, 2, "Go")
+            conn.rollback()
+        self.assertEqual([row[1] for row in skill_index.matching_freelancers(1)], ["Ana"])
+        self.assertEqual([row[0] for row in skill_index.matching_jobs("Excel")], [2])
+
+    def test_writes_from_other_connections_are_picked_up(self):
+        """A separate connection stands in for another process sharing the file"""
+        skill_index.get_index()
+        other = sqlite3.connect(database.current_database())
+        try:
+            skill_index.set_user_skills(other, 2, "Python")
+            other.execute("UPDATE jobs SET status = 'in_progress' WHERE id = 1")
+            other.commit()
+        finally:
+            other.close()
+        self.assertEqual([row[1] for row in skill_index.matching_freelancers(1)], ["Ana", "Ben"])
+        self.assertEqual(skill_index.get_index().jobs_matching({"python"}), [])  # the job closed, so it left the index
+        self.assertEqual([row[1] for row in skill_index.matching_freelancers(3)], ["Ana", "Ben"])
+
+
+    def test_changes_every_reader_applied_are_pruned(self):
+        """The log keeps only the rows some live reader has yet to apply"""
+        skill_index.get_index()
+        with database.connection() as conn:
+            other = SkillIndex.load(conn)
+            skill_index.set_user_skills(conn, 2, "Python")
+            skill_index.set_job_skills(conn, 2, "Go")
+            conn.commit()
+            self.assertTrue(other.refresh(conn))
+            self.assertEqual(conn.execute("SELECT COUNT(*) FROM skill_changes").fetchone()[0], 2)  # ours is behind
+        self.assertEqual([row[1] for row in skill_index.matching_freelancers(1)], ["Ana", "Ben"])
+        with database.connection() as conn:
+            self.assertEqual(conn.execute("SELECT COUNT(*) FROM skill_changes").fetchone()[0], 0)
+
+    def test_a_reader_dropped_as_idle_reloads(self):
+        skill_index.get_index()
+        with database.connection() as conn:
+            conn.execute("UPDATE skill_index_readers SET seen_at = 0")
+            other = SkillIndex.load(conn)
+            skill_index.set_user_skills(conn, 2, "Python")
+            conn.commit()
+            self.assertTrue(other.refresh(conn))  # drops the idle reader and prunes the change it never saw
+            self.assertEqual(conn.execute("SELECT COUNT(*) FROM skill_changes").fetchone()[0], 0)
+        self.assertEqual([row[1] for row in skill_index.matching_freelancers(1)], ["Ana", "Ben"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,57 @@
+import unittest
+import os
+import sqlite3
+import sys
+import tempfile
+
+# Add the parent directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database
+import storage
+
+
+class TestStorageProfiles(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "profiles.db")
+
+    def tearDown(self):
+        database.use_database(database.DB_PATH, storage.DEFAULT_PROFILE)
+        self.tmpdir.cleanup()
+
+    def test_profile_settings_are_applied(self):
+        conn = sqlite3.connect(self.path)
+        try:
+            storage.apply_profile(conn, "read-heavy")
+            settings = storage.current_settings(conn)
+        finally:
+            conn.close()
+        self.assertEqual(settings["journal_mode"], "WAL")
+        self.assertEqual(settings["synchronous"], 1)  # NORMAL
+        self.assertEqual(settings["busy_timeout"], 5000)
+        self.assertEqual(settings["cache_size"], -64000)
+
+    def test_unknown_profile_is_rejected(self):
+        with self.assertRaises(ValueError):
+            storage.get_profile("turbo")
+        with self.assertRaises(ValueError):
+            database.use_profile("turbo")
+
+    def test_pool_connections_use_the_selected_profile(self):
+        database.use_database(self.path, "bulk-load")
+        with database.connection() as conn:
+            settings = storage.current_settings(conn)
+        self.assertEqual(database.current_profile(), "bulk-load")
+        self.assertEqual(settings["journal_mode"], "WAL")
+        self.assertEqual(settings["synchronous"], 0)  # OFF
+        self.assertEqual(settings["busy_timeout"], 30000)
+
+    def test_defaults_profile_keeps_rollback_journal(self):
+        database.use_database(self.path, "sqlite-defaults")
+        with database.connection() as conn:
+            self.assertEqual(storage.current_settings(conn)["journal_mode"], "DELETE")
+
+
+if __name__ == "__main__":
+    unittest.main()
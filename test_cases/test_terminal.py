@@ -0,0 +1,75 @@
+import unittest
+import io
+import os
+import sys
+
+# Add the parent directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import terminal
+from terminal import FrameWriter, HOME, CLEAR_SCREEN, CLEAR_BELOW
+
+
+class TestFrameWriter(unittest.TestCase):
+    def setUp(self):
+        self.stream = io.StringIO()
+        self.writer = FrameWriter(self.stream, size=lambda: (80, 24))
+
+    def paint(self, *rows):
+        """Builds a frame the way the menus do (print, then an input prompt) and paints it."""
+        start = len(self.stream.getvalue())
+        self.writer.new_frame()
+        for row in rows:
+            print(row, file=self.writer)
+        self.writer.write("Select an option: ")
+        self.writer.flush()
+        return self.stream.getvalue()[start:]
+
+    def test_frame_is_held_until_flush(self):
+        self.writer.new_frame()
+        print("Menu", file=self.writer)
+        self.assertEqual(self.stream.getvalue(), "")
+        self.writer.flush()
+        self.assertEqual(self.stream.getvalue(), HOME + CLEAR_SCREEN + "Menu\n")
+
+    def test_a_frame_never_flushed_is_painted_before_the_next(self):
+        """A screen that prints an error and returns without a prompt still shows it"""
+        self.writer.new_frame()
+        print("Error: Job not found.", file=self.writer)
+        self.writer.new_frame()
+        self.assertEqual(self.stream.getvalue(), HOME + CLEAR_SCREEN + "Error: Job not found.\n")
+        print("Menu", file=self.writer)
+        self.writer.flush()
+        self.assertIn(terminal.goto_row(1) + "Menu", self.stream.getvalue())
+
+    def test_only_changed_rows_are_repainted(self):
+        self.paint("=== Menu ===", "[1] Browse", "[2] Logout")
+        output = self.paint("=== Menu ===", "[1] Browse jobs", "[2] Logout")
+        self.assertNotIn(CLEAR_SCREEN, output)
+        self.assertNotIn("=== Menu ===", output)
+        self.assertIn(terminal.goto_row(2) + "[1] Browse jobs", output)
+        self.assertNotIn("[2] Logout", output)
+        self.assertTrue(output.endswith("Select an option: " + CLEAR_BELOW))
+
+    def test_output_after_prompt_passes_through(self):
+        self.paint("Menu")
+        self.writer.write("\nInvalid choice!\n")
+        self.assertTrue(self.stream.getvalue().endswith("\nInvalid choice!\n"))
+
+    def test_tall_frames_repaint_fully(self):
+        self.paint("Menu")
+        output = self.paint(*[f"row {n}" for n in range(30)])
+        self.assertTrue(output.startswith(HOME + CLEAR_SCREEN))
+
+    def test_new_frame_is_a_no_op_off_terminal(self):
+        stdout = sys.stdout
+        sys.stdout = io.StringIO()
+        try:
+            terminal.new_frame()
+            self.assertIsInstance(sys.stdout, io.StringIO)
+        finally:
+            sys.stdout = stdout
+
+
+if __name__ == "__main__":
+    unittest.main()
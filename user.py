@@ -1,8 +1,8 @@
-import sqlite3
-import hashlib
-import os
 import time
-from payment_system import Wallet
+import querylog
+import services
+import session
+from money import Money
 from utils import Utility
 
 class User:
@@ -11,25 +11,41 @@ class User:
         self.username = username
         self.password = password
         self.role = role
+        self._wallet = None
+        self._wallets = None
+        self.session = None  # the login Session holding this object, if any
+        self.profile_version = None
+
+    @property
+    def wallets(self):
+        """This session's WalletRepository: balances cached until the ledger changes them."""
+        if self._wallets is None:
+            from payment_system import WalletRepository
+            self._wallets = WalletRepository()
+        return self._wallets
+
+    @property
+    def wallet(self):
+        """The user's Wallet; its balance is read on first use rather than at login."""
+        if self._wallet is None:
+            self._wallet = self.wallets.get(self.id)
+        return self._wallet
+
+    @wallet.setter
+    def wallet(self, wallet):
+        self._wallet = wallet
    
     def hash_password(self, password):
-        return hashlib.sha256(password.encode()).hexdigest()
+        return services.hash_password(password)
 
     @classmethod
     def sign_up(cls, username, password, role):
-        conn = sqlite3.connect("freelancer_marketplace.db")
-        cursor = conn.cursor()
-
-        cursor.execute("SELECT username FROM users WHERE username = ?", (username,))
-        if cursor.fetchone():
+        if services.is_username_taken(username):
             print("\nUsername already taken!")
             time.sleep(1.5)
             Utility.clear_screen()
-            conn.close()
             return None
 
-        hashed_password = hashlib.sha256(password.encode()).hexdigest()
-
         if role == "1":
             role = "Freelancer"
             Utility.clear_screen()
@@ -52,84 +68,71 @@ class User:
                     time.sleep(1.5)
                     
             payment_method = input("Enter your payment method: ")
-
-            cursor.execute("""
-                INSERT INTO users (username, password, role, name, skills, experience, hourly_rate, payment_method)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
-                (username, hashed_password, role, name, skills, experience, hourly_rate, payment_method))
+            profile = dict(name=name, skills=skills, experience=experience,
+                           hourly_rate=hourly_rate, payment_method=payment_method)
         elif role == "2":
             role = "Employer"
             Utility.clear_screen()
             Utility.display_header("Create Your Employer Account")
             company_name = input("Enter your company name: ")
-
-            cursor.execute("""
-                INSERT INTO users (username, password, role, name, company_name)
-                VALUES (?, ?, ?, ?, ?)""",
-                (username, hashed_password, role, "N/A", company_name))  # Provide default "N/A" for name
-
+            profile = dict(company_name=company_name)
         else:
             print("Invalid choice!")
-            conn.close()
             return None
 
-        # Get the last inserted ID
-        user_id = cursor.lastrowid  
-
-        # ✅ Create a wallet entry for the new user
-        cursor.execute("INSERT INTO wallet (user_id, balance) VALUES (?, ?)", (user_id, 0.0))
-
-        conn.commit()
-        conn.close()
+        # The prompts above run without holding a pooled connection
+        try:
+            user_id = services.sign_up(username, password, role, **profile)
+        except services.ServiceError as e:
+            print(f"\n{e}")
+            time.sleep(1.5)
+            Utility.clear_screen()
+            return None
 
         print("\nSign-up successful! You can now log in.")
         time.sleep(1.5)
         Utility.clear_screen()
 
-        # Return the new User instance with all required arguments
-        return cls(user_id, username, hashed_password, role)  
+        # Return the new User instance; the stored hash stays in the database
+        return cls(user_id, username, None, role)
    
     @classmethod
     def login(cls, username, password):
-        conn = sqlite3.connect("freelancer_marketplace.db")
-        cursor = conn.cursor()
-        cursor.execute("SELECT id, username, password, role FROM users WHERE username = ?", (username,))
-        user_data = cursor.fetchone()
-        conn.close()
-
-        if user_data and user_data[2] == hashlib.sha256(password.encode()).hexdigest():
-            print(f"\nLogin successful! Welcome, {username}.")
+        try:
+            # One keyed query checks the password and loads the whole profile
+            user = session.Session().login(username, password)
+        except services.AuthenticationError as e:
+            print(f"\n{e}")
             time.sleep(1.5)
             Utility.clear_screen()
+            return None
 
-            # Extract only the necessary values
-            user_id, username, password, role = user_data
-
-            if role == "Freelancer":
-                from freelancer import Freelancer
-                return Freelancer(user_id, username, password, role)  # Pass only the expected values
-            else:
-                from employer import Employer
-                return Employer(user_id, username, password, role)  # Pass only the expected values
-
-        print("\nInvalid username or password!")
+        print(f"\nLogin successful! Welcome, {username}.")
         time.sleep(1.5)
         Utility.clear_screen()
-        return None
+
+        # Queries run until logout, for the optional per-session summary
+        user.query_session = querylog.start_session()
+        return user
     
     def logout(self):
+        session = getattr(self, "query_session", None)
+        if session is not None:
+            querylog.end_session(session)
+            if querylog.SESSION_SUMMARY:
+                querylog.print_summary(session, title=f"Queries for {self.username}")
+                input("Press Enter to Continue...")
         print(f"\n{self.username} has logged out.")
         time.sleep(1.5)
         Utility.clear_screen()
 
     def wallet_menu(self):
         """Handles wallet balance and payment settings."""
-        if not hasattr(self, "wallet"):  # Ensure wallet is initialized
-            self.wallet = Wallet(self.username)
-
+        # Read once on entry (another process may have paid us); deposits and
+        # withdrawals below update the cached balance without another query
+        self.wallet.invalidate()
         while True:
-            os.system("cls")
-            self.wallet.balance = self.wallet.get_balance_from_db()  # ✅ Refresh balance from DB
+            Utility.clear_screen()
             Utility.display_header("Wallet")
             print(f"Current Balance: Php {self.wallet.balance:.2f}\n")
             print("[1] Deposit Funds\n[2] Withdraw Funds\n[3] Back")
@@ -138,7 +141,7 @@ class User:
 
             if choice == "1":
                 try:
-                    amount = float(input("Enter deposit amount: "))
+                    amount = Money.parse(input("Enter deposit amount: "))
                     if amount > 0:
                         self.wallet.deposit(amount)
                     else:
@@ -149,7 +152,7 @@ class User:
                     time.sleep(1.5)
             elif choice == "2":
                 try:
-                    amount = float(input("Enter withdrawal amount: "))
+                    amount = Money.parse(input("Enter withdrawal amount: "))
                     if amount > 0:
                         self.wallet.withdraw(amount)
                     else:
@@ -1,10 +1,10 @@
-import os
+import terminal
 
 class Utility:
     @staticmethod
     def clear_screen():
-        """Clears the terminal screen."""
-        os.system("cls")
+        """Starts a fresh screen; it is painted in one write, redrawing only rows that changed."""
+        terminal.new_frame()
 
     @staticmethod
     def display_header(title):